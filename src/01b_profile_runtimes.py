@@ -0,0 +1,81 @@
+import os
+import json
+import argparse
+
+import numpy as np
+
+from inference_engine import ARTIFACT_OPTIONS, ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, load_audio, normalize
+from op_profiler import diff_table, format_table, profile_onnxruntime, profile_openvino, profile_pytorch
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "profiler_plots")
+PROFILERS = {"pytorch": profile_pytorch, "onnxruntime": profile_onnxruntime, "openvino": profile_openvino}
+
+
+def plot_categories(categories, report_dir):
+    import matplotlib.pyplot as plt
+
+    names = list(categories)
+    all_categories = sorted({c for cats in categories.values() for c in cats})
+    bottom = np.zeros(len(names))
+    plt.figure(figsize=(10, 6))
+    for category in all_categories:
+        values = np.array([categories[n].get(category, 0.0) for n in names])
+        plt.bar(names, values, bottom=bottom, label=category)
+        bottom += values
+    plt.title("Per-Run Time by Op Category")
+    plt.ylabel("ms / run")
+    plt.xticks(rotation=20, ha="right")
+    plt.legend(fontsize=8)
+    plt.tight_layout()
+    plt.savefig(os.path.join(report_dir, "op_category_breakdown.png"))
+    plt.close()
+
+
+def run_profiles():
+    parser = argparse.ArgumentParser(description="Op-level profiles for PyTorch, ONNX Runtime and OpenVINO artifacts.")
+    parser.add_argument("--artifacts", nargs="+", choices=list(ARTIFACTS),
+                        default=["pytorch", "pytorch_fast", "onnx_optimized", "onnx_quantized", "openvino"])
+    parser.add_argument("--audio", default=SAMPLE_AUDIO)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    input_values = normalize(load_audio(args.audio))[None, :]
+
+    profiles = {}
+    for artifact in args.artifacts:
+        backend, model_path = ARTIFACTS[artifact]
+        if not os.path.exists(model_path):
+            print(f"⚠️ Skipping {artifact}: {model_path} not found")
+            continue
+        print(f"Profiling {artifact} ({backend}, {args.runs} runs)...")
+        trace_path = os.path.join(REPORT_DIR, f"{artifact}_trace.json")
+        # pytorch_fast: same checkpoint as pytorch, profiled through the compiled / BF16 / SDPA path
+        stats, runs = PROFILERS[backend](model_path, input_values, args.runs, args.warmup, args.threads,
+                                         trace_path=trace_path, **ARTIFACT_OPTIONS.get(artifact, {}))
+        table = format_table(stats, runs, f"{artifact.upper()} ({backend}) - per-op self time")
+        with open(os.path.join(REPORT_DIR, f"{artifact}_profiler_report.txt"), "w") as f:
+            f.write(table)
+        print(table)
+        profiles[artifact] = (stats, runs)
+
+    if not profiles:
+        print("❌ Nothing to profile. Run the export scripts first.")
+        return
+
+    diff, categories = diff_table(profiles)
+    with open(os.path.join(REPORT_DIR, "profiler_diff.txt"), "w") as f:
+        f.write(f"Where time went per run ({os.path.basename(args.audio)}, {input_values.shape[1]} samples)\n\n")
+        f.write(diff)
+    with open(os.path.join(REPORT_DIR, "op_profiles.json"), "w") as f:
+        json.dump({name: {"runs": runs, "ops": stats, "categories_ms": categories[name]}
+                   for name, (stats, runs) in profiles.items()}, f, indent=2)
+    plot_categories(categories, REPORT_DIR)
+    print(diff)
+    print(f"✅ Reports and Chrome traces saved to {REPORT_DIR}")
+
+
+if __name__ == "__main__":
+    run_profiles()
@@ -0,0 +1,83 @@
+import os
+import json
+import argparse
+
+import numpy as np
+
+from inference_engine import ARTIFACT_OPTIONS, MODEL_DIR, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, load_audio, normalize
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "profiler_plots")
+
+
+def make_batch(speech, lengths_s):
+    # Different-length cuts of the same speech, right-padded with a mask like batching_server.py
+    lengths = np.array([int(s * SAMPLE_RATE) for s in lengths_s])
+    speech = np.resize(speech, lengths.max())
+    input_values = np.zeros((len(lengths), lengths.max()), dtype=np.float32)
+    attention_mask = np.zeros(input_values.shape, dtype=np.int64)
+    for row, length in enumerate(lengths):
+        input_values[row, :length] = normalize(speech[:length])
+        attention_mask[row, :length] = 1
+    return input_values, attention_mask, lengths
+
+
+def run_verification():
+    parser = argparse.ArgumentParser(description="Checks pytorch_fast (compiled / BF16 / SDPA) logits against eager PyTorch.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--audio", default=SAMPLE_AUDIO)
+    parser.add_argument("--lengths-s", nargs="+", type=float, default=[1.5, 4.0, 7.5],
+                        help="One utterance per length, batched together and alone")
+    parser.add_argument("--atol", type=float, default=1e-3, help="FP32 compiled vs eager max |diff|")
+    parser.add_argument("--min-agreement", type=float, default=0.98, help="BF16 greedy-frame agreement with eager")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    import torch
+    from inference_engine import TorchBackend
+    from torch_fast import bf16_supported, compare_logits
+
+    input_values, attention_mask, lengths = make_batch(load_audio(args.audio), args.lengths_s)
+    eager = TorchBackend(args.model_dir, num_threads=args.threads)
+    reference = torch.from_numpy(eager.run(input_values, attention_mask))
+    del eager
+
+    fast = dict(ARTIFACT_OPTIONS["pytorch_fast"])
+    variants = {"compiled_fp32": dict(fast, bf16=False)}
+    if bf16_supported():
+        variants["compiled_bf16"] = dict(fast, bf16=True)
+    else:
+        print("⚠️ No native BF16 on this CPU (AMX / AVX512-BF16): checking FP32 only")
+
+    results, passed = {}, True
+    for name, options in variants.items():
+        print(f"Compiling {name} (every bucket)...")
+        backend = TorchBackend(args.model_dir, num_threads=args.threads, **options)
+        batched = compare_logits(reference, torch.from_numpy(backend.run(input_values, attention_mask)), lengths)
+        alone = [compare_logits(reference[row:row + 1], torch.from_numpy(backend.run(input_values[row:row + 1, :n])),
+                                lengths[row:row + 1]) for row, n in enumerate(lengths)]
+        result = {
+            "batched": batched,
+            "alone_max_abs_diff": max(a["max_abs_diff"] for a in alone),
+            "alone_argmax_agreement": min(a["argmax_agreement"] for a in alone),
+            "hits": {f"{b}x{n}": c for (b, n), c in backend.compiled.hits.items() if c},
+            "eager_calls": backend.compiled.eager_calls,
+        }
+        worst_diff = max(batched["max_abs_diff"], result["alone_max_abs_diff"])
+        worst_agreement = min(batched["argmax_agreement"], result["alone_argmax_agreement"])
+        # BF16 changes the numbers; what must survive is the greedy path
+        result["passed"] = worst_agreement >= args.min_agreement if options["bf16"] else worst_diff <= args.atol
+        passed &= result["passed"]
+        results[name] = result
+        status = "✅" if result["passed"] else "❌"
+        print(f"{status} {name}: max |diff| {worst_diff:.2e} | argmax agreement {worst_agreement:.2%}")
+        del backend
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output = os.path.join(REPORT_DIR, "torch_fast_verification.json")
+    with open(output, "w") as f:
+        json.dump({"config": vars(args), "lengths": lengths.tolist(), "results": results}, f, indent=2)
+    print(f"\n{'✅' if passed else '❌'} Report saved to {output}")
+
+
+if __name__ == "__main__":
+    run_verification()
@@ -1,50 +1,55 @@
 import os
+import argparse
 
 # 1. FIX: Prevent "OMP: Error #15" crash on Windows/Linux
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
 import torch
-from transformers import Wav2Vec2ForCTC
+
+from inference_engine import MODEL_DIR, ONNX_DIR
+from pruning import CTCExportModule, export_example, load_wav2vec2
 
 def export_to_onnx():
-    current_file = os.path.abspath(__file__)
-    project_root = os.path.dirname(os.path.dirname(current_file))
-    
+    parser = argparse.ArgumentParser(description="Export a Wav2Vec2ForCTC checkpoint (original or pruned) to ONNX.")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="HF checkpoint or a 07b_prune_model.py output")
+    parser.add_argument("--output", default=os.path.join(ONNX_DIR, "model.onnx"))
+    args = parser.parse_args()
+
     # Paths
-    model_dir = os.path.join(project_root, "models", "original_hindi")
-    output_dir = os.path.join(project_root, "models", "onnx")
-    onnx_path = os.path.join(output_dir, "model.onnx")
-    
-    os.makedirs(output_dir, exist_ok=True)
+    model_dir = args.model_dir
+    onnx_path = args.output
+    os.makedirs(os.path.dirname(os.path.abspath(onnx_path)), exist_ok=True)
 
     print(f"Loading model from: {model_dir}")
     try:
-        # Load model to CPU
-        model = Wav2Vec2ForCTC.from_pretrained(model_dir, low_cpu_mem_usage=False).to("cpu")
+        # Load model to CPU (pruned checkpoints are rebuilt from their pruning.json)
+        model = load_wav2vec2(model_dir)
     except OSError:
         print(f"❌ Error: Model not found at {model_dir}")
         return
 
     model.eval()
 
-    # Dummy input (1 sample, 1 second)
-    dummy_input = torch.randn(1, 16000) 
+    # Dummy batch (2 x 1 second, second row half padding): attention_mask is a real graph input, so padded
+    # batches match single-utterance logits (the checkpoint has return_attention_mask=true)
+    dummy_input = export_example()
 
     print(f"Exporting to ONNX (Opset 17)...")
     
     with torch.no_grad():
         torch.onnx.export(
-            model,
+            CTCExportModule(model),
             dummy_input,
             onnx_path,
             export_params=True,
             # CRITICAL FIX: Opset 17 prevents the "Garbage Text" bug later in TensorRT
             opset_version=17, 
             do_constant_folding=True,
-            input_names=['input_values'],
+            input_names=['input_values', 'attention_mask'],
             output_names=['logits'],
             dynamic_axes={
                 'input_values': {0: 'batch_size', 1: 'sequence_length'},
+                'attention_mask': {0: 'batch_size', 1: 'sequence_length'},
                 'logits': {0: 'batch_size', 1: 'sequence_length'}
             }
             # REMOVED: dynamo=False (This causes TypeError)
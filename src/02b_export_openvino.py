@@ -1,35 +1,51 @@
 import os
-import torch
+import argparse
 import openvino as ov
-from transformers import Wav2Vec2ForCTC
+
+from inference_engine import MODEL_DIR, OPENVINO_DIR
+from pruning import CTCExportModule, export_example, load_wav2vec2
 
 def export_to_openvino():
     # 1. Path Setup
-    current_file = os.path.abspath(__file__)
-    project_root = os.path.dirname(os.path.dirname(current_file))
-    
-    model_dir = os.path.join(project_root, "models", "original_hindi")
-    output_dir = os.path.join(project_root, "models", "openvino")
-    
+    parser = argparse.ArgumentParser(description="Convert a Wav2Vec2ForCTC checkpoint (original or pruned) to OpenVINO IR.")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="HF checkpoint or a 07b_prune_model.py output")
+    parser.add_argument("--output-dir", default=OPENVINO_DIR)
+    args = parser.parse_args()
+
+    model_dir = args.model_dir
+    output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
 
-    # 2. Load Model
+    # 2. Load Model (pruned checkpoints are rebuilt from their pruning.json)
     print("Loading model for OpenVINO conversion...")
-    model = Wav2Vec2ForCTC.from_pretrained(model_dir, low_cpu_mem_usage=False)
-    model.eval()
+    model = load_wav2vec2(model_dir)
 
     # 3. Convert to OpenVINO Intermediate Representation (IR)
     print("Converting to OpenVINO IR (This is GREAT for CPU performance)...")
-    dummy_input = torch.randn(1, 16000)
-    
-    # convert_model works directly on the PyTorch object
-    ov_model = ov.convert_model(model, example_input=dummy_input)
+    input_values, attention_mask = export_example()
+
+    # convert_model works directly on the PyTorch object; attention_mask is an input so padded batches
+    # match single-utterance logits
+    ov_model = ov.convert_model(CTCExportModule(model),
+                                example_input={"input_values": input_values, "attention_mask": attention_mask})
     
     # Save as .xml (topology) and .bin (weights)
     ov.save_model(ov_model, os.path.join(output_dir, "model.xml"))
     
     print(f"✅ OpenVINO Export Successful! Saved to {output_dir}")
-    print("This format runs 3x-5x faster on CPUs than raw PyTorch.")
+
+    # 4. Optional INT8 weight compression (needs NNCF)
+    try:
+        import nncf
+    except ImportError:
+        print("👉 NNCF not installed, skipping model_int8.xml (pip install nncf)")
+        return
+
+    print("Compressing weights to INT8 with NNCF...")
+    int8_model = nncf.compress_weights(ov_model, mode=nncf.CompressWeightsMode.INT8_ASYM)
+    ov.save_model(int8_model, os.path.join(output_dir, "model_int8.xml"))
+    print(f"✅ INT8 IR saved to {os.path.join(output_dir, 'model_int8.xml')}")
+    print("👉 Run 06a_benchmark_cpu.py to compare it against the FP32 IR and ONNX artifacts.")
 
 if __name__ == "__main__":
     export_to_openvino()
\ No newline at end of file
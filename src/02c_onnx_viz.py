@@ -1,106 +1,52 @@
-import onnx
 import os
+import time
+import argparse
+
 import numpy as np
 import matplotlib.pyplot as plt
-from onnx import numpy_helper
-from collections import Counter
-from onnx.mapping import TENSOR_TYPE_TO_NP_TYPE
-
-model_path = r"C:\Users\apran\Videos\Cin\LIBRARY\ai4bharat-tensorrt-optimization\models\onnx\model.onnx"
-report_dir = r"C:\Users\apran\Videos\Cin\LIBRARY\ai4bharat-tensorrt-optimization\reports"
-
-os.makedirs(report_dir, exist_ok=True)
-
-print(f"Loading ONNX model from {model_path}...")
-model = onnx.load(model_path)
-graph = model.graph
-
-def get_shape_string(tensor):
-    try:
-        if not tensor.HasField("type"): return "Unknown"
-        if not tensor.type.HasField("tensor_type"): return "Not Tensor"
-        
-        elem_type = tensor.type.tensor_type.elem_type
-        type_str = str(TENSOR_TYPE_TO_NP_TYPE.get(elem_type, "Unknown"))
-        
-        dims = []
-        if tensor.type.tensor_type.has_shape:
-            for d in tensor.type.tensor_type.shape.dim:
-                if d.HasField("dim_value"):
-                    dims.append(str(d.dim_value))
-                elif d.HasField("dim_param"):
-                    dims.append(d.dim_param)
-                else:
-                    dims.append("?")
-        
-        return f"{type_str} {dims}"
-    except Exception:
-        return "Error Parsing"
-
-summary_path = os.path.join(report_dir, "model_summary_advanced.txt")
-with open(summary_path, "w") as f:
-    f.write(f"Model Producer: {model.producer_name}\n")
-    f.write(f"Opset Version: {model.opset_import[0].version}\n")
-    f.write(f"Graph Name: {graph.name}\n\n")
-    
-    f.write("--- INPUTS ---\n")
-    for input in graph.input:
-        f.write(f"{input.name}: {get_shape_string(input)}\n")
-        
-    f.write("\n--- OUTPUTS ---\n")
-    for output in graph.output:
-        f.write(f"{output.name}: {get_shape_string(output)}\n")
-
-    f.write("\n--- NODE STATS ---\n")
-    ops = [node.op_type for node in graph.node]
-    for op, count in Counter(ops).most_common():
-        f.write(f"{op}: {count}\n")
-
-print(f"Saved summary to {summary_path}")
-
-plt.figure(figsize=(14, 8))
-labels, values = zip(*Counter(ops).most_common(20))
-plt.bar(labels, values, color='#4e79a7')
-plt.title(f'Top 20 Operators (Opset {model.opset_import[0].version})')
-plt.ylabel('Count')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.savefig(os.path.join(report_dir, "operator_distribution.png"))
-plt.close()
-
-layer_stats = {}
-
-print("Scanning Initializers...")
-for initializer in graph.initializer:
-    try:
-        weight = numpy_helper.to_array(initializer)
-        if weight.size > 0:
-            layer_stats[initializer.name] = {
-                'max': float(np.max(weight)),
-                'min': float(np.min(weight))
-            }
-    except:
-        continue
-
-print("Scanning Constant Nodes (Hidden Weights)...")
-for node in graph.node:
-    if node.op_type == "Constant":
-        for attr in node.attribute:
-            if attr.name == "value" and attr.type == onnx.AttributeProto.TENSOR:
-                try:
-                    weight = numpy_helper.to_array(attr.t)
-                    if weight.size > 100: 
-                        layer_stats[node.name] = {
-                            'max': float(np.max(weight)),
-                            'min': float(np.min(weight))
-                        }
-                except:
-                    continue
-
-if len(layer_stats) > 0:
-    print(f"Found {len(layer_stats)} weight layers.")
-    
-    names = list(layer_stats.keys())
+
+from activation_stats import FP16_MAX
+from inference_engine import ONNX_DIR, PROJECT_ROOT
+from onnx_analysis import analyze_model
+
+
+def write_summary(summary, summary_path):
+    with open(summary_path, "w") as f:
+        f.write(f"Model Producer: {summary['producer']}\n")
+        f.write(f"Opset Version: {summary['opset']}\n")
+        f.write(f"Graph Name: {summary['graph_name']}\n\n")
+
+        f.write("--- INPUTS ---\n")
+        for name, shape in summary["inputs"].items():
+            f.write(f"{name}: {shape}\n")
+
+        f.write("\n--- OUTPUTS ---\n")
+        for name, shape in summary["outputs"].items():
+            f.write(f"{name}: {shape}\n")
+
+        f.write("\n--- NODE STATS ---\n")
+        for op, count in summary["op_counts"].items():
+            f.write(f"{op}: {count}\n")
+
+        f.write("\n--- PARAMETERS ---\n")
+        for dtype, count in summary["parameters_by_dtype"].items():
+            f.write(f"{dtype}: {count:,} ({summary['weight_bytes_by_dtype'][dtype] / 1024 ** 2:.1f} MB)\n")
+
+
+def plot_operators(summary, report_dir):
+    plt.figure(figsize=(14, 8))
+    labels, values = zip(*list(summary["op_counts"].items())[:20])
+    plt.bar(labels, values, color='#4e79a7')
+    plt.title(f"Top 20 Operators (Opset {summary['opset']})")
+    plt.ylabel('Count')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    plt.savefig(os.path.join(report_dir, "operator_distribution.png"))
+    plt.close()
+
+
+def plot_weights(layer_stats, report_dir):
+    names = list(layer_stats)
     max_vals = [v['max'] for v in layer_stats.values()]
     min_vals = [v['min'] for v in layer_stats.values()]
 
@@ -112,19 +58,52 @@ if len(layer_stats) > 0:
     plt.figure(figsize=(15, 8))
     plt.bar(top_names, top_max, label='Max', color='#e15759', alpha=0.7)
     plt.bar(top_names, top_min, label='Min', color='#59a14f', alpha=0.7)
-    
-    plt.axhline(y=65504, color='black', linestyle='--', linewidth=2, label='FP16 Limit')
-    plt.axhline(y=-65504, color='black', linestyle='--', linewidth=2)
-    
+
+    plt.axhline(y=FP16_MAX, color='black', linestyle='--', linewidth=2, label='FP16 Limit')
+    plt.axhline(y=-FP16_MAX, color='black', linestyle='--', linewidth=2)
+
     plt.title('Weight Magnitudes (Check for FP16 Overflow)')
     plt.ylabel('Value')
-    plt.xticks([]) 
+    plt.xticks([])
     plt.legend()
     plt.tight_layout()
     plt.savefig(os.path.join(report_dir, "weight_analysis_fixed.png"))
     plt.close()
-    print("Saved weight_analysis_fixed.png")
-else:
-    print("❌ No weights found in graph. Model might be using external data references not loaded.")
 
-print(f"✅ Reports generated in {report_dir}")
\ No newline at end of file
+
+def run_viz():
+    parser = argparse.ArgumentParser(description="Graph summary and weight ranges of an ONNX model, without loading its weights.")
+    parser.add_argument("--model", default=os.path.join(ONNX_DIR, "model.onnx"))
+    parser.add_argument("--report-dir", default=os.path.join(PROJECT_ROOT, "reports"))
+    parser.add_argument("--workers", type=int, default=None, help="Threads reducing weight chunks")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute instead of reading <model>.stats.json")
+    args = parser.parse_args()
+
+    os.makedirs(args.report_dir, exist_ok=True)
+    print(f"Analyzing ONNX model {args.model}...")
+    start = time.perf_counter()
+    analysis = analyze_model(args.model, workers=args.workers, use_cache=not args.no_cache)
+    print(f"Analysis took {time.perf_counter() - start:.1f}s (stats cached in {args.model}.stats.json)")
+
+    summary = analysis["summary"]
+    summary_path = os.path.join(args.report_dir, "model_summary_advanced.txt")
+    write_summary(summary, summary_path)
+    print(f"Saved summary to {summary_path}")
+    plot_operators(summary, args.report_dir)
+
+    layer_stats = analysis["initializers"]
+    if layer_stats:
+        print(f"Found {len(layer_stats)} weight tensors.")
+        overflow = {name: s["fp16_overflow"] for name, s in layer_stats.items() if s["fp16_overflow"]}
+        if overflow:
+            print(f"⚠️ {len(overflow)} tensors have values beyond the FP16 range: {', '.join(list(overflow)[:5])}")
+        plot_weights(layer_stats, args.report_dir)
+        print("Saved weight_analysis_fixed.png")
+    else:
+        print("❌ No weights found in graph.")
+
+    print(f"✅ Reports generated in {args.report_dir}")
+
+
+if __name__ == "__main__":
+    run_viz()
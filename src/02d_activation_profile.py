@@ -0,0 +1,126 @@
+import os
+import json
+import argparse
+
+from activation_stats import FP16_MAX, FP16_MIN_NORMAL, overflow_risk, profile_activations
+from calibration import WavCalibrationReader
+from inference_engine import ONNX_DIR, PROJECT_ROOT, SAMPLE_AUDIO, normalize, load_audio
+
+
+def load_inputs(source, max_files, max_seconds):
+    # Preprocessed once, replayed for every pass
+    if source is None:
+        return [normalize(load_audio(SAMPLE_AUDIO))[None, :]]
+    reader = WavCalibrationReader(source, max_files, max_seconds)
+    inputs = []
+    while (feed := reader.get_next()) is not None:
+        inputs.append(feed["input_values"])
+    return inputs
+
+
+def write_report(ranked, report_path, model_path, num_inputs):
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write(f"Activation Profile: {model_path}\n")
+        f.write(f"Inputs: {num_inputs} | Tensors: {len(ranked)} | FP16 max: {FP16_MAX}\n\n")
+        header = f"{'Tensor':<60} {'Op':<22} {'AbsMax':>12} {'|x| p99.99':>12} {'>FP16':>10} {'<FP16 min':>10} {'>BF16':>7} {'NaN/Inf':>8}\n"
+        f.write(header)
+        f.write("-" * len(header) + "\n")
+        for name, s in ranked:
+            f.write(f"{name[-60:]:<60} {s['op_type'][:22]:<22} {s['abs_max']:>12.4g} {s['abs_p99_99']:>12.4g} "
+                    f"{s['fp16_overflow']:>10} {s['fp16_underflow']:>10} {s['bf16_overflow']:>7} {s['nonfinite']:>8}\n")
+
+
+def plot_profile(ranked, report_dir):
+    import matplotlib.pyplot as plt
+
+    top = ranked[:50][::-1]
+    names = [name[-40:] for name, _ in top]
+
+    plt.figure(figsize=(15, 8))
+    plt.bar(names, [s["abs_max"] for _, s in top], label="Abs Max", color="#e15759", alpha=0.7)
+    plt.bar(names, [s["abs_p99_99"] for _, s in top], label="|x| p99.99", color="#4e79a7", alpha=0.7)
+    plt.axhline(y=FP16_MAX, color="black", linestyle="--", linewidth=2, label="FP16 Limit")
+    plt.yscale("log")
+    plt.title("Activation Magnitudes - Top 50 by Overflow Risk")
+    plt.ylabel("Value (log)")
+    plt.xticks(rotation=90, fontsize=6)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(os.path.join(report_dir, "activation_overflow_risk.png"))
+    plt.close()
+
+    # Which op types carry the risk (the README blames LayerNorm variance)
+    by_op = {}
+    for _, s in ranked:
+        by_op[s["op_type"]] = max(by_op.get(s["op_type"], 0.0), s["abs_max"])
+    ops = sorted(by_op, key=by_op.get, reverse=True)[:20]
+    plt.figure(figsize=(12, 6))
+    plt.bar(ops, [by_op[o] for o in ops], color="#f28e2b")
+    plt.axhline(y=FP16_MAX, color="black", linestyle="--", linewidth=2, label="FP16 Limit")
+    plt.yscale("log")
+    plt.title("Largest Activation per Op Type")
+    plt.xticks(rotation=45, ha="right")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(os.path.join(report_dir, "activation_by_op_type.png"))
+    plt.close()
+
+
+def plot_histograms(ranked, report_dir, count):
+    import matplotlib.pyplot as plt
+
+    # Where the |x| mass of the riskiest tensors sits relative to the FP16 normal range
+    top = [(name, s) for name, s in ranked if s["abs_histogram"]["counts"]][:count]
+    if not top:
+        return
+    cols = min(len(top), 4)
+    rows = -(-len(top) // cols)
+    fig, axes = plt.subplots(rows, cols, figsize=(4 * cols, 3 * rows), squeeze=False)
+    for ax, (name, s) in zip(axes.flat, top):
+        ax.stairs(s["abs_histogram"]["counts"], s["abs_histogram"]["edges"], fill=True, color="#4e79a7", alpha=0.7)
+        ax.axvline(x=FP16_MAX, color="black", linestyle="--", linewidth=1)
+        ax.axvline(x=FP16_MIN_NORMAL, color="gray", linestyle=":", linewidth=1)
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_title(f"{name[-35:]} ({s['op_type']})", fontsize=7)
+    for ax in list(axes.flat)[len(top):]:
+        ax.axis("off")
+    fig.suptitle("|x| Histograms - Top Tensors by Overflow Risk (dashed: FP16 max, dotted: FP16 min normal)")
+    fig.tight_layout()
+    fig.savefig(os.path.join(report_dir, "activation_histograms.png"))
+    plt.close(fig)
+
+
+def run_activation_profile():
+    parser = argparse.ArgumentParser(description="Stream per-tensor activation statistics through the ONNX graph.")
+    parser.add_argument("--model", default=os.path.join(ONNX_DIR, "model.onnx"))
+    parser.add_argument("--audio", default=None, help="Directory of audio or a manifest (defaults to the sample WAV)")
+    parser.add_argument("--max-files", type=int, default=16)
+    parser.add_argument("--max-seconds", type=float, default=10.0)
+    parser.add_argument("--op-types", nargs="+", default=None, help="Only expose outputs of these ops (default: all)")
+    parser.add_argument("--outputs-per-pass", type=int, default=200)
+    parser.add_argument("--histograms", type=int, default=8, help="Top-ranked tensors whose |x| histogram is plotted")
+    args = parser.parse_args()
+
+    report_dir = os.path.join(PROJECT_ROOT, "reports", "activation_profile")
+    os.makedirs(report_dir, exist_ok=True)
+
+    inputs = load_inputs(args.audio, args.max_files, args.max_seconds)
+    print(f"Profiling activations of {args.model} over {len(inputs)} inputs...")
+    stats = profile_activations(args.model, inputs, op_types=args.op_types, outputs_per_pass=args.outputs_per_pass)
+
+    ranked = sorted(stats.items(), key=lambda kv: overflow_risk(kv[1]), reverse=True)
+    write_report(ranked, os.path.join(report_dir, "activation_report.txt"), args.model, len(inputs))
+    with open(os.path.join(report_dir, "activation_stats.json"), "w") as f:
+        json.dump(dict(ranked), f, indent=2)
+    plot_profile(ranked, report_dir)
+    plot_histograms(ranked, report_dir, args.histograms)
+
+    overflowing = [name for name, s in ranked if s["fp16_overflow"] or s["nonfinite"]]
+    print(f"\n{len(overflowing)} tensors exceed the FP16 range"
+          + (f" (worst: {overflowing[0]})" if overflowing else ""))
+    print(f"✅ Activation report saved to {report_dir}")
+
+
+if __name__ == "__main__":
+    run_activation_profile()
@@ -0,0 +1,123 @@
+import os
+import json
+import argparse
+
+os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
+
+import torch
+from torch import nn
+
+from early_exit import DEFAULT_EXIT_LAYERS, EARLY_EXIT_DIR, SPEC_FILE
+from inference_engine import MODEL_DIR
+from pruning import encoder_layers, load_wav2vec2
+
+
+class FrontEnd(nn.Module):
+    """input_values -> encoder input: conv features, projection, positional conv (what precedes layer 0)."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.wav2vec2 = model.wav2vec2
+        self.stable_layer_norm = model.config.do_stable_layer_norm
+
+    def forward(self, input_values):
+        w2v = self.wav2vec2
+        features = w2v.feature_extractor(input_values).transpose(1, 2)
+        hidden, _ = w2v.feature_projection(features)
+        hidden = hidden + w2v.encoder.pos_conv_embed(hidden)
+        # Post-norm checkpoints normalize before the first layer instead of after the last
+        return hidden if self.stable_layer_norm else w2v.encoder.layer_norm(hidden)
+
+
+class Segment(nn.Module):
+    """Encoder layers [first, last) followed by the model's own CTC head as an exit.
+
+    The exit reuses the final encoder LayerNorm and lm_head, so the last segment's logits are
+    exactly the full model's and every earlier exit speaks the same vocabulary.
+    """
+
+    def __init__(self, model, first, last, front_end=None):
+        super().__init__()
+        self.front_end = front_end
+        self.layers = nn.ModuleList(encoder_layers(model)[first:last])
+        self.stable_layer_norm = model.config.do_stable_layer_norm
+        self.layer_norm = model.wav2vec2.encoder.layer_norm
+        self.lm_head = model.lm_head
+
+    def forward(self, inputs):
+        hidden = self.front_end(inputs) if self.front_end is not None else inputs
+        for layer in self.layers:
+            hidden = layer(hidden)[0]
+        normed = self.layer_norm(hidden) if self.stable_layer_norm else hidden
+        return hidden, self.lm_head(normed)
+
+
+def export_segments(model, exit_layers, output_dir):
+    num_layers = len(encoder_layers(model))
+    exit_layers = sorted({layer for layer in exit_layers if 0 < layer < num_layers} | {num_layers})
+    os.makedirs(output_dir, exist_ok=True)
+
+    segments, first = [], 0
+    for index, last in enumerate(exit_layers):
+        segment = Segment(model, first, last, FrontEnd(model) if index == 0 else None).eval()
+        input_name, length_axis = ("input_values", "sequence_length") if index == 0 else ("hidden_states", "num_frames")
+        dummy = torch.randn(1, 16000) if index == 0 else torch.randn(1, 49, model.config.hidden_size)
+        path = os.path.join(output_dir, f"segment_{index}.onnx")
+        print(f"Exporting layers {first}-{last - 1} -> {path}")
+        with torch.no_grad():
+            torch.onnx.export(
+                segment, dummy, path,
+                export_params=True,
+                opset_version=17,
+                do_constant_folding=True,
+                input_names=[input_name],
+                output_names=["exit_hidden_states", "logits"],
+                dynamic_axes={
+                    input_name: {0: "batch_size", 1: length_axis},
+                    "exit_hidden_states": {0: "batch_size", 1: "num_frames"},
+                    "logits": {0: "batch_size", 1: "num_frames"},
+                },
+            )
+        segments.append({"file": os.path.basename(path), "input": input_name, "layers": [first, last]})
+        first = last
+    return {"num_layers": num_layers, "exit_layers": exit_layers, "segments": segments}
+
+
+def check_segments(model, spec, output_dir):
+    # The chained segments must reproduce the monolithic model at full depth
+    import numpy as np
+    import onnxruntime as ort
+
+    audio = torch.randn(1, 3 * 16000)
+    with torch.no_grad():
+        expected = model(audio).logits.numpy()
+    values = audio.numpy()
+    for segment in spec["segments"]:
+        session = ort.InferenceSession(os.path.join(output_dir, segment["file"]), providers=["CPUExecutionProvider"])
+        values, logits = session.run(None, {segment["input"]: values})
+    return float(np.abs(logits - expected).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Wav2Vec2ForCTC as chained ONNX segments with a CTC exit after each.")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="HF checkpoint or a 07b_prune_model.py output")
+    parser.add_argument("--output-dir", default=EARLY_EXIT_DIR)
+    parser.add_argument("--exit-layers", nargs="+", type=int, default=list(DEFAULT_EXIT_LAYERS),
+                        help="Layers after which an exit is placed (the last layer always is one)")
+    args = parser.parse_args()
+
+    print(f"Loading model from: {args.model_dir}")
+    model = load_wav2vec2(args.model_dir)
+    spec = export_segments(model, args.exit_layers, args.output_dir)
+    spec["source"] = os.path.abspath(args.model_dir)
+
+    max_diff = check_segments(model, spec, args.output_dir)
+    spec["full_depth_max_abs_diff"] = max_diff
+    with open(os.path.join(args.output_dir, SPEC_FILE), "w") as f:
+        json.dump(spec, f, indent=2)
+    print(f"Full-depth logits vs PyTorch: max abs diff {max_diff:.2e}")
+    print(f"✅ {len(spec['segments'])} segments (exits after layers {spec['exit_layers']}) saved to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,282 @@
 import os
-from onnxruntime.transformers import optimizer
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import onnx
+
+from graph_passes import (cancel_transpose_pairs, constants_to_initializers, feature_encoder_blocks, fold_constant_nodes,
+                          fold_conv_weights, op_counts, remove_dead_nodes, remove_model, static_reshape_targets)
+from inference_engine import MODEL_DIR, ONNX_DIR, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, model_feeds
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "graph_optimization")
+PASSES = ["simplify", "constants", "fold", "conv_weights", "static_reshape", "ort_basic", "fusion", "cancel_transposes"]
+
+
+def load_model_config(model_dir=MODEL_DIR):
+    # Dimensions come from the checkpoint, not hard-coded (16 heads / 1024 hidden for this model)
+    with open(os.path.join(model_dir, "config.json")) as f:
+        config = json.load(f)
+    spec_path = os.path.join(model_dir, "pruning.json")
+    if os.path.exists(spec_path):
+        # Pruned checkpoints (07b_prune_model.py) differ in head count per layer; 0 lets the fuser read each from the graph
+        with open(spec_path) as f:
+            spec = json.load(f)
+        return {"num_heads": 0, "hidden_size": 0, "num_layers": spec["num_layers"],
+                "feat_extract_norm": config.get("feat_extract_norm", "group"),
+                "num_conv_layers": len(config.get("conv_dim", []))}
+    return {
+        "num_heads": config["num_attention_heads"],
+        "hidden_size": config["hidden_size"],
+        "num_layers": config["num_hidden_layers"],
+        "feat_extract_norm": config.get("feat_extract_norm", "group"),
+        "num_conv_layers": len(config.get("conv_dim", [])),
+    }
+
+
+def save(model, path):
+    # onnx.save moves weights out of the proto it is given, so write a copy and keep `model` usable
+    remove_model(path)
+    copy = onnx.ModelProto()
+    copy.CopyFrom(model)
+    onnx.save(copy, path, save_as_external_data=True, all_tensors_to_one_file=True,
+              location=os.path.basename(path) + ".data", size_threshold=1024)
+
+
+def make_inputs(seed=0):
+    # Real speech when available, plus odd lengths and batch 2 so dynamic shapes are exercised
+    rng = np.random.default_rng(seed)
+    inputs = [rng.standard_normal((1, int(3.7 * SAMPLE_RATE))).astype(np.float32),
+              rng.standard_normal((2, int(1.3 * SAMPLE_RATE))).astype(np.float32)]
+    try:
+        from inference_engine import load_audio, normalize
+        inputs.insert(0, normalize(load_audio(SAMPLE_AUDIO))[None, :])
+    except Exception:
+        pass
+    return inputs
+
+
+def run_model(path, inputs, runs=0, num_threads=None):
+    """Outputs for each input, plus p50 latency (ms) over `runs` timed calls on the first one."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+    names = {i.name for i in session.get_inputs()}
+    outputs = [session.run(None, model_feeds(names, x))[0] for x in inputs]
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.run(None, model_feeds(names, inputs[0]))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, float(np.percentile(latencies, 50)) if latencies else None
+
+
+def compare(reference, candidate):
+    return {
+        "max_abs_diff": float(max(np.abs(r - c).max() for r, c in zip(reference, candidate))),
+        "argmax_agreement": float(np.mean(np.concatenate(
+            [(r.argmax(-1) == c.argmax(-1)).ravel() for r, c in zip(reference, candidate)]))),
+    }
+
+
+def pass_simplify(model, dims):
+    try:
+        import onnxsim
+    except ImportError:
+        return None, "onnxsim not installed"
+    simplified, ok = onnxsim.simplify(model)
+    if not ok:
+        return None, "onnxsim check failed"
+    model.CopyFrom(simplified)
+    return model, "onnxsim"
+
+
+def pass_constants(model, dims):
+    return model, f"{constants_to_initializers(model)} Constant nodes -> initializers"
+
+
+def pass_fold(model, dims):
+    # Includes the weight-norm (g * v / ||v||) in front of the positional conv, if the exporter left it
+    folded = fold_constant_nodes(model)
+    pos_conv = [n for n in model.graph.node if n.op_type == "Conv" and "pos_conv" in n.name]
+    inits = {i.name for i in model.graph.initializer}
+    unfolded = [n.name for n in pos_conv if n.input[1] not in inits]
+    note = f"{folded} nodes folded"
+    if unfolded:
+        note += f"; positional conv weight still computed at runtime in {unfolded} (conv_weights folds it)"
+    return model, note
+
+
+def pass_conv_weights(model, dims):
+    # Weight norm of the positional conv embedding, evaluated once as a whole subgraph
+    folded = fold_conv_weights(model)
+    return model, f"{len(folded)} conv weights/biases folded" + (f" ({', '.join(sorted(set(folded)))})" if folded else "")
+
+
+def pass_static_reshape(model, dims):
+    return model, f"{static_reshape_targets(model)} Reshape targets made static"
+
+
+def pass_ort_basic(model, dims, work_dir):
+    # ORT's hardware-independent level: constant folding, redundant node elimination, Identity/Dropout removal
+    import onnxruntime as ort
+
+    src, out = os.path.join(work_dir, "basic_in.onnx"), os.path.join(work_dir, "basic_out.onnx")
+    save(model, src)
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    options.optimized_model_filepath = out
+    options.add_session_config_entry("session.optimized_model_external_initializers_file_name", "basic_out.onnx.data")
+    options.add_session_config_entry("session.optimized_model_external_initializers_min_size_in_bytes", "1024")
+    ort.InferenceSession(src, options, providers=["CPUExecutionProvider"])
+    result = onnx.load(out)
+    remove_model(src)
+    remove_model(out)
+    return result, "ORT basic level"
+
+
+def pass_fusion(model, dims):
+    """Attention / SkipLayerNorm / LayerNorm / Gelu / BiasGelu fusions, checked against the config."""
+    from onnxruntime.transformers import optimizer
+    from onnxruntime.transformers.fusion_options import FusionOptions
+
+    options = FusionOptions("bert")
+    options.enable_gelu_approximation = False  # keep erf Gelu, FastGelu changes numerics
+    optimized = optimizer.optimize_model(model, model_type="bert", num_heads=dims["num_heads"],
+                                         hidden_size=dims["hidden_size"], optimization_options=options, opt_level=0)
+    fused = {k: v for k, v in optimized.get_fused_operator_statistics().items() if v}
+
+    # Every encoder layer should end up with one Attention; say so when the matcher missed some
+    attention = fused.get("Attention", 0) + fused.get("MultiHeadAttention", 0)
+    note = f"fused {fused}"
+    if attention < dims["num_layers"]:
+        note += f"; WARNING only {attention}/{dims['num_layers']} attention blocks fused"
+    # Conv feature encoder: every layer is Conv -> norm -> Gelu with layer norm, only the first with group norm.
+    # ORT CPU has no Conv+norm+Gelu kernel (FusedConv activations exclude Gelu), so check the pieces fused
+    if dims["num_conv_layers"]:
+        expected = dims["num_conv_layers"] if dims["feat_extract_norm"] == "layer" else 1
+        note += f"; conv encoder Conv->norm->Gelu blocks {len(feature_encoder_blocks(optimized.model))}/{expected}"
+    return optimized.model, note
+
+
+def pass_cancel_transposes(model, dims):
+    return model, f"{cancel_transpose_pairs(model)} Transpose nodes cancelled"
+
+
+PASS_FUNCTIONS = {
+    "simplify": pass_simplify,
+    "constants": pass_constants,
+    "fold": pass_fold,
+    "conv_weights": pass_conv_weights,
+    "static_reshape": pass_static_reshape,
+    "ort_basic": pass_ort_basic,
+    "fusion": pass_fusion,
+    "cancel_transposes": pass_cancel_transposes,
+}
+
+
+def write_report(rows, report_dir):
+    with open(os.path.join(report_dir, "optimization_report.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+    with open(os.path.join(report_dir, "optimization_report.txt"), "w", encoding="utf-8") as f:
+        f.write(f"{'Pass':<18} {'Status':<9} {'Nodes':>7} {'p50 ms':>9} {'Max |diff|':>11} {'Argmax':>8}  Notes\n")
+        f.write("-" * 110 + "\n")
+        for r in rows:
+            latency = f"{r['latency_p50_ms']:.1f}" if r.get("latency_p50_ms") is not None else "-"
+            diff = f"{r['max_abs_diff']:.2e}" if "max_abs_diff" in r else "-"
+            agree = f"{r['argmax_agreement'] * 100:.2f}%" if "argmax_agreement" in r else "-"
+            f.write(f"{r['pass']:<18} {r['status']:<9} {r['nodes']:>7} {latency:>9} {diff:>11} {agree:>8}  {r['note']}\n")
+        f.write("\nOp counts (input -> output):\n")
+        first, last = rows[0]["op_counts"], rows[-1]["op_counts"]
+        for op in sorted(set(first) | set(last), key=lambda o: -max(first.get(o, 0), last.get(o, 0))):
+            f.write(f"  {op:<32} {first.get(op, 0):>6} -> {last.get(op, 0):>6}\n")
+
 
 def run_task_3a():
-    current_file = os.path.abspath(__file__)
-    project_root = os.path.dirname(os.path.dirname(current_file))
-    
-    input_path = os.path.join(project_root, "models", "onnx", "model.onnx")
-    output_path = os.path.join(project_root, "models", "onnx", "optimized_model.onnx")
-    
-    print(f"Starting Graph Optimization on {input_path}...")
-
-    # optimize_model handles the Multi-Head Attention fusions
-    # model_type='bert' is a safe common denominator for Wav2Vec2 architectures
-    optimized_model = optimizer.optimize_model(
-        input_path,
-        model_type='bert', 
-        num_heads=16,      # Wav2Vec2-Large typically has 16 heads
-        hidden_size=1024   # Wav2Vec2-Large hidden size
-    )
-
-    # Save with external data format because it's still > 2GB
-    optimized_model.save_model_to_file(output_path, use_external_data_format=True)
-    print(f"✅ Optimization Complete! Saved to {output_path}")
+    parser = argparse.ArgumentParser(description="Config-driven Wav2Vec2 graph optimization with per-pass checks.")
+    parser.add_argument("--input", default=os.path.join(ONNX_DIR, "model.onnx"))
+    parser.add_argument("--output", default=os.path.join(ONNX_DIR, "optimized_model.onnx"))
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="Checkpoint whose config.json gives the dimensions")
+    parser.add_argument("--passes", nargs="+", default=PASSES, choices=PASSES)
+    parser.add_argument("--atol", type=float, default=1e-2, help="Max |logit diff| a pass may introduce")
+    parser.add_argument("--min-agreement", type=float, default=0.999, help="Min argmax agreement a pass must keep")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per pass output")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    work_dir = os.path.join(os.path.dirname(args.output), "opt_passes")
+    os.makedirs(work_dir, exist_ok=True)
+
+    dims = load_model_config(args.model_dir)
+    print(f"Model config: {dims}")
+    inputs = make_inputs()
+
+    print(f"Starting Graph Optimization on {args.input}...")
+    model = onnx.load(args.input)
+    current = args.input
+    reference, latency = run_model(current, inputs, args.runs, args.threads)
+    original = reference
+    rows = [{"pass": "input", "status": "-", "nodes": len(model.graph.node), "op_counts": op_counts(model),
+             "latency_p50_ms": latency, "note": current}]
+
+    for i, name in enumerate(args.passes):
+        before = onnx.ModelProto()
+        before.CopyFrom(model)
+        fn = PASS_FUNCTIONS[name]
+        try:
+            result, note = fn(model, dims, work_dir) if name == "ort_basic" else fn(model, dims)
+        except Exception as e:
+            result, note = None, f"failed: {e}"
+        if result is None:
+            print(f"  {name:<18} skipped ({note})")
+            rows.append({"pass": name, "status": "skipped", "nodes": len(before.graph.node),
+                         "op_counts": op_counts(before), "note": note})
+            model = before
+            continue
+
+        model = result
+        remove_dead_nodes(model)
+        candidate = os.path.join(work_dir, f"{i:02d}_{name}.onnx")
+        save(model, candidate)
+
+        # Each pass is checked against its own input; a pass that breaks numerics is rolled back
+        outputs, latency = run_model(candidate, inputs, args.runs, args.threads)
+        check = compare(reference, outputs)
+        ok = check["max_abs_diff"] <= args.atol and check["argmax_agreement"] >= args.min_agreement
+        rows.append(dict(check, **{"pass": name, "status": "ok" if ok else "rejected", "nodes": len(model.graph.node),
+                                   "op_counts": op_counts(model), "latency_p50_ms": latency, "note": note}))
+        print(f"  {name:<18} {'ok' if ok else 'REJECTED':<9} nodes {len(model.graph.node):>5} | "
+              f"p50 {latency:8.1f} ms | max|diff| {check['max_abs_diff']:.2e} | {note}")
+        if ok:
+            if current != args.input:
+                remove_model(current)
+            current, reference = candidate, outputs
+        else:
+            remove_model(candidate)
+            model = before
+
+    remove_model(args.output)
+    save(model, args.output)
+    if current != args.input:
+        remove_model(current)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Passes are checked one at a time; also check the end result against the exported graph
+    outputs, latency = run_model(args.output, inputs, args.runs, args.threads)
+    rows.append(dict(compare(original, outputs), **{"pass": "output", "status": "-", "nodes": len(model.graph.node),
+                                                    "op_counts": op_counts(model), "latency_p50_ms": latency,
+                                                    "note": args.output}))
+    write_report(rows, REPORT_DIR)
+    print(f"✅ Optimization Complete! Saved to {args.output} (report in {REPORT_DIR})")
+
 
 if __name__ == "__main__":
-    run_task_3a()
\ No newline at end of file
+    run_task_3a()
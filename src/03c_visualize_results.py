@@ -1,56 +1,69 @@
 import os
-import onnx
 import matplotlib.pyplot as plt
 
+from inference_engine import ARTIFACTS, PROJECT_ROOT
+from onnx_analysis import analyze_model, model_size_mb
+
 def get_model_info(onnx_path):
-    # Get file size (including .data file if it exists)
-    total_size = os.path.getsize(onnx_path)
-    data_path = onnx_path + ".data"
-    if os.path.exists(data_path):
-        total_size += os.path.getsize(data_path)
-    
-    # Get node count
-    model = onnx.load(onnx_path, load_external_data=False)
-    node_count = len(model.graph.node)
-    
-    return total_size / (1024**2), node_count # Size in MB, Count
+    # Size on disk (including the .data file) and graph stats; the summary is cached next to the model
+    summary = analyze_model(onnx_path, with_stats=False)["summary"]
+    return model_size_mb(onnx_path), summary["nodes"], summary["weight_bytes_by_dtype"]
 
 def visualize():
     # 1. Path Setup
-    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    model_dir = os.path.join(root, "models", "onnx")
-    report_dir = os.path.join(root, "reports", "onnx_plots")
+    report_dir = os.path.join(PROJECT_ROOT, "reports", "onnx_plots")
     os.makedirs(report_dir, exist_ok=True)
 
     models = {
-        "Original": os.path.join(model_dir, "model.onnx"),
-        "Optimized": os.path.join(model_dir, "optimized_model.onnx"),
-        "Quantized": os.path.join(model_dir, "quantized_model.onnx")
+        "Original": ARTIFACTS["onnx"][1],
+        "Optimized": ARTIFACTS["onnx_optimized"][1],
+        "Quantized": ARTIFACTS["onnx_quantized"][1],
+        "Static INT8": ARTIFACTS["onnx_static_int8"][1],
+        "Mixed": ARTIFACTS["onnx_mixed"][1],
     }
 
-    names, sizes, nodes = [], [], []
+    names, sizes, nodes, weights = [], [], [], []
 
     print("\n--- Model Optimization Summary ---")
     for name, path in models.items():
         if os.path.exists(path):
-            size_mb, node_cnt = get_model_info(path)
+            size_mb, node_cnt, weight_bytes = get_model_info(path)
             names.append(name)
             sizes.append(size_mb)
             nodes.append(node_cnt)
-            print(f"{name:10} | Size: {size_mb:7.2f} MB | Nodes: {node_cnt}")
+            weights.append(weight_bytes)
+            dtypes = ", ".join(f"{d} {b / 1024 ** 2:.0f} MB" for d, b in weight_bytes.items())
+            print(f"{name:11} | Size: {size_mb:7.2f} MB | Nodes: {node_cnt:5d} | Weights: {dtypes}")
+
+    if not names:
+        print("❌ No ONNX models found. Run the export scripts first.")
+        return
 
     # 2. Plotting Size Comparison
-    plt.figure(figsize=(10, 5))
-    plt.subplot(1, 2, 1)
-    plt.bar(names, sizes, color=['gray', 'blue', 'green'])
+    plt.figure(figsize=(15, 5))
+    plt.subplot(1, 3, 1)
+    plt.bar(names, sizes, color='gray')
     plt.title("Model Size Comparison (MB)")
     plt.ylabel("Size (MB)")
+    plt.xticks(rotation=20)
 
     # 3. Plotting Node Count Comparison
-    plt.subplot(1, 2, 2)
-    plt.bar(names, nodes, color=['gray', 'blue', 'green'])
+    plt.subplot(1, 3, 2)
+    plt.bar(names, nodes, color='blue')
     plt.title("Node Count (Graph Complexity)")
     plt.ylabel("Number of Nodes")
+    plt.xticks(rotation=20)
+
+    # 4. Weight bytes per dtype (what quantization actually converted)
+    plt.subplot(1, 3, 3)
+    bottom = [0.0] * len(names)
+    for dtype in sorted({d for w in weights for d in w}):
+        values = [w.get(dtype, 0) / 1024 ** 2 for w in weights]
+        plt.bar(names, values, bottom=bottom, label=dtype)
+        bottom = [b + v for b, v in zip(bottom, values)]
+    plt.title("Weights by dtype (MB)")
+    plt.legend(fontsize=8)
+    plt.xticks(rotation=20)
 
     plt.tight_layout()
     plot_path = os.path.join(report_dir, "optimization_comparison.png")
@@ -58,4 +71,4 @@ def visualize():
     print(f"\n✅ Visualization saved to {plot_path}")
 
 if __name__ == "__main__":
-    visualize()
\ No newline at end of file
+    visualize()
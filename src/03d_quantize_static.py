@@ -0,0 +1,176 @@
+import os
+import json
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import onnx
+from onnxruntime.quantization import CalibrationMethod, QuantType
+from onnxruntime.quantization.calibrate import create_calibrator
+from onnxruntime.quantization.qdq_quantizer import QDQQuantizer
+from onnxruntime.quantization.quant_utils import load_model_with_shape_infer
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from calibration import WavCalibrationReader
+from evaluation import evaluate_model, load_manifest, transcribe_entries
+from inference_engine import InferenceEngine, ONNX_DIR, PROJECT_ROOT, onnx_input_names
+from graph_passes import ALWAYS_FP32_OPS, group_nodes, nodes_feeding, remove_model
+
+CALIBRATION_METHODS = {
+    "minmax": CalibrationMethod.MinMax,
+    "entropy": CalibrationMethod.Entropy,
+    "percentile": CalibrationMethod.Percentile,
+}
+
+# The MatMul/Conv weights are where the aten::addmm time goes
+OP_TYPES_TO_QUANTIZE = ["MatMul", "Gemm", "Conv"]
+
+
+def calibrate(prep_path, reader, method, work_dir):
+    print(f"Calibrating with {method} on {len(reader)} utterances...")
+    calibrator = create_calibrator(
+        Path(prep_path),
+        OP_TYPES_TO_QUANTIZE,
+        augmented_model_path=os.path.join(work_dir, "augmented_model.onnx"),
+        calibrate_method=CALIBRATION_METHODS[method],
+        use_external_data_format=True,
+    )
+    calibrator.collect_data(reader)
+    tensors_range = calibrator.compute_data()
+    del calibrator
+    return tensors_range
+
+
+def quantize_with_ranges(prep_path, output_path, tensors_range, nodes_to_quantize=None, nodes_to_exclude=None, per_channel=True):
+    # Reuses one calibration for every sensitivity trial instead of re-running quantize_static
+    model = load_model_with_shape_infer(Path(prep_path))
+    quantizer = QDQQuantizer(
+        model,
+        per_channel,
+        False,  # reduce_range
+        QuantType.QInt8,
+        QuantType.QUInt8,
+        tensors_range,
+        nodes_to_quantize or [],
+        nodes_to_exclude or [],
+        OP_TYPES_TO_QUANTIZE,
+        {"DefaultTensorType": onnx.TensorProto.FLOAT},
+    )
+    quantizer.quantize_model()
+    quantizer.model.save_model_to_file(output_path, True)
+
+
+def run_task_3d():
+    parser = argparse.ArgumentParser(description="Static (QDQ) INT8 quantization with WER-driven layer exclusion.")
+    parser.add_argument("--input", default=os.path.join(ONNX_DIR, "optimized_model.onnx"))
+    parser.add_argument("--output", default=os.path.join(ONNX_DIR, "static_quantized_model.onnx"))
+    parser.add_argument("--calibration", required=True, help="Directory of audio files or a manifest")
+    parser.add_argument("--eval-manifest", required=True, help="Manifest used to score WER")
+    parser.add_argument("--method", default="minmax", choices=list(CALIBRATION_METHODS))
+    parser.add_argument("--calib-files", type=int, default=64)
+    parser.add_argument("--calib-seconds", type=float, default=10.0)
+    parser.add_argument("--group-by", default="layer", choices=["layer", "segment", "node"])
+    parser.add_argument("--wer-budget", type=float, default=0.01, help="Allowed absolute WER increase over FP32")
+    parser.add_argument("--max-excluded", type=int, default=8, help="Most groups to keep in FP32")
+    parser.add_argument("--skip-sweep", action="store_true", help="Quantize everything except the nodes feeding ALWAYS_FP32_OPS")
+    args = parser.parse_args()
+
+    report_dir = os.path.join(PROJECT_ROOT, "reports", "quantization")
+    os.makedirs(report_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="static_quant_", dir=os.path.dirname(args.output))
+    prep_path = os.path.join(work_dir, "prep.onnx")
+    trial_path = os.path.join(work_dir, "trial.onnx")
+
+    try:
+        # 1. Same shape-inference "healing" as 03b
+        print("Step 1: Running Shape Inference (fixing missing types)...")
+        quant_pre_process(args.input, prep_path, skip_symbolic_shape=False,
+                          save_as_external_data=True, all_tensors_to_one_file=True)
+        prep_model = onnx.load(prep_path, load_external_data=False)
+        # ALWAYS_FP32_OPS are never quantized themselves; what keeps their input FP32 is excluding
+        # the MatMuls / Convs that feed them
+        always_fp32 = nodes_feeding(prep_model, OP_TYPES_TO_QUANTIZE, ALWAYS_FP32_OPS)
+        groups = group_nodes(prep_model, OP_TYPES_TO_QUANTIZE, args.group_by)
+        del prep_model
+        print(f"{len(always_fp32)} quantizable nodes feed {'/'.join(sorted(ALWAYS_FP32_OPS))} and stay FP32")
+        # The sweep only scores nodes the final model may quantize
+        pinned = set(always_fp32)
+        groups = {g: [n for n in nodes if n not in pinned] for g, nodes in groups.items()}
+        groups = {g: nodes for g, nodes in groups.items() if nodes}
+
+        # 2. One calibration pass, reused by every trial below
+        print("Step 2: Calibration...")
+        reader = WavCalibrationReader(args.calibration, args.calib_files, args.calib_seconds,
+                                      with_attention_mask="attention_mask" in onnx_input_names(args.input))
+        tensors_range = calibrate(prep_path, reader, args.method, work_dir)
+
+        # 3. FP32 baseline (its transcripts stand in for missing references)
+        print("Step 3: FP32 baseline...")
+        entries = load_manifest(args.eval_manifest)
+        references = [text for _, text in entries]
+        if not all(references):
+            baseline_engine = InferenceEngine("onnx", model_path=args.input)
+            references, _ = transcribe_entries(baseline_engine, entries)
+            del baseline_engine
+        baseline = evaluate_model(args.input, entries, references)
+        print(f"FP32 | WER {baseline['wer']*100:.2f}% | p50 {baseline['latency_p50_ms']:.1f} ms")
+
+        # 4. Per-group sensitivity: quantize one group at a time
+        sensitivity = []
+        if not args.skip_sweep:
+            print(f"Step 4: Sensitivity sweep over {len(groups)} groups...")
+            for name, nodes in groups.items():
+                quantize_with_ranges(prep_path, trial_path, tensors_range, nodes_to_quantize=nodes)
+                result = evaluate_model(trial_path, entries, references)
+                result.update({"group": name, "num_nodes": len(nodes), "wer_delta": result["wer"] - baseline["wer"]})
+                sensitivity.append(result)
+                remove_model(trial_path)
+                print(f"  {name:40} | ΔWER {result['wer_delta']*100:+6.2f}%")
+            sensitivity.sort(key=lambda r: r["wer_delta"], reverse=True)
+
+        # 5. Greedily keep the most harmful groups in FP32 until within budget
+        print("Step 5: Building final model...")
+        excluded_groups = []
+        candidates = [r["group"] for r in sensitivity if r["wer_delta"] > 0]
+        while True:
+            excluded = always_fp32 + [n for g in excluded_groups for n in groups[g]]
+            quantize_with_ranges(prep_path, trial_path, tensors_range, nodes_to_exclude=excluded)
+            final = evaluate_model(trial_path, entries, references)
+            final["wer_delta"] = final["wer"] - baseline["wer"]
+            print(f"  FP32 groups {len(excluded_groups):2} | WER {final['wer']*100:.2f}% | p50 {final['latency_p50_ms']:.1f} ms")
+            if final["wer_delta"] <= args.wer_budget or not candidates or len(excluded_groups) >= args.max_excluded:
+                break
+            excluded_groups.append(candidates.pop(0))
+            remove_model(trial_path)
+
+        # Write the chosen configuration straight to the output path
+        remove_model(trial_path)
+        remove_model(args.output)
+        quantize_with_ranges(prep_path, args.output, tensors_range, nodes_to_exclude=excluded)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "input": args.input,
+        "output": args.output,
+        "calibration_method": args.method,
+        "fp32": baseline,
+        "int8": final,
+        "speedup": baseline["latency_p50_ms"] / final["latency_p50_ms"],
+        "fp32_groups": excluded_groups,
+        "always_fp32_ops": sorted(ALWAYS_FP32_OPS),
+        "always_fp32_nodes": always_fp32,
+        "sensitivity": sensitivity,
+    }
+    report_path = os.path.join(report_dir, "static_quant_report.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n✅ Static Quantization Complete! Saved to {args.output}")
+    print(f"FP32 WER {baseline['wer']*100:.2f}% -> INT8 WER {final['wer']*100:.2f}% | "
+          f"speedup {report['speedup']:.2f}x | report: {report_path}")
+
+
+if __name__ == "__main__":
+    run_task_3d()
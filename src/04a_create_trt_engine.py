@@ -1,6 +1,9 @@
 import os
+import json
 import tensorrt as trt
 
+SAMPLE_RATE = 16000
+
 def build_engine():
     # 1. Path Setup
     root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -29,13 +32,36 @@ def build_engine():
         config.set_flag(trt.BuilderFlag.FP16)
         print("FP16 optimization enabled.")
     
+    # One optimization profile per length bucket (04d_shape_profiles.py), so no input falls
+    # outside every profile and runs silently on the wrong shape ("Ghost Speedup")
+    profile_path = os.path.join(root, "models", "shape_profiles.json")
+    buckets_s, batch_size = [2.0, 5.0, 10.0, 20.0, 30.0], 1
+    if os.path.exists(profile_path):
+        with open(profile_path) as f:
+            saved = json.load(f)
+        buckets_s, batch_size = saved["buckets_s"], saved["batch_size"]
+    # input_values and, for 02a exports, attention_mask: both (batch, samples)
+    input_names = [network.get_input(i).name for i in range(network.num_inputs)]
+    lower = 400  # shortest input the conv feature encoder accepts
+    for edge in sorted(buckets_s):
+        upper = int(edge * SAMPLE_RATE)
+        profile = builder.create_optimization_profile()
+        for input_name in input_names:
+            profile.set_shape(input_name, (1, lower), (batch_size, upper), (batch_size, upper))
+        config.add_optimization_profile(profile)
+        print(f"Profile: {lower / SAMPLE_RATE:.2f}s - {upper / SAMPLE_RATE:.2f}s, batch <= {batch_size}")
+        lower = upper + 1
+
     # Set memory limit for the build process (e.g., 2GB)
     config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, 2 * 1024 * 1024 * 1024)
 
     # 5. Build and Save
     print("Building TensorRT engine... (This can take 5-10 minutes)")
     serialized_engine = builder.build_serialized_network(network, config)
-    
+    if serialized_engine is None:
+        print("❌ TensorRT engine build failed (see the builder log above)")
+        return
+
     with open(engine_path, 'wb') as f:
         f.write(serialized_engine)
     
@@ -1,29 +1,40 @@
 import os
-import openvino as ov
+import time
+import argparse
+
+from engine_cache import CACHE_DIR, EngineCache
+from inference_engine import OpenVINOBackend
+
 
 def compile_for_cpu():
+    parser = argparse.ArgumentParser(description="Compile the OpenVINO IR for this CPU and store the blob in the engine cache.")
+    parser.add_argument("--precision", default=None, choices=["f32", "bf16", "f16"], help="INFERENCE_PRECISION_HINT")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="Always recompile")
+    args = parser.parse_args()
+
     # 1. Path Setup
     root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     model_xml = os.path.join(root, "models", "openvino", "model.xml")
-    
+
     if not os.path.exists(model_xml):
         print("❌ Error: OpenVINO model.xml not found. Run 02b first.")
         return
 
-    # 2. Initialize Core
-    core = ov.Core()
-    
-    # 3. Read and Compile
-    print("Reading OpenVINO IR...")
-    model = core.read_model(model=model_xml)
-    
+    # 2. Compile, or import the blob a previous run exported for this host
+    config = {"INFERENCE_PRECISION_HINT": args.precision} if args.precision else None
+    cache = None if args.no_cache else EngineCache(args.cache_dir)
+
     print("Compiling model for CPU... (Optimizing for your local architecture)")
-    # This step is the CPU equivalent of creating a TensorRT engine
-    compiled_model = core.compile_model(model=model, device_name="CPU")
-    
-    # 4. Verification
-    print("✅ CPU Engine/Compiled Model is ready.")
-    print(f"Inference Precision: {core.get_property('CPU', 'OPTIMIZATION_CAPABILITIES')}")
+    start = time.perf_counter()
+    backend = OpenVINOBackend(model_xml, config=config, cache=cache)
+    elapsed = time.perf_counter() - start
+
+    # 3. Verification
+    source = "loaded from cache" if backend.cache_hit else "compiled"
+    print(f"✅ CPU Engine/Compiled Model is ready ({source} in {elapsed:.2f}s).")
+    print(f"Inference Precision: {backend.core.get_property('CPU', 'OPTIMIZATION_CAPABILITIES')}")
+
 
 if __name__ == "__main__":
-    compile_for_cpu()
\ No newline at end of file
+    compile_for_cpu()
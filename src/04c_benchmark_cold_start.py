@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import multiprocessing as mp
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+
+
+def start_engine(artifact, cache_dir, num_threads, queue):
+    # Fresh process per measurement, so nothing is warm except what's on disk
+    start = time.perf_counter()
+    import numpy as np
+    from engine_cache import EngineCache
+    from inference_engine import InferenceEngine, SAMPLE_RATE
+    import_s = time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        cache = EngineCache(cache_dir) if cache_dir else None
+        engine = InferenceEngine(artifact, num_threads=num_threads, warmup=False, cache=cache)
+        load_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        engine.batch_logits(np.zeros((1, SAMPLE_RATE), dtype=np.float32))
+        first_s = time.perf_counter() - start
+    except Exception as e:
+        queue.put({"error": str(e)})
+        return
+
+    queue.put({
+        "import_s": import_s,
+        "load_s": load_s,
+        "first_inference_s": first_s,
+        "ready_s": load_s + first_s,
+        "cache_hit": getattr(engine.backend, "cache_hit", False),
+    })
+
+
+def measure(ctx, artifact, cache_dir, num_threads, timeout):
+    queue = ctx.Queue()
+    proc = ctx.Process(target=start_engine, args=(artifact, cache_dir, num_threads, queue))
+    proc.start()
+    try:
+        result = queue.get(timeout=timeout)
+    except Exception:
+        proc.terminate()
+        result = {"error": f"worker exited with code {proc.exitcode} or timed out"}
+    proc.join()
+    return result
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Cold vs warm (cached) engine startup, each in a fresh process.")
+    parser.add_argument("--artifacts", nargs="+", default=["onnx_optimized", "onnx_quantized", "openvino"],
+                        choices=[a for a, (backend, _) in ARTIFACTS.items() if backend != "pytorch"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=1800)
+    parser.add_argument("--cache-dir", default=os.path.join(PROJECT_ROOT, "models", "cache_benchmark"),
+                        help="Scratch cache, wiped before each artifact")
+    parser.add_argument("--output", default=os.path.join(REPORT_DIR, "cold_start.json"))
+    args = parser.parse_args()
+
+    print("\n--- COLD START BENCHMARK ---")
+    ctx = mp.get_context("spawn")
+    report = {"config": vars(args), "artifacts": []}
+    for artifact in args.artifacts:
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        runs = {
+            # no cache at all, today's behaviour
+            "uncached": [measure(ctx, artifact, None, args.threads, args.timeout) for _ in range(args.repeats)],
+            # first start with a cache: compile + export the blob
+            "populate": [measure(ctx, artifact, args.cache_dir, args.threads, args.timeout)],
+            # every later start
+            "warm": [measure(ctx, artifact, args.cache_dir, args.threads, args.timeout) for _ in range(args.repeats)],
+        }
+        errors = [r["error"] for rs in runs.values() for r in rs if "error" in r]
+        if errors:
+            print(f"⚠️ Skipping {artifact}: {errors[0]}")
+            report["artifacts"].append({"artifact": artifact, "error": errors[0]})
+            continue
+
+        summary = {name: {k: min(r[k] for r in rs) for k in ("load_s", "first_inference_s", "ready_s")}
+                   for name, rs in runs.items()}
+        speedup = summary["uncached"]["ready_s"] / summary["warm"]["ready_s"]
+        report["artifacts"].append({"artifact": artifact, "summary": summary, "speedup": speedup, "runs": runs,
+                                    "warm_hits": all(r["cache_hit"] for r in runs["warm"])})
+        print(f"  {artifact:15} | cold {summary['uncached']['ready_s']:7.2f}s | populate {summary['populate']['ready_s']:7.2f}s "
+              f"| warm {summary['warm']['ready_s']:7.2f}s | {speedup:.1f}x")
+    shutil.rmtree(args.cache_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Cold start report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
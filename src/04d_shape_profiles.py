@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+from calibration import list_audio
+from inference_engine import ARTIFACTS, PROJECT_ROOT, InferenceEngine, load_audio
+from shape_profiles import choose_buckets, expected_padding_waste
+
+PROFILE_PATH = os.path.join(PROJECT_ROOT, "models", "shape_profiles.json")
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "shape_profiles")
+
+
+def audio_duration(path):
+    # Header only where possible; decoding a whole corpus just for lengths is slow
+    try:
+        import soundfile as sf
+        return sf.info(path).duration
+    except Exception:
+        import librosa
+        return librosa.get_duration(path=path)
+
+
+def plot_histogram(durations, buckets, report_dir):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 5))
+    plt.hist(durations, bins=60, color="#4e79a7", alpha=0.8)
+    for edge in buckets:
+        plt.axvline(x=edge, color="#e15759", linestyle="--")
+    plt.title("Corpus Duration Histogram and Chosen Shape Buckets")
+    plt.xlabel("Duration (s)")
+    plt.ylabel("Utterances")
+    plt.tight_layout()
+    plt.savefig(os.path.join(report_dir, "duration_buckets.png"))
+    plt.close()
+
+
+def run_shape_profiles():
+    parser = argparse.ArgumentParser(description="Pick length buckets from a corpus and benchmark one static model per bucket.")
+    parser.add_argument("--audio", required=True, help="Directory of audio or a manifest")
+    parser.add_argument("--artifact", default="onnx_optimized",
+                        choices=[a for a, (backend, _) in ARTIFACTS.items() if backend != "pytorch"])
+    parser.add_argument("--num-buckets", type=int, default=4)
+    parser.add_argument("--step", type=float, default=0.5, help="Bucket edges are multiples of this (seconds)")
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="Longer audio is chunked, not bucketed")
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max-files", type=int, default=200, help="Files to run through the benchmark")
+    parser.add_argument("--skip-benchmark", action="store_true")
+    parser.add_argument("--output", default=PROFILE_PATH)
+    args = parser.parse_args()
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+
+    # 1. Duration histogram -> buckets
+    files = list_audio(args.audio)
+    durations = np.array([audio_duration(p) for p in files])
+    buckets = choose_buckets(durations, args.num_buckets, args.step, args.max_seconds)
+    waste, too_long = expected_padding_waste(durations, buckets)
+    print(f"{len(files)} files, {durations.sum() / 3600:.2f} h | buckets (s): {buckets}")
+    print(f"Expected padding waste {waste * 100:.1f}% | {too_long} files longer than the largest bucket")
+
+    with open(args.output, "w") as f:
+        json.dump({"buckets_s": buckets, "batch_size": args.batch_size, "source": args.audio,
+                   "num_files": len(files), "expected_padding_waste": waste}, f, indent=2)
+    plot_histogram(durations, buckets, REPORT_DIR)
+
+    report = {"buckets_s": buckets, "expected_padding_waste": waste, "too_long": too_long,
+              "durations": {"p50": float(np.percentile(durations, 50)), "p95": float(np.percentile(durations, 95)),
+                            "max": float(durations.max())}}
+
+    # 2. Bucketed static models vs the single dynamic-shape model on the same files
+    if not args.skip_benchmark:
+        sample = files[:args.max_files]
+        bucketed = InferenceEngine(args.artifact, num_threads=args.threads, shape_buckets=buckets,
+                                   profile_batch_size=args.batch_size)
+        dynamic = InferenceEngine(args.artifact, num_threads=args.threads)
+        bucketed.backend.reset_stats()
+
+        dynamic_ms, mismatches = [], 0
+        for path in sample:
+            audio = load_audio(path)
+            try:
+                logits = bucketed.logits(audio)
+            except ValueError as e:
+                print(f"  refused {os.path.basename(path)}: {e}")
+                continue
+            start = time.perf_counter()
+            reference = dynamic.logits(audio)
+            dynamic_ms.append((time.perf_counter() - start) * 1000)
+            mismatches += int((logits.argmax(-1) != reference.argmax(-1)).any())
+
+        report["benchmark"] = dict(bucketed.backend.report(), artifact=args.artifact,
+                                   dynamic_latency_mean_ms=float(np.mean(dynamic_ms)) if dynamic_ms else None,
+                                   transcript_mismatches=mismatches)
+        for row in report["benchmark"]["buckets"]:
+            if row["calls"]:
+                print(f"  {row['bucket_s']:5.1f}s | {row['utterances']:4} utt | padding {row['padding_waste'] * 100:5.1f}% "
+                      f"| p50 {row['latency_p50_ms']:8.1f} ms")
+
+    with open(os.path.join(REPORT_DIR, "shape_profile_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Shape profiles saved to {args.output} (report in {REPORT_DIR})")
+
+
+if __name__ == "__main__":
+    run_shape_profiles()
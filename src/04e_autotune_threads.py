@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import argparse
+import threading
+import multiprocessing as mp
+
+import numpy as np
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE
+from runtime_profiles import PROFILE_PATH, save_runtime_profile
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+
+
+def available_cpus():
+    return sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+
+
+def candidate(name, workers, clients, num_threads, cpus, backend_kwargs):
+    return {"name": name, "workers": workers, "clients": clients, "num_threads": num_threads, "cpus": cpus,
+            "backend_kwargs": backend_kwargs}
+
+
+def latency_candidates(backend, cpus):
+    counts = sorted({t for t in (1, 2, 4, 8, 16, 32, 64) if t <= len(cpus)} | {len(cpus)})
+    out = [candidate("default", 1, 1, None, None, {})]
+    for t in counts:
+        for pin in (False, True):
+            cores = cpus[:t] if pin else None
+            tag = f"t{t}{'_pinned' if pin else ''}"
+            if backend == "onnxruntime":
+                out.append(candidate(tag, 1, 1, t, cores, {}))
+                out.append(candidate(f"{tag}_inter2", 1, 1, t, cores, {"inter_op_threads": 2}))
+            else:
+                out.append(candidate(tag, 1, 1, t, cores, {"config": {"PERFORMANCE_HINT": "LATENCY"}}))
+    return out
+
+
+def throughput_candidates(backend, cpus, workers):
+    # What several workers per box get today: every worker grabs every core
+    out = [candidate(f"default_x{workers}", workers, 1, None, None, {})]
+    per_worker = max(len(cpus) // workers, 1)
+    for t in sorted({t for t in (1, 2, 4, 8, 16) if t <= per_worker} | {per_worker}):
+        for pin in (False, True) if t * workers <= len(cpus) else (False,):
+            cores = [cpus[i * t:(i + 1) * t] for i in range(workers)] if pin else None
+            tag = f"x{workers}_t{t}{'_pinned' if pin else ''}"
+            if backend == "onnxruntime":
+                out.append(candidate(tag, workers, 1, t, cores, {}))
+                # Idle pool threads spinning steal cycles from the other workers
+                out.append(candidate(f"{tag}_nospin", workers, 1, t, cores,
+                                     {"session_config": {"session.intra_op.allow_spinning": "0"}}))
+            else:
+                out.append(candidate(tag, workers, 1, t, cores,
+                                     {"config": {"PERFORMANCE_HINT": "LATENCY", "NUM_STREAMS": 1}}))
+    if backend == "openvino":
+        # One process, OpenVINO splits the cores into streams and serves concurrent requests itself
+        for streams in sorted({workers, max(workers // 2, 1)}):
+            out.append(candidate(f"1proc_streams{streams}", 1, workers, None, None,
+                                 {"config": {"PERFORMANCE_HINT": "THROUGHPUT", "NUM_STREAMS": streams}}))
+    return out
+
+
+def worker(artifact, cand, index, input_values, iterations, barrier, queue):
+    cores = cand["cpus"][index] if cand["cpus"] and isinstance(cand["cpus"][0], list) else cand["cpus"]
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    if cand["num_threads"]:
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(cand["num_threads"])
+
+    from inference_engine import InferenceEngine
+
+    try:
+        engine = InferenceEngine(artifact, num_threads=cand["num_threads"], runtime_profile=None,
+                                 **cand["backend_kwargs"])
+        engine.batch_logits(input_values)
+    except Exception as e:
+        barrier.abort()
+        queue.put({"error": str(e)})
+        return
+
+    latencies = []
+
+    def client():
+        for _ in range(iterations):
+            start = time.perf_counter()
+            engine.batch_logits(input_values)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        queue.put({"error": "another worker failed"})
+        return
+    start = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(cand["clients"])]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    queue.put({"latencies_ms": latencies, "wall_s": time.perf_counter() - start})
+
+
+def measure(ctx, artifact, cand, input_values, iterations, timeout):
+    barrier, queue = ctx.Barrier(cand["workers"]), ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(artifact, cand, i, input_values, iterations, barrier, queue))
+             for i in range(cand["workers"])]
+    for p in procs:
+        p.start()
+    results = []
+    try:
+        for _ in procs:
+            results.append(queue.get(timeout=timeout))
+    except Exception:
+        results.append({"error": "timed out"})
+    failed = any("error" in r for r in results)
+    for p in procs:
+        if failed and p.is_alive():
+            p.terminate()
+        p.join()
+
+    errors = [r["error"] for r in results if "error" in r]
+    if errors:
+        return {"error": errors[0]}
+    latencies = np.concatenate([r["latencies_ms"] for r in results])
+    wall = max(r["wall_s"] for r in results)
+    audio_s = input_values.shape[1] / SAMPLE_RATE
+    return {
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "throughput_audio_s_per_s": len(latencies) * audio_s / wall,
+        "throughput_utt_per_s": len(latencies) / wall,
+    }
+
+
+def run_autotune():
+    parser = argparse.ArgumentParser(description="Search threads / streams / pinning for one artifact and save the best.")
+    parser.add_argument("--artifact", default="onnx_optimized",
+                        choices=[a for a, (backend, _) in ARTIFACTS.items() if backend != "pytorch"])
+    parser.add_argument("--modes", nargs="+", default=["latency", "throughput"], choices=["latency", "throughput"])
+    parser.add_argument("--input-seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=max(os.cpu_count() // 4, 2), help="Concurrency for throughput mode")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per client")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="Throughput mode: latency SLO to respect")
+    parser.add_argument("--timeout", type=float, default=1800)
+    parser.add_argument("--audio", default=SAMPLE_AUDIO)
+    parser.add_argument("--profile", default=PROFILE_PATH)
+    args = parser.parse_args()
+
+    from inference_engine import load_audio, normalize
+
+    backend = ARTIFACTS[args.artifact][0]
+    cpus = available_cpus()
+    clip = normalize(np.resize(load_audio(args.audio), int(args.input_seconds * SAMPLE_RATE)))[None, :]
+    ctx = mp.get_context("spawn")
+    report = {"artifact": args.artifact, "cpus": cpus, "input_seconds": args.input_seconds, "modes": {}}
+
+    for mode in args.modes:
+        cands = latency_candidates(backend, cpus) if mode == "latency" else throughput_candidates(backend, cpus, args.workers)
+        print(f"\n--- {mode.upper()} MODE: {len(cands)} candidates ---")
+        trials = []
+        for cand in cands:
+            result = measure(ctx, args.artifact, cand, clip, args.iterations, args.timeout)
+            trials.append(dict(cand, **result))
+            if "error" in result:
+                print(f"  {cand['name']:28} | failed: {result['error']}")
+                continue
+            print(f"  {cand['name']:28} | p50 {result['latency_p50_ms']:8.1f} ms | p95 {result['latency_p95_ms']:8.1f} ms "
+                  f"| {result['throughput_audio_s_per_s']:7.1f} audio-s/s")
+
+        ok = [t for t in trials if "error" not in t]
+        if mode == "throughput" and args.max_p95_ms:
+            ok = [t for t in ok if t["latency_p95_ms"] <= args.max_p95_ms]
+        if not ok:
+            print(f"⚠️ No usable {mode} candidate")
+            continue
+        if mode == "latency":
+            best = min(ok, key=lambda t: t["latency_p50_ms"])
+        else:
+            best = max(ok, key=lambda t: t["throughput_audio_s_per_s"])
+        default = trials[0]
+
+        save_runtime_profile(args.artifact, mode, {k: best[k] for k in (
+            "name", "workers", "clients", "num_threads", "cpus", "backend_kwargs",
+            "latency_p50_ms", "latency_p95_ms", "throughput_audio_s_per_s")}, args.profile)
+        report["modes"][mode] = {"best": best["name"], "default": default, "trials": trials}
+        print(f"✅ Best {mode}: {best['name']}"
+              + (f" (default: p50 {default['latency_p50_ms']:.1f} ms, {default['throughput_audio_s_per_s']:.1f} audio-s/s)"
+                 if "error" not in default else ""))
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f"autotune_{args.artifact}.json")
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nProfile: {args.profile} | Report: {report_path}")
+
+
+if __name__ == "__main__":
+    run_autotune()
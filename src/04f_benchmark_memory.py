@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import argparse
+import multiprocessing as mp
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT
+from shared_weights import memory_usage, preload, weight_files
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+# private: every worker loads its own copy (today). mmap: spawned workers map the weight file.
+# prefork: the parent maps and pre-reads the weights, then forks the workers (prefork_server.py)
+MODES = {"private": ("spawn", False), "mmap": ("spawn", True), "prefork": ("fork", True)}
+
+
+def mem_available_mb():
+    with open("/proc/meminfo") as f:
+        for line in f:
+            if line.startswith("MemAvailable:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def worker(artifact, model_path, mmap_weights, num_threads, launched, queue, stop):
+    import numpy as np
+    from inference_engine import InferenceEngine, SAMPLE_RATE
+
+    try:
+        kwargs = {"mmap_weights": True} if mmap_weights else {}
+        engine = InferenceEngine(artifact, model_path=model_path, num_threads=num_threads, warmup=False,
+                                 runtime_profile=None, **kwargs)
+        engine.batch_logits(np.zeros((1, 5 * SAMPLE_RATE), dtype=np.float32))
+    except Exception as e:
+        queue.put({"error": str(e)})
+        return
+    queue.put({"pid": os.getpid(), "ready_s": time.time() - launched})
+    # Stay alive until every worker is up and measured
+    stop.wait()
+
+
+def measure(mode, artifact, model_path, workers, num_threads, timeout):
+    method, mmap_weights = MODES[mode]
+    ctx = mp.get_context(method)
+    maps = preload(model_path) if mode == "prefork" else []
+    queue, stop = ctx.Queue(), ctx.Event()
+    available_before = mem_available_mb()
+    launched = time.time()
+    procs = [ctx.Process(target=worker, args=(artifact, model_path, mmap_weights, num_threads, launched, queue, stop))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+
+    results = []
+    try:
+        for _ in procs:
+            results.append(queue.get(timeout=timeout))
+    except Exception:
+        results.append({"error": "timed out"})
+    all_ready_s = time.time() - launched
+
+    errors = [r["error"] for r in results if "error" in r]
+    usage = [] if errors else [memory_usage(r["pid"]) for r in results]
+    available_after = mem_available_mb()
+    stop.set()
+    for p in procs:
+        p.join(timeout=30)
+        if p.is_alive():
+            p.terminate()
+    del maps
+    if errors:
+        return {"mode": mode, "workers": workers, "error": errors[0]}
+
+    def mean(key):
+        return sum(u[key] for u in usage) / len(usage)
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "threads_per_worker": num_threads,
+        "per_worker_rss_mb": mean("rss_mb"),
+        "per_worker_pss_mb": mean("pss_mb"),
+        "per_worker_private_mb": mean("private_clean_mb") + mean("private_dirty_mb"),
+        "per_worker_shared_mb": mean("shared_clean_mb") + mean("shared_dirty_mb"),
+        # Pss shares each page between the processes mapping it: the sum is what the node pays
+        "node_total_pss_mb": sum(u["pss_mb"] for u in usage),
+        "node_total_rss_mb": sum(u["rss_mb"] for u in usage),
+        "mem_available_drop_mb": available_before - available_after,
+        "cold_start_mean_s": sum(r["ready_s"] for r in results) / len(results),
+        "cold_start_max_s": max(r["ready_s"] for r in results),
+        "all_ready_s": all_ready_s,
+    }
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Per-worker RSS, node memory and cold start for N inference workers.")
+    parser.add_argument("--artifact", default="onnx_optimized",
+                        choices=[a for a, (backend, _) in ARTIFACTS.items() if backend != "pytorch"])
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--threads", type=int, default=None, help="Per worker (default: cores / workers)")
+    parser.add_argument("--timeout", type=float, default=1800)
+    parser.add_argument("--output", default=os.path.join(REPORT_DIR, "memory_sharing.json"))
+    args = parser.parse_args()
+
+    model_path = args.model_path or ARTIFACTS[args.artifact][1]
+    weights_mb = sum(os.path.getsize(p) for p in weight_files(model_path)) / 1024 ** 2
+    print(f"\n--- MEMORY SHARING BENCHMARK: {args.artifact} ({weights_mb:.0f} MB of weights) ---")
+
+    rows = []
+    for workers in args.workers:
+        threads = args.threads or max((os.cpu_count() or 1) // workers, 1)
+        for mode in args.modes:
+            available = mem_available_mb()
+            if mode == "private" and available is not None and workers * weights_mb > 0.9 * available:
+                print(f"  {mode:8} x{workers:<3} | skipped: {workers} private copies would not fit in {available:.0f} MB")
+                rows.append({"mode": mode, "workers": workers, "error": "skipped, not enough memory"})
+                continue
+            row = measure(mode, args.artifact, model_path, workers, threads, args.timeout)
+            rows.append(row)
+            if "error" in row:
+                print(f"  {mode:8} x{workers:<3} | failed: {row['error']}")
+                continue
+            print(f"  {mode:8} x{workers:<3} | RSS/worker {row['per_worker_rss_mb']:7.0f} MB "
+                  f"| PSS/worker {row['per_worker_pss_mb']:7.0f} MB | node {row['node_total_pss_mb']:8.0f} MB "
+                  f"| cold start {row['cold_start_mean_s']:5.1f}s (all ready {row['all_ready_s']:5.1f}s)")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"config": vars(args), "weights_mb": weights_mb, "cpu_count": os.cpu_count(), "results": rows}, f,
+                  indent=2)
+    print(f"\n✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import multiprocessing as mp
+import numpy as np
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+PLOT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmark_plots")
+
+
+def percentile_summary(latencies_ms):
+    lat = np.asarray(latencies_ms)
+    return {
+        "mean_ms": float(lat.mean()),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "std_ms": float(lat.std()),
+    }
+
+
+def peak_rss_mb():
+    import resource
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def make_input(speech, seconds, batch_size):
+    # Tile real speech to the target length so every backend sees the same signal
+    from inference_engine import normalize
+    clip = normalize(np.resize(speech, int(seconds * SAMPLE_RATE)))
+    return np.ascontiguousarray(np.repeat(clip[None, :], batch_size, axis=0))
+
+
+def benchmark_artifact(artifact, config, queue):
+    # Runs in its own process so peak RSS and thread pools don't leak across artifacts
+    threads = config["threads"]
+    if threads:
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(threads)
+    if config["cpus"] and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, config["cpus"])
+
+    from inference_engine import InferenceEngine, load_audio
+
+    try:
+        start = time.perf_counter()
+        engine = InferenceEngine(artifact, num_threads=threads, warmup=False)
+        load_s = time.perf_counter() - start
+    except Exception as e:
+        queue.put({"artifact": artifact, "error": str(e)})
+        return
+
+    speech = load_audio(config["audio"])
+    results = []
+    for seconds in config["durations"]:
+        for batch_size in config["batch_sizes"]:
+            input_values = make_input(speech, seconds, batch_size)
+            for _ in range(config["warmup"]):
+                engine.batch_logits(input_values)
+
+            latencies = []
+            for _ in range(config["trials"]):
+                start = time.perf_counter()
+                engine.batch_logits(input_values)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            stats = percentile_summary(latencies)
+            audio_s = seconds * batch_size
+            stats.update({
+                "duration_s": seconds,
+                "batch_size": batch_size,
+                "rtf": stats["p50_ms"] / 1000 / audio_s,
+                "throughput_audio_s_per_s": audio_s / (stats["p50_ms"] / 1000),
+                "throughput_utt_per_s": batch_size / (stats["p50_ms"] / 1000),
+            })
+            results.append(stats)
+            print(f"  {artifact:15} | {seconds:4.1f}s x{batch_size:<2} | p50 {stats['p50_ms']:8.2f} ms "
+                  f"| p99 {stats['p99_ms']:8.2f} ms | RTF {stats['rtf']:.3f}")
+
+    queue.put({
+        "artifact": artifact,
+        "model_path": engine.model_path,
+        "load_time_s": load_s,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    })
+
+
+def plot_results(report, plot_dir):
+    import matplotlib.pyplot as plt
+
+    os.makedirs(plot_dir, exist_ok=True)
+    ok = [r for r in report["artifacts"] if "results" in r]
+    batch = min(report["config"]["batch_sizes"])
+
+    # 1. Latency vs input length (batch = smallest)
+    plt.figure(figsize=(10, 6))
+    for r in ok:
+        rows = [x for x in r["results"] if x["batch_size"] == batch]
+        plt.plot([x["duration_s"] for x in rows], [x["p50_ms"] for x in rows], marker="o", label=r["artifact"])
+    plt.title(f"CPU p50 Latency vs Input Length (batch={batch})")
+    plt.xlabel("Audio length (s)")
+    plt.ylabel("Latency (ms)")
+    plt.legend()
+    plt.grid(alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(os.path.join(plot_dir, "latency_vs_length.png"))
+    plt.close()
+
+    # 2. Real-time factor + peak RSS per artifact
+    names = [r["artifact"] for r in ok]
+    rtf = [np.mean([x["rtf"] for x in r["results"]]) for r in ok]
+    rss = [r["peak_rss_mb"] for r in ok]
+    plt.figure(figsize=(12, 5))
+    plt.subplot(1, 2, 1)
+    plt.bar(names, rtf, color="#4e79a7")
+    plt.title("Mean Real-Time Factor (lower is better)")
+    plt.xticks(rotation=30, ha="right")
+    plt.subplot(1, 2, 2)
+    plt.bar(names, rss, color="#e15759")
+    plt.title("Peak RSS (MB)")
+    plt.xticks(rotation=30, ha="right")
+    plt.tight_layout()
+    plt.savefig(os.path.join(plot_dir, "rtf_and_memory.png"))
+    plt.close()
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="CPU latency/throughput sweep across all exported artifacts.")
+    parser.add_argument("--artifacts", nargs="+", default=list(ARTIFACTS), choices=list(ARTIFACTS))
+    parser.add_argument("--durations", nargs="+", type=float, default=[1, 5, 10, 20, 30])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--cpus", nargs="+", type=int, default=None, help="Pin the benchmark to these cores")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--audio", default=SAMPLE_AUDIO)
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds to wait per artifact")
+    parser.add_argument("--output", default=os.path.join(REPORT_DIR, "cpu_benchmark.json"))
+    args = parser.parse_args()
+
+    config = {
+        "durations": args.durations,
+        "batch_sizes": args.batch_sizes,
+        "threads": args.threads,
+        "cpus": args.cpus,
+        "warmup": args.warmup,
+        "trials": args.trials,
+        "audio": args.audio,
+    }
+
+    print("\n--- CPU BENCHMARK ---")
+    ctx = mp.get_context("spawn")
+    artifacts = []
+    for artifact in args.artifacts:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=benchmark_artifact, args=(artifact, config, queue))
+        proc.start()
+        try:
+            result = queue.get(timeout=args.timeout)
+        except Exception:
+            proc.terminate()
+            result = {"artifact": artifact, "error": f"worker exited with code {proc.exitcode} or timed out"}
+        proc.join()
+        if "error" in result:
+            print(f"⚠️ Skipping {artifact}: {result['error']}")
+        artifacts.append(result)
+
+    report = {
+        "host": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "config": config,
+        "artifacts": artifacts,
+    }
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    plot_results(report, PLOT_DIR)
+    print(f"\n✅ Benchmark saved to {args.output} (plots in {PLOT_DIR})")
+
+
+if __name__ == "__main__":
+    run_benchmark()
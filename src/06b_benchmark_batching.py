@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, get_engine, load_audio, normalize, num_frames
+from batching_server import BatchingServer
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+PLOT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmark_plots")
+
+
+def make_workload(speech, num_requests, min_s, max_s, seed):
+    # Short utterances cut from real speech at random lengths/offsets
+    rng = np.random.default_rng(seed)
+    speech = np.resize(speech, int(max_s * SAMPLE_RATE) * 2)
+    clips = []
+    for _ in range(num_requests):
+        length = int(rng.uniform(min_s, max_s) * SAMPLE_RATE)
+        offset = rng.integers(0, len(speech) - length)
+        clips.append(speech[offset:offset + length])
+    return clips
+
+
+def check_batched_logits(engine, clips, batch_size, atol):
+    """Padded batch of different-length clips vs each clip run alone: batching must not change the logits."""
+    if not engine.accepts_attention_mask:
+        # The server only batches equal-length requests for this model, which need no mask
+        return {"checked": False, "reason": "model has no attention_mask input: equal-length batches only"}
+    inputs = [normalize(c) for c in clips[:batch_size]]
+    lengths = np.array([len(x) for x in inputs])
+    input_values = np.zeros((len(inputs), lengths.max()), dtype=np.float32)
+    attention_mask = np.zeros(input_values.shape, dtype=np.int64)
+    for i, x in enumerate(inputs):
+        input_values[i, :len(x)] = x
+        attention_mask[i, :len(x)] = 1
+    batched = engine.batch_logits(input_values, attention_mask)
+
+    max_diff, agree, frames = 0.0, 0, 0
+    for i, (x, n) in enumerate(zip(inputs, num_frames(lengths))):
+        alone = engine.batch_logits(x[None])[0]
+        n = min(n, len(alone))
+        max_diff = max(max_diff, float(np.abs(batched[i, :n] - alone[:n]).max()))
+        agree += int((batched[i, :n].argmax(-1) == alone[:n].argmax(-1)).sum())
+        frames += n
+    return {"checked": True, "batch_size": len(inputs), "max_abs_diff": max_diff,
+            "argmax_agreement": agree / frames, "passed": max_diff <= atol and agree == frames}
+
+
+def run_load(engine, clips, rate, window_ms, bucket_s, max_batch, seed):
+    # Open-loop Poisson arrivals at `rate` requests/s
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(1.0 / rate, size=len(clips))
+    latencies = []
+
+    with BatchingServer(engine, max_batch, window_ms, bucket_s) as server:
+        start = time.perf_counter()
+        pending = []
+        for clip, gap in zip(clips, gaps):
+            time.sleep(gap)
+            sent = time.perf_counter()
+            future = server.submit(clip)
+            future.add_done_callback(lambda f, sent=sent: latencies.append((time.perf_counter() - sent) * 1000))
+            pending.append(future)
+        for future in pending:
+            future.result()
+        wall = time.perf_counter() - start
+        batches = list(server.batch_log)
+
+    lat = np.asarray(latencies)
+    return {
+        "batch_window_ms": window_ms,
+        "bucket_width_s": bucket_s,
+        "throughput_utt_per_s": len(clips) / wall,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "mean_batch_size": float(np.mean([b["batch_size"] for b in batches])),
+        "mean_padding_ratio": float(np.mean([b["padding_ratio"] for b in batches])),
+        "num_batches": len(batches),
+    }
+
+
+def plot_results(rows, buckets, plot_dir):
+    import matplotlib.pyplot as plt
+
+    os.makedirs(plot_dir, exist_ok=True)
+    plt.figure(figsize=(12, 5))
+    for idx, (key, title) in enumerate([("throughput_utt_per_s", "Throughput (utt/s)"), ("p99_ms", "p99 Latency (ms)")]):
+        plt.subplot(1, 2, idx + 1)
+        for bucket in buckets:
+            series = [r for r in rows if r["bucket_width_s"] == bucket]
+            plt.plot([r["batch_window_ms"] for r in series], [r[key] for r in series], marker="o", label=f"bucket {bucket}s")
+        plt.title(title)
+        plt.xlabel("Batch window (ms)")
+        plt.grid(alpha=0.3)
+        plt.legend()
+    plt.tight_layout()
+    plt.savefig(os.path.join(plot_dir, "batching_sweep.png"))
+    plt.close()
+
+
+def run_batching_benchmark():
+    parser = argparse.ArgumentParser(description="Throughput / tail latency vs batch window and bucket width.")
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--windows-ms", nargs="+", type=float, default=[0, 5, 10, 25, 50])
+    parser.add_argument("--buckets-s", nargs="+", type=float, default=[0.5, 1, 2, 4])
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="Request arrival rate (req/s)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--min-s", type=float, default=1.0)
+    parser.add_argument("--max-s", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--audio", default=SAMPLE_AUDIO)
+    parser.add_argument("--atol", type=float, default=1e-3, help="Max |batched - unbatched| logit difference")
+    args = parser.parse_args()
+
+    print(f"Loading {args.artifact}...")
+    engine = get_engine(args.artifact, num_threads=args.threads)
+    clips = make_workload(load_audio(args.audio), args.requests, args.min_s, args.max_s, args.seed)
+
+    equality = check_batched_logits(engine, clips, args.max_batch_size, args.atol)
+    if not equality["checked"]:
+        print(f"⚠️ Batched-vs-unbatched check skipped: {equality['reason']}")
+    else:
+        status = "✅" if equality["passed"] else "❌"
+        print(f"{status} Batched vs unbatched logits: max |diff| {equality['max_abs_diff']:.2e}, "
+              f"argmax agreement {equality['argmax_agreement']:.2%}")
+
+    print("\n--- DYNAMIC BATCHING SWEEP ---")
+    rows = []
+    for bucket in args.buckets_s:
+        for window in args.windows_ms:
+            row = run_load(engine, clips, args.rate, window, bucket, args.max_batch_size, args.seed)
+            rows.append(row)
+            print(f"window {window:5.1f} ms | bucket {bucket:4.1f} s | {row['throughput_utt_per_s']:6.2f} utt/s "
+                  f"| p99 {row['p99_ms']:8.2f} ms | batch {row['mean_batch_size']:.2f} | pad {row['mean_padding_ratio']:.1%}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output = os.path.join(REPORT_DIR, "batching_benchmark.json")
+    with open(output, "w") as f:
+        json.dump({"config": vars(args), "batched_equality": equality, "results": rows}, f, indent=2)
+    plot_results(rows, args.buckets_s, PLOT_DIR)
+    print(f"\n✅ Batching report saved to {output}")
+
+
+if __name__ == "__main__":
+    run_batching_benchmark()
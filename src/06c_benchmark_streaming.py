@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, get_engine, load_audio
+from streaming import StreamingTranscriber
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+PLOT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmark_plots")
+
+
+def iter_blocks(audio, block=SAMPLE_RATE):
+    # Feed pre-loaded audio as a generator so the benchmark exercises the streaming path
+    for i in range(0, len(audio), block):
+        yield audio[i:i + block]
+
+
+def run_streaming_benchmark():
+    parser = argparse.ArgumentParser(description="Latency and WER of chunked transcription vs chunk/overlap size.")
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--audio", default=SAMPLE_AUDIO)
+    parser.add_argument("--reference", default=None, help="Reference transcript file (defaults to the full-pass output)")
+    parser.add_argument("--length-s", type=float, default=60.0, help="Tile the audio to this length")
+    parser.add_argument("--chunks-s", nargs="+", type=float, default=[5, 10, 20])
+    parser.add_argument("--overlaps-s", nargs="+", type=float, default=[0.5, 1.0, 2.0])
+    args = parser.parse_args()
+
+    from jiwer import wer
+
+    engine = get_engine(args.artifact)
+    audio = np.resize(load_audio(args.audio), int(args.length_s * SAMPLE_RATE))
+
+    # 1. Full-pass baseline (the old single-forward behaviour)
+    start = time.perf_counter()
+    full_text = engine.transcribe(audio)
+    full_ms = (time.perf_counter() - start) * 1000
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = f.read().strip()
+    else:
+        reference = full_text
+    print(f"Full pass: {full_ms:.1f} ms for {args.length_s:.0f}s of audio")
+
+    # 2. Sweep chunk / overlap
+    rows = []
+    for chunk in args.chunks_s:
+        for overlap in args.overlaps_s:
+            if chunk <= 2 * overlap:
+                continue
+            transcriber = StreamingTranscriber(engine, chunk, overlap)
+            first_piece_ms = None
+            pieces = []
+            start = time.perf_counter()
+            for piece in transcriber.stream(iter_blocks(audio)):
+                if first_piece_ms is None:
+                    first_piece_ms = (time.perf_counter() - start) * 1000
+                pieces.append(piece)
+            total_ms = (time.perf_counter() - start) * 1000
+            text = " ".join("".join(pieces).split())
+
+            row = {
+                "chunk_s": chunk,
+                "overlap_s": overlap,
+                "total_ms": total_ms,
+                "first_piece_ms": first_piece_ms,
+                "rtf": total_ms / 1000 / args.length_s,
+                "compute_overhead": total_ms / full_ms,
+                "wer": wer(reference, text) if reference else 0.0,
+            }
+            rows.append(row)
+            print(f"chunk {chunk:5.1f}s | overlap {overlap:4.1f}s | total {total_ms:8.1f} ms "
+                  f"| first {first_piece_ms:7.1f} ms | WER {row['wer']*100:6.2f}%")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output = os.path.join(REPORT_DIR, "streaming_benchmark.json")
+    with open(output, "w") as f:
+        json.dump({"config": vars(args), "full_pass_ms": full_ms, "results": rows}, f, indent=2)
+
+    import matplotlib.pyplot as plt
+
+    os.makedirs(PLOT_DIR, exist_ok=True)
+    plt.figure(figsize=(12, 5))
+    for idx, (key, title) in enumerate([("total_ms", "Total latency (ms)"), ("wer", "WER vs reference")]):
+        plt.subplot(1, 2, idx + 1)
+        for overlap in args.overlaps_s:
+            series = [r for r in rows if r["overlap_s"] == overlap]
+            plt.plot([r["chunk_s"] for r in series], [r[key] for r in series], marker="o", label=f"overlap {overlap}s")
+        plt.title(title)
+        plt.xlabel("Chunk size (s)")
+        plt.grid(alpha=0.3)
+        plt.legend()
+    plt.tight_layout()
+    plt.savefig(os.path.join(PLOT_DIR, "streaming_sweep.png"))
+    plt.close()
+    print(f"\n✅ Streaming report saved to {output}")
+
+
+if __name__ == "__main__":
+    run_streaming_benchmark()
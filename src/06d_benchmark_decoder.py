@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, get_engine, load_audio
+from ctc_decoder import GreedyCTCDecoder, BeamSearchCTCDecoder, load_labels
+from evaluation import load_manifest, word_error_rate
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+
+
+def notebook_greedy(logits, labels, blank_id):
+    # The per-frame list comprehension from ctc_decode_debug, kept as the baseline
+    pred_ids = np.argmax(logits, axis=-1)
+    grouped_ids = [x for i, x in enumerate(pred_ids) if i == 0 or x != pred_ids[i - 1]]
+    cleaned_ids = [x for x in grouped_ids if x != blank_id]
+    return " ".join("".join(labels[x] for x in cleaned_ids).split())
+
+
+def pad_batch(logits_list):
+    lengths = np.array([len(l) for l in logits_list])
+    batch = np.zeros((len(logits_list), lengths.max(), logits_list[0].shape[-1]), dtype=np.float32)
+    for i, l in enumerate(logits_list):
+        batch[i, :len(l)] = l
+    return batch, lengths
+
+
+def time_decoder(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return (time.perf_counter() - start) / repeats, out
+
+
+def run_decoder_benchmark():
+    parser = argparse.ArgumentParser(description="CTC decode time per second of audio and WER vs greedy.")
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--manifest", default=None, help="TSV/JSONL of audio + reference text")
+    parser.add_argument("--lm", default=None, help="ARPA / KenLM n-gram model for shallow fusion")
+    parser.add_argument("--beam-widths", nargs="+", type=int, default=[4, 16])
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--beta", type=float, default=1.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    entries = load_manifest(args.manifest) if args.manifest else [(SAMPLE_AUDIO, "")]
+    references = [text for _, text in entries]
+    has_refs = all(references)
+
+    # 1. Acoustic model once; every decoder sees the same logits
+    engine = get_engine(args.artifact)
+    logits_list, audio_s = [], 0.0
+    for path, _ in entries:
+        audio = load_audio(path)
+        audio_s += len(audio) / SAMPLE_RATE
+        logits_list.append(engine.logits(audio))
+    batch, lengths = pad_batch(logits_list)
+
+    labels, vocab = load_labels()
+    greedy = GreedyCTCDecoder()
+    decoders = {
+        "notebook_greedy": (lambda: [notebook_greedy(l, labels, vocab["<pad>"]) for l in logits_list], args.repeats),
+        "greedy_vectorized": (lambda: greedy.decode_batch(batch, lengths), args.repeats),
+    }
+    for width in args.beam_widths:
+        beam = BeamSearchCTCDecoder(beam_width=width)
+        decoders[f"beam_{width}"] = (lambda beam=beam: beam.decode_batch(batch, lengths), 1)
+        if args.lm:
+            beam_lm = BeamSearchCTCDecoder(lm_path=args.lm, beam_width=width, alpha=args.alpha, beta=args.beta)
+            decoders[f"beam_{width}_lm"] = (lambda beam_lm=beam_lm: beam_lm.decode_batch(batch, lengths), 1)
+
+    # 2. Time + score each decoder
+    print(f"\n--- CTC DECODER BENCHMARK ({len(entries)} utterances, {audio_s:.1f}s audio) ---")
+    rows = []
+    greedy_wer = None
+    for name, (fn, repeats) in decoders.items():
+        seconds, hyps = time_decoder(fn, repeats)
+        row = {"decoder": name, "ms_per_audio_s": seconds * 1000 / audio_s}
+        if has_refs:
+            row["wer"] = word_error_rate(references, hyps)
+            if name == "greedy_vectorized":
+                greedy_wer = row["wer"]
+        rows.append(row)
+
+    for row in rows:
+        if greedy_wer is not None:
+            row["wer_gain_vs_greedy"] = greedy_wer - row["wer"]
+        wer_str = f"| WER {row['wer']*100:6.2f}%" if "wer" in row else ""
+        print(f"{row['decoder']:18} | {row['ms_per_audio_s']:9.4f} ms / audio-s {wer_str}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output = os.path.join(REPORT_DIR, "decoder_benchmark.json")
+    with open(output, "w") as f:
+        json.dump({"config": vars(args), "audio_seconds": audio_s, "results": rows}, f, indent=2)
+    print(f"\n✅ Decoder report saved to {output}")
+
+
+if __name__ == "__main__":
+    run_decoder_benchmark()
@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+from evaluation import load_manifest, scored_word_error_rate
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, get_engine, load_audio
+from vad import EnergyVAD, VADTranscriber
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+
+
+def with_silence(audio, silence_s, seed=0):
+    # Call-center style: silence (with a little noise) before, after and in the middle of the clip
+    if not silence_s:
+        return audio
+    rng = np.random.default_rng(seed)
+    gap = lambda: (1e-3 * rng.standard_normal(int(silence_s * SAMPLE_RATE))).astype(np.float32)
+    half = len(audio) // 2
+    return np.concatenate([gap(), audio[:half], gap(), audio[half:], gap()])
+
+
+def timed(fn, audio):
+    start = time.perf_counter()
+    text = fn(audio)
+    return text, (time.perf_counter() - start) * 1000
+
+
+def run_vad_benchmark():
+    parser = argparse.ArgumentParser(description="Compute saved and WER impact of skipping silence with the VAD stage.")
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--manifest", default=None, help="Local test set (TSV/JSONL); defaults to the sample clip")
+    parser.add_argument("--silence-s", type=float, default=0.0, help="Silence to insert around and inside each clip")
+    parser.add_argument("--margins-db", nargs="+", type=float, default=[6.0, 12.0, 18.0])
+    parser.add_argument("--min-gap-ms", type=float, default=300)
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    entries = load_manifest(args.manifest) if args.manifest else [(SAMPLE_AUDIO, "")]
+    engine = get_engine(args.artifact)
+    clips = [with_silence(load_audio(path), args.silence_s, seed=i) for i, (path, _) in enumerate(entries)]
+    audio_s = sum(len(c) for c in clips) / SAMPLE_RATE
+
+    # 1. Every sample through the model (today's path)
+    full = [timed(engine.transcribe, clip) for clip in clips]
+    full_ms = sum(ms for _, ms in full)
+    # Without transcripts, score against the full-pass output: WER then measures only what the VAD changed
+    references = [text for _, text in entries]
+    if not all(references):
+        references = [text for text, _ in full]
+    full_wer = scored_word_error_rate(references, [text for text, _ in full])
+    scored = sum(bool(r.strip()) for r in references)
+    wer_text = f"WER {full_wer * 100:.2f}%" if full_wer is not None else "no non-empty reference to score"
+    print(f"Full pass: {full_ms:.1f} ms for {audio_s:.1f}s of audio | {wer_text} ({scored}/{len(references)} scored)")
+
+    # 2. Speech only, per VAD threshold
+    rows = []
+    for margin in args.margins_db:
+        transcriber = VADTranscriber(engine, EnergyVAD(margin_db=margin, min_gap_ms=args.min_gap_ms), args.batch_size)
+        hypotheses, total_ms, speech_s, segments = [], 0.0, 0.0, 0
+        for clip in clips:
+            text, ms = timed(transcriber.transcribe, clip)
+            hypotheses.append(text)
+            total_ms += ms
+            speech_s += transcriber.last_stats["speech_s"]
+            segments += len(transcriber.last_stats["segments"])
+        row = {
+            "margin_db": margin,
+            "segments": segments,
+            "speech_s": speech_s,
+            "audio_skipped": 1 - speech_s / audio_s,
+            "total_ms": total_ms,
+            "compute_saved": 1 - total_ms / full_ms,
+            "wer": scored_word_error_rate(references, hypotheses),
+        }
+        row["wer_delta"] = row["wer"] - full_wer if full_wer is not None else None
+        rows.append(row)
+        print(f"margin {margin:5.1f} dB | {segments:4d} segments | skipped {row['audio_skipped'] * 100:5.1f}% audio "
+              f"| {total_ms:8.1f} ms (saved {row['compute_saved'] * 100:5.1f}%) | ΔWER "
+              + (f"{row['wer_delta'] * 100:+6.2f}%" if row["wer_delta"] is not None else "     -"))
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output = os.path.join(REPORT_DIR, "vad_benchmark.json")
+    with open(output, "w") as f:
+        json.dump({"config": vars(args), "audio_s": audio_s, "full_pass_ms": full_ms, "full_pass_wer": full_wer,
+                   "scored_utterances": scored,
+                   "results": rows}, f, indent=2)
+    print(f"\n✅ VAD report saved to {output}")
+
+
+if __name__ == "__main__":
+    run_vad_benchmark()
@@ -0,0 +1,77 @@
+import os
+import json
+import argparse
+
+from evaluation import BASELINE_CACHE_DIR, evaluate_parallel, load_manifest
+from inference_engine import ARTIFACTS, PROJECT_ROOT
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "evaluation")
+
+
+def format_rate(rate):
+    # None: no utterance had a non-empty reference to score against
+    return f"{rate * 100:6.2f}%" if rate is not None else "   n/a"
+
+
+def write_worst(result, path, limit):
+    # Worst utterances first: what changed, and how far the logits moved
+    rows = sorted(result["per_utterance"], key=lambda u: (-(u["wer"] or 0), -u.get("divergence", {}).get("kl", 0)))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{result['artifact']} vs {result['baseline']['artifact']} - {result['utterances']} utterances, "
+                f"WER {format_rate(result['wer']).strip()} (baseline {format_rate(result['baseline_wer']).strip()})\n\n")
+        for u in rows[:limit]:
+            div = u.get("divergence", {})
+            f.write(f"{os.path.basename(u['audio'])} | WER {format_rate(u['wer'])} | KL {div.get('kl', 0):.4f} "
+                    f"| argmax {div.get('argmax_agreement', 1) * 100:6.2f}%\n")
+            f.write(f"  REF: {u['reference']}\n  HYP: {u['hypothesis']}\n")
+            if u.get("baseline_hypothesis") != u["hypothesis"]:
+                f.write(f"  BASE: {u.get('baseline_hypothesis')}\n")
+            if u["diff"]:
+                f.write(f"  DIFF: {u['diff']}\n")
+            f.write("\n")
+
+
+def run_evaluation():
+    parser = argparse.ArgumentParser(description="Offline WER/CER of artifacts on a local manifest vs a cached baseline.")
+    parser.add_argument("--manifest", required=True, help="TSV (audio<TAB>text) or JSONL, see evaluation.load_manifest")
+    parser.add_argument("--artifacts", nargs="+", default=["onnx_optimized", "onnx_quantized"], choices=list(ARTIFACTS))
+    parser.add_argument("--model-path", default=None, help="Override the path of a single --artifacts entry")
+    parser.add_argument("--baseline-artifact", default="pytorch", choices=list(ARTIFACTS))
+    parser.add_argument("--baseline-path", default=None)
+    parser.add_argument("--workers", type=int, default=max((os.cpu_count() or 1) // 4, 1))
+    parser.add_argument("--store", default=None, help="audio_store.py directory to read audio from")
+    parser.add_argument("--cache-dir", default=BASELINE_CACHE_DIR)
+    parser.add_argument("--limit", type=int, default=None, help="Only the first N manifest entries")
+    parser.add_argument("--worst", type=int, default=50, help="Utterances listed in the per-artifact diff report")
+    args = parser.parse_args()
+
+    if args.model_path and len(args.artifacts) != 1:
+        parser.error("--model-path needs exactly one --artifacts entry")
+    entries = load_manifest(args.manifest)[:args.limit]
+    os.makedirs(REPORT_DIR, exist_ok=True)
+
+    summary = []
+    for artifact in args.artifacts:
+        print(f"\nEvaluating {artifact} on {len(entries)} utterances with {args.workers} workers...")
+        try:
+            result = evaluate_parallel(artifact, entries, args.model_path, args.workers, args.baseline_artifact,
+                                       args.baseline_path, args.cache_dir, args.store)
+        except FileNotFoundError as e:
+            print(f"⚠️ Skipping {artifact}: {e}")
+            continue
+        with open(os.path.join(REPORT_DIR, f"{artifact}.json"), "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        write_worst(result, os.path.join(REPORT_DIR, f"{artifact}_worst.txt"), args.worst)
+        summary.append({k: v for k, v in result.items() if k != "per_utterance"})
+        kl = f"{result['mean_kl']:.4f}" if result["mean_kl"] is not None else "-"
+        print(f"  {artifact:18} | WER {format_rate(result['wer'])} | CER {format_rate(result['cer'])} "
+              f"| baseline WER {format_rate(result['baseline_wer'])} | changed {result['changed_vs_baseline']:5d} "
+              f"| KL {kl} | {result['wall_s']:.1f}s")
+
+    with open(os.path.join(REPORT_DIR, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"\n✅ Evaluation reports saved to {REPORT_DIR}")
+
+
+if __name__ == "__main__":
+    run_evaluation()
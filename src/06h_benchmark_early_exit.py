@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import argparse
+from collections import Counter
+
+from early_exit import CRITERIA, EARLY_EXIT_DIR, SEGMENT_BACKENDS, EarlyExitEngine
+from evaluation import load_manifest, scored_word_error_rate
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, InferenceEngine, load_audio
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+
+
+def run_pass(engine, clips):
+    texts, layers, total_ms = [], [], 0.0
+    for clip in clips:
+        start = time.perf_counter()
+        texts.append(engine.transcribe(clip))
+        total_ms += (time.perf_counter() - start) * 1000
+        layers.append(getattr(engine, "last_exit", None))
+    return texts, layers, total_ms
+
+
+def format_wer(wer):
+    return f"{wer * 100:.2f}%" if wer is not None else "-"
+
+
+def run_early_exit_benchmark():
+    parser = argparse.ArgumentParser(description="Layers run, latency saved and WER change of early-exit CTC.")
+    parser.add_argument("--model-dir", default=EARLY_EXIT_DIR)
+    parser.add_argument("--backend", default="onnxruntime", choices=list(SEGMENT_BACKENDS))
+    parser.add_argument("--manifest", default=None, help="Local test set (TSV/JSONL); defaults to the sample clip")
+    parser.add_argument("--criteria", nargs="+", default=list(CRITERIA), choices=CRITERIA)
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.8, 0.9, 0.95],
+                        help="Confidence thresholds (agreement has none)")
+    parser.add_argument("--monolithic", default="onnx_optimized", choices=list(ARTIFACTS),
+                        help="Single-graph artifact timed alongside, to show what splitting into segments costs")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    entries = load_manifest(args.manifest) if args.manifest else [(SAMPLE_AUDIO, "")]
+    clips = [load_audio(path) for path, _ in entries]
+    audio_s = sum(len(c) for c in clips) / SAMPLE_RATE
+
+    # 0. The same model as one graph: the baseline the split segments have to beat
+    monolithic = None
+    if os.path.exists(ARTIFACTS[args.monolithic][1]):
+        mono_engine = InferenceEngine(args.monolithic, num_threads=args.threads)
+        _, _, mono_ms = run_pass(mono_engine, clips)
+        del mono_engine
+        monolithic = {"artifact": args.monolithic, "total_ms": mono_ms}
+        print(f"Monolithic {args.monolithic}: {mono_ms:.1f} ms for {audio_s:.1f}s of audio")
+    else:
+        print(f"⚠️ Skipping the monolithic baseline: {ARTIFACTS[args.monolithic][1]} not found")
+
+    # 1. Full depth through the same segments
+    full_engine = EarlyExitEngine(args.model_dir, args.backend, criterion=None, num_threads=args.threads)
+    num_layers, exit_layers = full_engine.spec["num_layers"], full_engine.exit_layers
+    full_texts, _, full_ms = run_pass(full_engine, clips)
+    del full_engine
+    # Without transcripts, score against full depth: WER then measures only what exiting early changed
+    references = [text for _, text in entries]
+    if not all(references):
+        references = full_texts
+    # Only non-empty references are scored (silent clips have nothing to get wrong)
+    scored = sum(bool(r.strip()) for r in references)
+    full_wer = scored_word_error_rate(references, full_texts)
+    print(f"Full depth ({num_layers} layers): {full_ms:.1f} ms for {audio_s:.1f}s of audio | "
+          f"WER {format_wer(full_wer)} ({scored}/{len(references)} scored)")
+    if monolithic:
+        monolithic["split_overhead"] = full_ms / monolithic["total_ms"] - 1
+        print(f"Split-graph overhead at full depth: {monolithic['split_overhead'] * 100:+.1f}% vs {args.monolithic}")
+
+    # 2. Early exit per criterion / threshold
+    settings = [(c, t) for c in args.criteria for t in (args.thresholds if c == "confidence" else [None])]
+    rows = []
+    for criterion, threshold in settings:
+        engine = EarlyExitEngine(args.model_dir, args.backend, criterion, threshold or 0.0, num_threads=args.threads)
+        texts, layers, total_ms = run_pass(engine, clips)
+        row = {
+            "criterion": criterion,
+            "threshold": threshold,
+            "avg_layers": sum(layers) / len(layers),
+            "exit_histogram": dict(sorted(Counter(layers).items())),
+            "total_ms": total_ms,
+            "latency_saved": 1 - total_ms / full_ms,
+            "latency_saved_vs_monolithic": 1 - total_ms / monolithic["total_ms"] if monolithic else None,
+            "wer": scored_word_error_rate(references, texts),
+            "changed_transcripts": sum(a != b for a, b in zip(texts, full_texts)),
+        }
+        row["wer_delta"] = row["wer"] - full_wer if full_wer is not None else None
+        rows.append(row)
+        label = f"{criterion} {threshold}" if threshold is not None else criterion
+        vs_mono = (f", {row['latency_saved_vs_monolithic'] * 100:5.1f}% vs monolithic"
+                   if row["latency_saved_vs_monolithic"] is not None else "")
+        delta = f"{row['wer_delta'] * 100:+6.2f}%" if row["wer_delta"] is not None else "     -"
+        print(f"{label:16} | {row['avg_layers']:5.1f}/{num_layers} layers | {total_ms:8.1f} ms "
+              f"(saved {row['latency_saved'] * 100:5.1f}%{vs_mono}) | ΔWER {delta}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output = os.path.join(REPORT_DIR, "early_exit_benchmark.json")
+    with open(output, "w") as f:
+        json.dump({"config": vars(args), "audio_s": audio_s, "num_layers": num_layers, "exit_layers": exit_layers,
+                   "full_depth_ms": full_ms, "full_depth_wer": full_wer, "scored_utterances": scored,
+                   "monolithic": monolithic, "results": rows}, f, indent=2)
+    print(f"\n✅ Early-exit report saved to {output}")
+
+
+if __name__ == "__main__":
+    run_early_exit_benchmark()
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from evaluation import load_manifest
+from inference_engine import ARTIFACTS, PROJECT_ROOT, SAMPLE_AUDIO, SAMPLE_RATE, InferenceEngine, load_audio
+from result_cache import ResultCache
+
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "benchmarks")
+
+
+def make_traffic(clips, num_requests, zipf_a, seed):
+    # Popular prompts repeat a lot, the long tail rarely: Zipf over the distinct clips
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(zipf_a, size=num_requests), len(clips)) - 1
+    order = rng.permutation(len(clips))
+    return [clips[order[r]] for r in ranks]
+
+
+def run_pass(engine, traffic):
+    latencies, hits = [], []
+    cache = engine.result_cache
+    for audio in traffic:
+        before = cache.hits if cache is not None else 0
+        start = time.perf_counter()
+        engine.transcribe(audio)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits.append(cache is not None and cache.hits > before)
+    return np.asarray(latencies), np.asarray(hits, dtype=bool)
+
+
+def latency_summary(latencies):
+    if not len(latencies):
+        return None
+    return {"count": int(len(latencies)), "mean_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95))}
+
+
+def summarize(name, latencies, hits, cache):
+    row = {
+        "mode": name,
+        "total_ms": float(latencies.sum()),
+        "all": latency_summary(latencies),
+        "hit": latency_summary(latencies[hits]),
+        "miss": latency_summary(latencies[~hits]),
+    }
+    if cache is not None:
+        row["cache"] = cache.stats()
+    hit_rate = row["cache"]["hit_rate"] if cache is not None else 0.0
+    p50 = {k: f"{row[k]['p50_ms']:8.2f}" if row[k] else "       -" for k in ("hit", "miss")}
+    print(f"  {name:12} | hit rate {hit_rate * 100:5.1f}% | total {row['total_ms']:9.1f} ms "
+          f"| p50 hit {p50['hit']} ms / miss {p50['miss']} ms")
+    return row
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Hit rate and latency of the transcription result cache on repetitive traffic.")
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--manifest", default=None, help="Distinct clips (TSV/JSONL); defaults to cuts of the sample clip")
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct clips cut from the sample clip")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--zipf", type=float, default=1.3, help="Popularity skew (lower = fewer repeats)")
+    parser.add_argument("--max-entries", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.manifest:
+        clips = [load_audio(path) for path, _ in load_manifest(args.manifest)]
+    else:
+        rng = np.random.default_rng(args.seed)
+        speech = np.resize(load_audio(SAMPLE_AUDIO), 20 * SAMPLE_RATE)
+        clips = []
+        for _ in range(args.distinct):
+            length = int(rng.uniform(2, 10) * SAMPLE_RATE)
+            offset = rng.integers(0, len(speech) - length)
+            clips.append(speech[offset:offset + length])
+    traffic = make_traffic(clips, args.requests, args.zipf, args.seed)
+    print(f"\n--- RESULT CACHE BENCHMARK: {args.artifact}, {len(traffic)} requests over {len(clips)} clips ---")
+
+    disk_dir = tempfile.mkdtemp(prefix="result_cache_bench_")
+    try:
+        engine = InferenceEngine(args.artifact, num_threads=args.threads,
+                                 result_cache=ResultCache(args.max_entries, disk_dir=disk_dir))
+        rows = []
+        cache, engine.result_cache = engine.result_cache, None
+        rows.append(summarize("uncached", *run_pass(engine, traffic), None))
+
+        engine.result_cache = cache
+        rows.append(summarize("cached", *run_pass(engine, traffic), cache))
+
+        # Restart: empty memory, same disk store (what a redeployed worker sees)
+        engine.result_cache = ResultCache(args.max_entries, disk_dir=disk_dir)
+        rows.append(summarize("disk_restart", *run_pass(engine, traffic), engine.result_cache))
+    finally:
+        shutil.rmtree(disk_dir, ignore_errors=True)
+
+    baseline = rows[0]["total_ms"]
+    for row in rows[1:]:
+        row["speedup"] = baseline / row["total_ms"]
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    output = os.path.join(REPORT_DIR, "result_cache_benchmark.json")
+    with open(output, "w") as f:
+        json.dump({"config": vars(args), "distinct_clips": len(clips),
+                   "distinct_requested": len({id(c) for c in traffic}), "results": rows}, f, indent=2)
+    print(f"\n✅ Report saved to {output}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
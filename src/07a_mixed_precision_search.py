@@ -0,0 +1,216 @@
+import os
+import json
+import shutil
+import argparse
+import tempfile
+
+import onnx
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+from activation_stats import FP16_MAX, profile_activations
+from calibration import WavCalibrationReader
+from evaluation import evaluate_model, load_manifest, transcribe_entries
+from inference_engine import ARTIFACTS, InferenceEngine, ONNX_DIR, PROJECT_ROOT
+from graph_passes import ALWAYS_FP32_OPS, group_nodes, remove_model
+
+INT8_OPS = {"MatMul", "Gemm"}
+
+
+def build_candidate(src_path, out_path, assignment, groups, work_dir):
+    """Writes a model where each group runs at its assigned precision (fp32 / fp16 / int8)."""
+    model = onnx.load(src_path)
+    op_types = {n.name: n.op_type for n in model.graph.node}
+    fp16_nodes = {n for g, p in assignment.items() if p == "fp16" for n in groups[g]
+                  if op_types[n] not in ALWAYS_FP32_OPS}
+    int8_nodes = [n for g, p in assignment.items() if p == "int8" for n in groups[g] if op_types[n] in INT8_OPS]
+
+    if fp16_nodes:
+        from onnxruntime.transformers.float16 import convert_float_to_float16
+        block = [n.name for n in model.graph.node if n.name not in fp16_nodes]
+        model = convert_float_to_float16(model, keep_io_types=True, node_block_list=block)
+
+    stage_path = os.path.join(work_dir, "stage.onnx") if int8_nodes else out_path
+    onnx.save(model, stage_path, save_as_external_data=True, all_tensors_to_one_file=True,
+              location=os.path.basename(stage_path) + ".data")
+    del model
+
+    if int8_nodes:
+        quantize_dynamic(
+            model_input=stage_path,
+            model_output=out_path,
+            weight_type=QuantType.QInt8,
+            nodes_to_quantize=int8_nodes,
+            use_external_data_format=True,
+            extra_options={"DefaultTensorType": onnx.TensorProto.FLOAT},
+        )
+        remove_model(stage_path)
+
+
+def pareto_front(points):
+    # Non-dominated (latency, wer) points, sorted by latency
+    front, best_wer = [], float("inf")
+    for p in sorted(points, key=lambda p: (p["latency_p50_ms"], p["wer"])):
+        if p["wer"] < best_wer:
+            front.append(p)
+            best_wer = p["wer"]
+    return front
+
+
+def run_search():
+    parser = argparse.ArgumentParser(description="Per-layer precision search under a WER-delta budget.")
+    parser.add_argument("--input", default=os.path.join(ONNX_DIR, "optimized_model.onnx"))
+    parser.add_argument("--output", default=os.path.join(ONNX_DIR, "mixed_precision_model.onnx"))
+    parser.add_argument("--eval-manifest", required=True)
+    parser.add_argument("--calibration", default=None, help="Audio for activation ranges (defaults to the eval set)")
+    parser.add_argument("--calib-files", type=int, default=16)
+    parser.add_argument("--outputs-per-pass", type=int, default=200,
+                        help="Intermediate tensors exposed per activation pass (bounds memory)")
+    parser.add_argument("--precisions", nargs="+", default=["int8", "fp16"], choices=["int8", "fp16"])
+    parser.add_argument("--strategy", default="greedy", choices=["greedy", "bisect"])
+    parser.add_argument("--group-by", default="segment", choices=["layer", "segment"])
+    parser.add_argument("--wer-budget", type=float, default=0.01)
+    parser.add_argument("--openvino", action="store_true", help="Also score OpenVINO global bf16/f16 hints")
+    args = parser.parse_args()
+
+    report_dir = os.path.join(PROJECT_ROOT, "reports", "mixed_precision")
+    os.makedirs(report_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="mp_search_", dir=os.path.dirname(args.output))
+    trial_path = os.path.join(work_dir, "trial.onnx")
+
+    graph = onnx.load(args.input, load_external_data=False)
+    groups = group_nodes(graph, by=args.group_by)
+    del graph
+
+    # 1. Activation ranges per node (runtime values, not just weights like 02c)
+    print("Step 1: Measuring activation ranges...")
+    reader = WavCalibrationReader(args.calibration or args.eval_manifest, args.calib_files)
+    # Preprocessed once and replayed for every pass, like 02d_activation_profile.py
+    inputs = []
+    while (feed := reader.get_next()) is not None:
+        inputs.append(feed["input_values"])
+    ranges = profile_activations(args.input, inputs, outputs_per_pass=args.outputs_per_pass)
+    node_abs_max = {}
+    for stats in ranges.values():
+        node_abs_max[stats["node"]] = max(node_abs_max.get(stats["node"], 0.0), stats["abs_max"])
+    group_abs_max = {g: max((node_abs_max.get(n, 0.0) for n in nodes), default=0.0) for g, nodes in groups.items()}
+    fp16_unsafe = {g for g, v in group_abs_max.items() if v >= FP16_MAX}
+    print(f"{len(fp16_unsafe)}/{len(groups)} groups exceed the FP16 range and stay out of fp16")
+
+    # 2. FP32 baseline
+    print("Step 2: FP32 baseline...")
+    entries = load_manifest(args.eval_manifest)
+    references = [text for _, text in entries]
+    if not all(references):
+        references, _ = transcribe_entries(InferenceEngine("onnx", model_path=args.input), entries)
+    baseline = evaluate_model(args.input, entries, references)
+    baseline.update({"name": "fp32", "assignment": {}})
+    trials = [baseline]
+
+    def score(assignment, name):
+        try:
+            build_candidate(args.input, trial_path, assignment, groups, work_dir)
+            result = evaluate_model(trial_path, entries, references)
+        except Exception as e:
+            # e.g. a failed fp16 conversion or an fp16 kernel ORT CPU doesn't implement
+            print(f"  {name:40} | failed: {e}")
+            return None
+        finally:
+            remove_model(trial_path)
+        result.update({"name": name, "assignment": {g: p for g, p in assignment.items() if p != "fp32"},
+                       "wer_delta": result["wer"] - baseline["wer"]})
+        trials.append(result)
+        print(f"  {name:40} | ΔWER {result['wer_delta']*100:+6.2f}% | p50 {result['latency_p50_ms']:8.1f} ms")
+        return result
+
+    def acceptable(result, latency):
+        return result is not None and result["wer_delta"] <= args.wer_budget and result["latency_p50_ms"] < latency
+
+    # 3. Search: safest groups (smallest activations) are demoted first
+    print(f"Step 3: {args.strategy} search over {len(groups)} groups...")
+    order = sorted(groups, key=lambda g: group_abs_max[g])
+    assignment = {g: "fp32" for g in groups}
+    best = baseline
+
+    if args.strategy == "greedy":
+        for group in order:
+            for precision in args.precisions:
+                if precision == "fp16" and group in fp16_unsafe:
+                    continue
+                candidate = dict(assignment, **{group: precision})
+                result = score(candidate, f"{group}->{precision}")
+                if acceptable(result, best["latency_p50_ms"]):
+                    assignment, best = candidate, result
+                    break
+    else:
+        # Largest prefix of `order` that can drop to each precision while staying in budget
+        for precision in args.precisions:
+            eligible = [g for g in order if assignment[g] == "fp32" and not (precision == "fp16" and g in fp16_unsafe)]
+            lo, hi, chosen = 1, len(eligible), None
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                candidate = dict(assignment, **{g: precision for g in eligible[:mid]})
+                result = score(candidate, f"first {mid} -> {precision}")
+                if result is not None and result["wer_delta"] <= args.wer_budget:
+                    chosen, lo = (candidate, result), mid + 1
+                else:
+                    hi = mid - 1
+            if chosen and chosen[1]["latency_p50_ms"] < best["latency_p50_ms"]:
+                assignment, best = chosen
+
+    # 4. Optional: OpenVINO only exposes precision globally
+    if args.openvino and os.path.exists(ARTIFACTS["openvino"][1]):
+        for hint in ("bf16", "f16"):
+            try:
+                result = evaluate_model(ARTIFACTS["openvino"][1], entries, references, artifact="openvino",
+                                        config={"INFERENCE_PRECISION_HINT": hint})
+            except Exception as e:
+                print(f"  openvino {hint}: {e}")
+                continue
+            result.update({"name": f"openvino_{hint}", "assignment": "global", "wer_delta": result["wer"] - baseline["wer"]})
+            trials.append(result)
+
+    # 5. Save the chosen model, its config and the Pareto report
+    chosen = {g: p for g, p in assignment.items() if p != "fp32"}
+    remove_model(args.output)
+    build_candidate(args.input, args.output, assignment, groups, work_dir)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    config_path = os.path.splitext(args.output)[0] + "_config.json"
+    with open(config_path, "w") as f:
+        json.dump({"source": args.input, "group_by": args.group_by, "assignment": chosen,
+                   "groups": {g: groups[g] for g in chosen}}, f, indent=2)
+
+    front = pareto_front(trials)
+    report = {
+        "baseline": baseline,
+        "chosen": best,
+        "fp16_unsafe_groups": sorted(fp16_unsafe),
+        "group_abs_max": group_abs_max,
+        "trials": trials,
+        "pareto": [t["name"] for t in front],
+    }
+    with open(os.path.join(report_dir, "mixed_precision_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    plt.scatter([t["latency_p50_ms"] for t in trials], [t["wer"] * 100 for t in trials], alpha=0.5, label="Trials")
+    plt.plot([t["latency_p50_ms"] for t in front], [t["wer"] * 100 for t in front], "r-o", label="Pareto front")
+    plt.axhline(y=(baseline["wer"] + args.wer_budget) * 100, color="black", linestyle="--", label="WER budget")
+    plt.title("Mixed-Precision Search: Latency vs WER")
+    plt.xlabel("p50 latency (ms)")
+    plt.ylabel("WER (%)")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(os.path.join(report_dir, "pareto.png"))
+    plt.close()
+
+    print(f"\n✅ Search complete: {len(chosen)} groups demoted, "
+          f"{baseline['latency_p50_ms']:.1f} -> {best['latency_p50_ms']:.1f} ms, "
+          f"WER {baseline['wer']*100:.2f}% -> {best['wer']*100:.2f}%")
+    print(f"Model: {args.output} | Config: {config_path} | Report: {report_dir}")
+
+
+if __name__ == "__main__":
+    run_search()
@@ -0,0 +1,150 @@
+import os
+import sys
+import copy
+import json
+import argparse
+import subprocess
+
+from calibration import WavCalibrationReader
+from evaluation import evaluate_model, load_manifest, transcribe_entries
+from inference_engine import MODEL_DIR, PROJECT_ROOT, InferenceEngine
+from pruning import apply_plan, compute_importance, count_parameters, load_wav2vec2, make_plan, save_pruned
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PRUNED_DIR = os.path.join(PROJECT_ROOT, "models", "pruned")
+REPORT_DIR = os.path.join(PROJECT_ROOT, "reports", "pruning")
+# head fraction : FFN fraction : layers dropped
+DEFAULT_POINTS = ["0:0:0", "0.125:0.125:0", "0.25:0.25:0", "0.375:0.375:0", "0.5:0.5:0",
+                  "0:0:2", "0:0:4", "0.25:0.25:2"]
+
+
+def parse_point(text):
+    heads, ffn, layers = text.split(":")
+    return float(heads), float(ffn), int(layers)
+
+
+def point_name(heads, ffn, layers):
+    return f"h{int(round(heads * 100)):02d}_f{int(round(ffn * 100)):02d}_l{layers}"
+
+
+def export(model_dir, openvino=False):
+    """Re-exports a saved pruned checkpoint through 02a (and 02b) -> path of the ONNX model."""
+    onnx_path = os.path.join(model_dir, "onnx", "model.onnx")
+    subprocess.run([sys.executable, os.path.join(SRC_DIR, "02a_export_onnx.py"), "--model-dir", model_dir,
+                    "--output", onnx_path], check=True)
+    if openvino:
+        subprocess.run([sys.executable, os.path.join(SRC_DIR, "02b_export_openvino.py"), "--model-dir", model_dir,
+                        "--output-dir", os.path.join(model_dir, "openvino")], check=True)
+    return onnx_path
+
+
+def plot_curve(points, report_dir):
+    import matplotlib.pyplot as plt
+
+    sparsity = [p["sparsity"] * 100 for p in points]
+    fig, (ax_latency, ax_wer) = plt.subplots(1, 2, figsize=(14, 6))
+    for key, label in (("latency_p50_ms", "PyTorch"), ("onnx_latency_p50_ms", "ONNX Runtime")):
+        if any(key in p for p in points):
+            ax_latency.scatter([s for s, p in zip(sparsity, points) if key in p],
+                               [p[key] for p in points if key in p], label=label)
+    for s, p in zip(sparsity, points):
+        ax_latency.annotate(p["name"], (s, p["latency_p50_ms"]), fontsize=7)
+    ax_latency.set_title("Sparsity vs Latency")
+    ax_latency.set_xlabel("Parameters removed (%)")
+    ax_latency.set_ylabel("p50 latency (ms)")
+    ax_latency.legend()
+
+    ax_wer.scatter([p["latency_p50_ms"] for p in points], [p["wer"] * 100 for p in points], c=sparsity, cmap="viridis")
+    for p in points:
+        ax_wer.annotate(p["name"], (p["latency_p50_ms"], p["wer"] * 100), fontsize=7)
+    ax_wer.set_title("Latency vs WER (colour = sparsity)")
+    ax_wer.set_xlabel("p50 latency (ms)")
+    ax_wer.set_ylabel("WER (%)")
+    plt.tight_layout()
+    plt.savefig(os.path.join(report_dir, "pruning_curve.png"))
+    plt.close()
+
+
+def run_pruning():
+    parser = argparse.ArgumentParser(description="Structured head / FFN / layer pruning with a sparsity-latency-WER curve.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--eval-manifest", required=True)
+    parser.add_argument("--calibration", default=None, help="Audio for importance scores (defaults to the eval set)")
+    parser.add_argument("--calib-files", type=int, default=32)
+    parser.add_argument("--calib-seconds", type=float, default=10.0)
+    parser.add_argument("--points", nargs="+", default=DEFAULT_POINTS, help="head_fraction:ffn_fraction:layers_dropped")
+    parser.add_argument("--min-heads", type=int, default=1, help="Heads every remaining layer keeps")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--export", action="store_true",
+                        help="Save every point to models/pruned/, re-export it to ONNX and score that too")
+    parser.add_argument("--openvino", action="store_true", help="With --export, also convert each point to OpenVINO IR")
+    args = parser.parse_args()
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    print(f"Loading {args.model_dir}...")
+    base = load_wav2vec2(args.model_dir)
+    base_params = count_parameters(base)
+
+    # 1. Importance on local audio (no transcripts needed)
+    print("Step 1: Scoring heads / FFN neurons / layers...")
+    reader = WavCalibrationReader(args.calibration or args.eval_manifest, args.calib_files, args.calib_seconds)
+    importance = compute_importance(base, reader)
+    with open(os.path.join(REPORT_DIR, "importance.json"), "w") as f:
+        json.dump(importance, f)
+    layer_order = sorted(range(len(importance["layers"])), key=lambda i: importance["layers"][i])
+    print(f"Scored {importance['batches']} files; least important layers: {layer_order[:4]}")
+
+    # 2. References: the manifest's, or the unpruned model's own output
+    entries = load_manifest(args.eval_manifest)
+    references = [text for _, text in entries]
+    if not all(references):
+        engine = InferenceEngine("pytorch", model_path=args.model_dir, num_threads=args.threads, runtime_profile=None,
+                                 model=base)
+        references, _ = transcribe_entries(engine, entries)
+        del engine
+
+    # 3. One pruned copy per point
+    print(f"Step 2: Evaluating {len(args.points)} points...")
+    points = []
+    for text in args.points:
+        heads, ffn, layers = parse_point(text)
+        name = point_name(heads, ffn, layers)
+        plan = make_plan(importance, heads, ffn, layers, min_heads=args.min_heads)
+        model = apply_plan(copy.deepcopy(base), plan)
+        params = count_parameters(model)
+        result = evaluate_model(args.model_dir, entries, references, artifact="pytorch", num_threads=args.threads,
+                                runtime_profile=None, model=model)
+        result.update({"name": name, "head_fraction": heads, "ffn_fraction": ffn, "drop_layers": layers,
+                       "dropped_layers": [i for i in range(len(importance["layers"])) if i not in plan["layers"]],
+                       "parameters": params, "sparsity": 1 - params / base_params})
+
+        if args.export:
+            out_dir = os.path.join(PRUNED_DIR, name)
+            save_pruned(model, plan, out_dir, args.model_dir)
+            del model
+            onnx_path = export(out_dir, args.openvino)
+            onnx_result = evaluate_model(onnx_path, entries, references, artifact="onnx", num_threads=args.threads,
+                                         runtime_profile=None)
+            result.update({"model_dir": out_dir, "onnx_wer": onnx_result["wer"],
+                           "onnx_latency_p50_ms": onnx_result["latency_p50_ms"]})
+        else:
+            del model
+        points.append(result)
+        onnx_note = f" | onnx p50 {result['onnx_latency_p50_ms']:8.1f} ms" if "onnx_latency_p50_ms" in result else ""
+        print(f"  {name:16} | sparsity {result['sparsity'] * 100:5.1f}% | WER {result['wer'] * 100:6.2f}% "
+              f"| p50 {result['latency_p50_ms']:8.1f} ms{onnx_note}")
+
+    # 4. Curve
+    baseline = next((p for p in points if p["sparsity"] == 0), None)
+    report = {"model_dir": args.model_dir, "parameters": base_params, "baseline": baseline, "points": points}
+    with open(os.path.join(REPORT_DIR, "pruning_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    plot_curve(points, REPORT_DIR)
+    print(f"\n✅ Pruning sweep complete. Report: {REPORT_DIR}")
+    if args.export:
+        print(f"👉 Pruned checkpoints in {PRUNED_DIR}; run 03a_optimize_graph.py --input <point>/onnx/model.onnx "
+              f"--model-dir <point> to optimize one for serving.")
+
+
+if __name__ == "__main__":
+    run_pruning()
@@ -0,0 +1,197 @@
+import os
+
+import numpy as np
+import onnx
+
+from inference_engine import model_feeds
+
+FP16_MAX = 65504.0
+FP16_MIN_NORMAL = 6.103515625e-05
+BF16_MAX = 3.3895313892515355e38
+
+# |x| histogram on a log2 scale: 4 bins per octave from 2^-32 to 2^130
+HIST_BINS_PER_OCTAVE = 4
+HIST_MIN_EXP = -32
+HIST_MAX_EXP = 130
+HIST_SIZE = (HIST_MAX_EXP - HIST_MIN_EXP) * HIST_BINS_PER_OCTAVE
+
+
+def float_tensor_names(model, op_types=None):
+    """Names of node outputs that are (or may be) float32.
+
+    Contrib ops from the ORT optimizer (Attention, SkipLayerNormalization) have no ONNX shape
+    inference, so untyped outputs are kept too; non-float values are skipped at runtime.
+    """
+    inferred = onnx.shape_inference.infer_shapes(model)
+    types = {vi.name: vi.type.tensor_type.elem_type
+             for vi in list(inferred.graph.value_info) + list(inferred.graph.output)}
+    names = []
+    for node in model.graph.node:
+        if op_types is not None and node.op_type not in op_types:
+            continue
+        names.extend(out for out in node.output
+                     if out and types.get(out, onnx.TensorProto.FLOAT) == onnx.TensorProto.FLOAT)
+    return names
+
+
+class RunningTensorStats:
+    """Constant-memory summary of every value a tensor took across many runs."""
+
+    def __init__(self):
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.zeros = 0
+        self.nonfinite = 0
+        self.fp16_overflow = 0
+        self.fp16_underflow = 0
+        self.bf16_overflow = 0
+        self.histogram = np.zeros(HIST_SIZE, dtype=np.int64)
+
+    def update(self, value):
+        value = value.ravel()
+        finite = np.isfinite(value)
+        self.count += value.size
+        self.nonfinite += int(value.size - finite.sum())
+        value = value[finite].astype(np.float64)
+        if not value.size:
+            return
+        self.min = min(self.min, float(value.min()))
+        self.max = max(self.max, float(value.max()))
+        self.sum += float(value.sum())
+        self.sum_sq += float(np.dot(value, value))
+
+        magnitude = np.abs(value)
+        nonzero = magnitude[magnitude > 0]
+        self.zeros += int(value.size - nonzero.size)
+        self.fp16_overflow += int((nonzero > FP16_MAX).sum())
+        self.fp16_underflow += int((nonzero < FP16_MIN_NORMAL).sum())
+        self.bf16_overflow += int((nonzero > BF16_MAX).sum())
+        bins = np.floor((np.log2(nonzero) - HIST_MIN_EXP) * HIST_BINS_PER_OCTAVE).astype(np.int64)
+        self.histogram += np.bincount(np.clip(bins, 0, HIST_SIZE - 1), minlength=HIST_SIZE)
+
+    def abs_percentile(self, q):
+        # Upper edge of the histogram bin holding the q-th percentile of |x| (zeros included)
+        target = q / 100 * (self.count - self.nonfinite)
+        if target <= self.zeros:
+            return 0.0
+        idx = int(np.searchsorted(np.cumsum(self.histogram), target - self.zeros))
+        edge = 2.0 ** (HIST_MIN_EXP + (idx + 1) / HIST_BINS_PER_OCTAVE)
+        return float(min(edge, max(abs(self.min), abs(self.max))))
+
+    def abs_histogram(self):
+        """Non-zero |x| counts over the occupied span of the log2 histogram: len(edges) == len(counts) + 1."""
+        occupied = np.nonzero(self.histogram)[0]
+        if not occupied.size:
+            return {"edges": [], "counts": []}
+        first, last = int(occupied[0]), int(occupied[-1])
+        exponents = HIST_MIN_EXP + np.arange(first, last + 2) / HIST_BINS_PER_OCTAVE
+        return {"edges": (2.0 ** exponents).tolist(), "counts": self.histogram[first:last + 1].tolist()}
+
+    def summary(self):
+        finite = max(self.count - self.nonfinite, 1)
+        mean = self.sum / finite
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "abs_max": max(abs(self.min), abs(self.max)),
+            "mean": mean,
+            "std": float(np.sqrt(max(self.sum_sq / finite - mean ** 2, 0.0))),
+            "abs_p50": self.abs_percentile(50),
+            "abs_p99": self.abs_percentile(99),
+            "abs_p99_99": self.abs_percentile(99.99),
+            "zeros": self.zeros,
+            "nonfinite": self.nonfinite,
+            "fp16_overflow": self.fp16_overflow,
+            "fp16_underflow": self.fp16_underflow,
+            "bf16_overflow": self.bf16_overflow,
+            "abs_histogram": self.abs_histogram(),
+        }
+
+
+class ActivationRangeCollector:
+    """Exposes intermediate outputs of an ONNX graph and streams their statistics over many inputs.
+
+    The augmented graph is written next to the source model so its external weights
+    (model.onnx.data) resolve without being copied or loaded into Python. Outputs are reduced
+    to RunningTensorStats right after each run, so no activation outlives its update() call.
+    """
+
+    def __init__(self, model_path, tensor_names=None, op_types=None, num_threads=None):
+        import onnxruntime as ort
+
+        model = onnx.load(model_path, load_external_data=False)
+        self.tensor_names = tensor_names or float_tensor_names(model, op_types)
+        self.producers = {out: node.name for node in model.graph.node for out in node.output}
+        self.op_types = {out: node.op_type for node in model.graph.node for out in node.output}
+
+        existing = {o.name for o in model.graph.output}
+        for name in self.tensor_names:
+            if name not in existing:
+                model.graph.output.append(onnx.ValueInfoProto(name=name))
+
+        self._augmented_path = model_path + ".activations.onnx"
+        onnx.save(model, self._augmented_path)
+        options = ort.SessionOptions()
+        # Keep the graph as exported so every requested tensor still exists
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(self._augmented_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.stats = {name: RunningTensorStats() for name in self.tensor_names}
+
+    def update(self, input_values):
+        feeds = model_feeds(self.input_names, input_values)
+        outputs = self.session.run(self.tensor_names, feeds)
+        for name, value in zip(self.tensor_names, outputs):
+            if value.size and value.dtype.kind == "f":
+                self.stats[name].update(value)
+        del outputs
+
+    def ranges(self):
+        return {
+            name: dict(self.stats[name].summary(), node=self.producers.get(name, ""), op_type=self.op_types.get(name, ""))
+            for name in self.tensor_names
+            if self.stats[name].count
+        }
+
+    def close(self):
+        self.session = None
+        if os.path.exists(self._augmented_path):
+            os.remove(self._augmented_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def profile_activations(model_path, inputs, tensor_names=None, op_types=None, outputs_per_pass=200, num_threads=None):
+    """Runs `inputs` through the graph in passes of at most `outputs_per_pass` exposed tensors.
+
+    Exposing every intermediate of the 24-layer graph at once would hold all activations of
+    a run in memory; passes bound that to one subset at a time. `inputs` must be re-iterable.
+    """
+    if tensor_names is None:
+        tensor_names = float_tensor_names(onnx.load(model_path, load_external_data=False), op_types)
+
+    results = {}
+    for start in range(0, len(tensor_names), outputs_per_pass):
+        subset = tensor_names[start:start + outputs_per_pass]
+        print(f"  Pass {start // outputs_per_pass + 1}: tensors {start}-{start + len(subset) - 1} of {len(tensor_names)}")
+        with ActivationRangeCollector(model_path, subset, num_threads=num_threads) as collector:
+            for input_values in inputs:
+                collector.update(input_values)
+            results.update(collector.ranges())
+    return results
+
+
+def overflow_risk(stats):
+    # Ranking key: actual FP16 overflows first, then how close the tail gets to 65504
+    finite = max(stats["count"] - stats["nonfinite"], 1)
+    return (stats["nonfinite"] > 0, stats["fp16_overflow"] / finite, stats["abs_max"] / FP16_MAX)
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import argparse
+from math import gcd
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from inference_engine import PROJECT_ROOT, SAMPLE_RATE, normalize
+
+STORE_DIR = os.path.join(PROJECT_ROOT, "data", "audio_store")
+DEFAULT_SHARD_BYTES = 1024 ** 3
+
+
+def resample(audio, sr, target_sr=SAMPLE_RATE):
+    # Polyphase FIR (scipy resample_poly): exact rational ratio, far cheaper than librosa's soxr_hq/FFT paths
+    if sr == target_sr:
+        return audio
+    from scipy.signal import resample_poly
+    g = gcd(int(sr), int(target_sr))
+    return resample_poly(audio, target_sr // g, sr // g)
+
+
+def decode_audio(path, target_sr=SAMPLE_RATE):
+    """Mono float32 at target_sr. libsndfile for WAV/FLAC (and MP3 on libsndfile >= 1.1), librosa otherwise."""
+    try:
+        import soundfile as sf
+        audio, sr = sf.read(path, dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1)
+    except Exception:
+        import librosa
+        audio, sr = librosa.load(path, sr=None, mono=True)
+    return np.ascontiguousarray(resample(audio, sr, target_sr), dtype=np.float32)
+
+
+def _ingest(path, apply_normalize):
+    # Process-pool worker: decode + resample + Wav2Vec2Processor normalization
+    try:
+        audio = decode_audio(path)
+        return path, normalize(audio) if apply_normalize else audio, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def build_store(paths, store_dir=STORE_DIR, workers=None, apply_normalize=True, shard_bytes=DEFAULT_SHARD_BYTES,
+                texts=None):
+    """Decodes `paths` in a process pool and appends them to float32 shard files under store_dir.
+
+    index.json maps every utterance to (shard, offset, length); AudioStore memory-maps the shards.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    texts = texts or [""] * len(paths)
+    index = {"sample_rate": SAMPLE_RATE, "normalized": apply_normalize, "shards": [], "items": [], "errors": {}}
+    shard, shard_size = None, 0
+
+    def open_shard():
+        name = f"shard_{len(index['shards']):04d}.f32"
+        index["shards"].append(name)
+        return open(os.path.join(store_dir, name), "wb")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_ingest, paths, [apply_normalize] * len(paths), chunksize=4)
+        for (path, audio, error), text in zip(results, texts):
+            if error is not None:
+                index["errors"][path] = error
+                print(f"⚠️ Skipping {path}: {error}")
+                continue
+            if shard is None or shard_size + audio.nbytes > shard_bytes:
+                if shard is not None:
+                    shard.close()
+                shard, shard_size = open_shard(), 0
+            index["items"].append({"path": os.path.abspath(path), "text": text, "shard": len(index["shards"]) - 1,
+                                   "offset": shard_size // 4, "length": len(audio)})
+            audio.tofile(shard)
+            shard_size += audio.nbytes
+    if shard is not None:
+        shard.close()
+
+    with open(os.path.join(store_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    return AudioStore(store_dir)
+
+
+class AudioStore:
+    """Read-only view over a build_store() directory.
+
+    Items are slices of np.memmap shards: contiguous float32 by construction, paged in on first
+    touch and shared between processes through the page cache, with no decode on any later run.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        with open(os.path.join(store_dir, "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+        self.store_dir = store_dir
+        self.normalized = index["normalized"]
+        self.items = index["items"]
+        self.errors = index["errors"]
+        self._shard_names = index["shards"]
+        self._shards = {}
+        self._by_path = {item["path"]: i for i, item in enumerate(self.items)}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._by_path
+
+    def _shard(self, i):
+        if i not in self._shards:
+            self._shards[i] = np.memmap(os.path.join(self.store_dir, self._shard_names[i]), dtype=np.float32, mode="r")
+        return self._shards[i]
+
+    def __getitem__(self, i):
+        item = self.items[i]
+        return self._shard(item["shard"])[item["offset"]:item["offset"] + item["length"]]
+
+    def get(self, path):
+        return self[self._by_path[os.path.abspath(path)]]
+
+    def entries(self):
+        # Same shape as evaluation.load_manifest()
+        return [(item["path"], item["text"]) for item in self.items]
+
+    @property
+    def total_seconds(self):
+        return sum(item["length"] for item in self.items) / SAMPLE_RATE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode a corpus once into a memory-mapped float32 shard store.")
+    parser.add_argument("source", help="Directory of audio or a manifest (TSV/JSONL)")
+    parser.add_argument("--output", default=STORE_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--raw", action="store_true", help="Store resampled audio without normalization")
+    parser.add_argument("--shard-gb", type=float, default=1.0)
+    parser.add_argument("--compare", type=int, default=0, help="Also time librosa.load on the first N files")
+    args = parser.parse_args()
+
+    from calibration import list_audio
+    from evaluation import load_manifest
+
+    if os.path.isdir(args.source):
+        paths, texts = list_audio(args.source), None
+    else:
+        entries = load_manifest(args.source)
+        paths, texts = [p for p, _ in entries], [t for _, t in entries]
+
+    start = time.perf_counter()
+    store = build_store(paths, args.output, args.workers, not args.raw, int(args.shard_gb * 1024 ** 3), texts)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(store)} files ({store.total_seconds / 3600:.2f} h) ingested in {elapsed:.1f}s "
+          f"with {args.workers} workers -> {args.output}")
+
+    if args.compare:
+        from inference_engine import load_audio
+        sample = paths[:args.compare]
+        start = time.perf_counter()
+        for p in sample:
+            load_audio(p)
+        sequential = time.perf_counter() - start
+        start = time.perf_counter()
+        for p in sample:
+            np.asarray(store.get(p)).sum()
+        mapped = time.perf_counter() - start
+        print(f"librosa.load x{len(sample)}: {sequential:.2f}s | store reads: {mapped * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import io
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from inference_engine import ARTIFACTS, SAMPLE_RATE, get_engine, normalize, num_frames
+from metrics import METRICS, run_every
+
+
+class _Request:
+    __slots__ = ("input_values", "future", "arrival", "cache_key")
+
+    def __init__(self, input_values, cache_key=None):
+        self.input_values = input_values
+        self.future = Future()
+        self.arrival = time.perf_counter()
+        self.cache_key = cache_key
+
+
+class BatchingServer:
+    """Collects requests for a short window, groups them by length and runs one batched call per bucket.
+
+    Requests are bucketed by duration (bucket_width_s) so padding inside a batch stays small.
+    A bucket is flushed when it reaches max_batch_size or when its oldest request has waited
+    batch_window_ms. Each caller gets back the logits for its own utterance, trimmed to its
+    real frame count. Models exported without an attention_mask input can't ignore padding, so
+    for those only equal-length requests share a batch. With an engine result cache, repeated
+    audio is answered before it is queued and never takes a batch slot.
+    """
+
+    def __init__(self, engine, max_batch_size=8, batch_window_ms=10.0, bucket_width_s=2.0):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.bucket_width = int(bucket_width_s * SAMPLE_RATE) if engine.accepts_attention_mask else 1
+        self.queue = queue.Queue()
+        self.buckets = {}
+        self.batch_log = []
+        self._running = False
+        self._thread = None
+        # Guards _running against submits racing stop(), so nothing lands in the queue after the drain
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name="batching-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        # Don't leave callers hanging on requests that never ran: queued ones included
+        while True:
+            try:
+                request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.buckets.setdefault(self._bucket_id(request), []).append(request)
+        for bucket in self.buckets.values():
+            for start in range(0, len(bucket), self.max_batch_size):
+                self._run_batch(bucket[start:start + self.max_batch_size])
+        self.buckets.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, audio):
+        """Future of the logits for one utterance."""
+        with METRICS.stage("normalize"):
+            input_values = normalize(audio)
+        key = None
+        cache = self.engine.result_cache
+        if cache is not None:
+            key, _ = self.engine._cache_key(input_values)
+            _, logits = cache.get(key)
+            if logits is not None:
+                future = Future()
+                future.set_result(logits)
+                return future
+        return self._enqueue(input_values, key)
+
+    def _enqueue(self, input_values, cache_key=None):
+        request = _Request(input_values, cache_key)
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("BatchingServer is not running; call start() first")
+            self.queue.put(request)
+        return request.future
+
+    def transcribe(self, audio, timeout=None):
+        start = time.perf_counter()
+        cache = self.engine.result_cache
+        if cache is None:
+            text = self.engine.decode(self.submit(audio).result(timeout))
+        else:
+            with METRICS.stage("normalize"):
+                input_values = normalize(audio)
+            key, decoder = self.engine._cache_key(input_values)
+            text, logits = cache.get(key, decoder)
+            if text is None:
+                # Cached logits for another decoder still skip the queue and the model
+                if logits is None:
+                    logits = self._enqueue(input_values, key).result(timeout)
+                text = self.engine.decode(logits)
+                cache.put(key, logits, decoder, text)
+        if len(audio):
+            METRICS.observe("asr_real_time_factor", (time.perf_counter() - start) * SAMPLE_RATE / len(audio))
+        return text
+
+    def _bucket_id(self, request):
+        return len(request.input_values) // self.bucket_width
+
+    def _loop(self):
+        while self._running:
+            # Sleep until the next request or the oldest bucket's deadline, whichever comes first
+            now = time.perf_counter()
+            deadlines = [bucket[0].arrival + self.batch_window for bucket in self.buckets.values()]
+            timeout = max(0.0, min(deadlines) - now) if deadlines else 0.05
+            try:
+                request = self.queue.get(timeout=timeout)
+                bucket = self.buckets.setdefault(self._bucket_id(request), [])
+                bucket.append(request)
+                if len(bucket) >= self.max_batch_size:
+                    self._run_batch(self.buckets.pop(self._bucket_id(request)))
+            except queue.Empty:
+                pass
+
+            now = time.perf_counter()
+            for bucket_id in [b for b, reqs in self.buckets.items() if now - reqs[0].arrival >= self.batch_window]:
+                self._run_batch(self.buckets.pop(bucket_id))
+
+    def _run_batch(self, requests):
+        lengths = np.array([len(r.input_values) for r in requests])
+        max_len = int(lengths.max())
+
+        # Right-pad with zeros (padding_value=0 in preprocessor_config.json) + attention mask
+        with METRICS.stage("pad", batch_size=len(requests)):
+            input_values = np.zeros((len(requests), max_len), dtype=np.float32)
+            attention_mask = np.zeros((len(requests), max_len), dtype=np.int64)
+            for i, r in enumerate(requests):
+                input_values[i, :lengths[i]] = r.input_values
+                attention_mask[i, :lengths[i]] = 1
+
+        start = time.perf_counter()
+        padding_ratio = float(1 - lengths.sum() / (max_len * len(requests)))
+        METRICS.observe("asr_batch_size", len(requests))
+        METRICS.observe("asr_padding_ratio", padding_ratio)
+        for r in requests:
+            METRICS.observe("asr_queue_wait_seconds", start - r.arrival)
+        try:
+            logits = self.engine.batch_logits(input_values, attention_mask)
+        except Exception as e:
+            for r in requests:
+                r.future.set_exception(e)
+            return
+        end = time.perf_counter()
+
+        frames = num_frames(lengths)
+        cache = self.engine.result_cache
+        for i, r in enumerate(requests):
+            if cache is not None and r.cache_key is not None:
+                cache.put(r.cache_key, logits[i, :frames[i]])
+            r.future.set_result(logits[i, :frames[i]])
+
+        self.batch_log.append({
+            "batch_size": len(requests),
+            "padding_ratio": padding_ratio,
+            "queue_wait_ms": float((start - min(r.arrival for r in requests)) * 1000),
+            "compute_ms": float((end - start) * 1000),
+        })
+
+
+def make_handler(server, metrics_text=None):
+    # metrics_text: what GET /metrics serves; prefork_server.py passes the merge of all workers
+    metrics_text = metrics_text or METRICS.prometheus_text
+
+    class TranscribeHandler(BaseHTTPRequestHandler):
+        # GET /metrics -> Prometheus text (this process's histograms by default)
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            payload = metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        # POST /transcribe with a WAV/FLAC body -> {"text": ...}
+        def do_POST(self):
+            if self.path != "/transcribe":
+                self.send_error(404)
+                return
+            import soundfile as sf
+
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                with METRICS.stage("audio_decode"):
+                    audio, sr = sf.read(io.BytesIO(body), dtype="float32", always_2d=True)
+                    audio = audio.mean(axis=1)
+            except Exception as e:
+                self.send_error(400, f"Could not decode audio: {e}")
+                return
+            try:
+                if sr != SAMPLE_RATE:
+                    import librosa
+                    with METRICS.stage("resample"):
+                        audio = librosa.resample(audio, orig_sr=sr, target_sr=SAMPLE_RATE)
+                text = server.transcribe(audio)
+            except ValueError as e:
+                # Input the model can't take (e.g. outside every shape profile)
+                self.send_error(400, str(e))
+                return
+            except Exception as e:
+                self.send_error(500, f"Transcription failed: {e}")
+                return
+            payload = json.dumps({"text": text}, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return TranscribeHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local dynamic-batching ASR server.")
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--batch-window-ms", type=float, default=10.0)
+    parser.add_argument("--bucket-width-s", type=float, default=2.0)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--result-cache", action="store_true",
+                        help="Answer repeated audio from the result cache (memory + models/cache/results)")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Also write /metrics here every --metrics-interval-s and on shutdown (textfile collector)")
+    parser.add_argument("--metrics-interval-s", type=float, default=15.0)
+    parser.add_argument("--trace", default=None, help="Record a Chrome trace of every stage, written on shutdown")
+    args = parser.parse_args()
+
+    if args.trace:
+        METRICS.start_trace()
+    engine = get_engine(args.artifact, num_threads=args.threads, result_cache=args.result_cache or None)
+    server = BatchingServer(engine, args.max_batch_size, args.batch_window_ms, args.bucket_width_s).start()
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(server))
+    writer = run_every(args.metrics_interval_s, lambda: METRICS.dump(args.metrics_file)) if args.metrics_file else None
+    print(f"✅ Serving {args.artifact} on http://{args.host}:{args.port}/transcribe")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        server.stop()
+        if writer is not None:
+            writer.set()
+            METRICS.dump(args.metrics_file)
+        if args.trace:
+            print(f"Trace with {METRICS.export_trace(args.trace)} stage events saved to {args.trace}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import glob
+
+import numpy as np
+
+from onnxruntime.quantization import CalibrationDataReader
+
+from inference_engine import SAMPLE_RATE, load_audio, normalize
+from evaluation import load_manifest
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3")
+
+
+def list_audio(source):
+    # A directory of audio files or a manifest (TSV/JSONL, see evaluation.load_manifest)
+    if os.path.isdir(source):
+        files = [p for p in glob.glob(os.path.join(source, "**", "*"), recursive=True)
+                 if p.lower().endswith(AUDIO_EXTENSIONS)]
+        return sorted(files)
+    return [path for path, _ in load_manifest(source)]
+
+
+class WavCalibrationReader(CalibrationDataReader):
+    """Streams local audio through the Wav2Vec2Processor preprocessing, one utterance per batch.
+
+    Files are decoded lazily in get_next(), so only one utterance is in memory at a time.
+    max_seconds crops long files to bound the calibrator's activation memory.
+    """
+
+    def __init__(self, source, max_files=None, max_seconds=10.0, input_name="input_values", with_attention_mask=False):
+        # An audio_store directory is read from its memory-mapped shards instead of decoding files
+        self.store = None
+        if os.path.exists(os.path.join(source, "index.json")):
+            from audio_store import AudioStore
+            self.store = AudioStore(source)
+        self._all_files = ([path for path, _ in self.store.entries()] if self.store is not None
+                           else list_audio(source))[:max_files]
+        self.files = self._all_files
+        if not self.files:
+            raise FileNotFoundError(f"No calibration audio found in {source}")
+        self.max_samples = int(max_seconds * SAMPLE_RATE) if max_seconds else None
+        self.input_name = input_name
+        # Exports with an attention_mask input (02a) need it in every feed
+        self.with_attention_mask = with_attention_mask
+        self._index = 0
+
+    def __len__(self):
+        return len(self.files)
+
+    def get_next(self):
+        if self._index >= len(self.files):
+            return None
+        path = self.files[self._index]
+        self._index += 1
+        # normalize() is affine-invariant, so re-normalizing a stored (normalized) crop is exact
+        audio = self.store.get(path) if self.store is not None else load_audio(path)
+        input_values = normalize(audio[:self.max_samples])[None, :]
+        if self.with_attention_mask:
+            return {self.input_name: input_values, "attention_mask": np.ones(input_values.shape, dtype=np.int64)}
+        return {self.input_name: input_values}
+
+    def rewind(self):
+        self._index = 0
+
+    def set_range(self, start_index, end_index):
+        # Used by ORT's CalibStridedMinMax option to calibrate in strides
+        self.files = self._all_files[start_index:end_index]
+        self._index = 0
+
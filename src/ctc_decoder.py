@@ -0,0 +1,223 @@
+import os
+import json
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from inference_engine import MODEL_DIR
+
+NEG_INF = -float("inf")
+
+
+def load_labels(model_dir=MODEL_DIR):
+    # alphabet.json holds the display string of every vocab id ("" for <pad>, " " for "|")
+    with open(os.path.join(model_dir, "vocab.json"), encoding="utf-8") as f:
+        vocab = json.load(f)
+    with open(os.path.join(model_dir, "alphabet.json"), encoding="utf-8") as f:
+        labels = list(json.load(f)["labels"])
+    if len(labels) != len(vocab):
+        raise ValueError(f"alphabet.json has {len(labels)} labels but vocab.json has {len(vocab)} ids")
+    # <s> / </s> never belong in a transcript
+    for token in ("<s>", "</s>"):
+        labels[vocab[token]] = ""
+    return labels, vocab
+
+
+def log_softmax(logits):
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    return logits - np.log(np.exp(logits).sum(axis=-1, keepdims=True))
+
+
+class GreedyCTCDecoder:
+    """Batched greedy CTC decoding with no per-frame Python loop."""
+
+    def __init__(self, model_dir=MODEL_DIR):
+        labels, vocab = load_labels(model_dir)
+        self.labels = np.array(labels, dtype=object)
+        self.blank_id = vocab["<pad>"]
+        # Ids that never produce a character
+        self.silent = np.array([label == "" for label in labels])
+
+    def collapse(self, pred_ids, lengths=None, last_ids=None):
+        """Boolean mask of frames that survive CTC collapse for (batch, frames) ids.
+
+        last_ids carries the final id of a previous chunk so repeats across chunk
+        boundaries collapse too (used by the streaming transcriber).
+        """
+        batch, frames = pred_ids.shape
+        keep = np.empty((batch, frames), dtype=bool)
+        keep[:, 0] = True if last_ids is None else pred_ids[:, 0] != last_ids
+        keep[:, 1:] = pred_ids[:, 1:] != pred_ids[:, :-1]
+        keep &= ~self.silent[pred_ids]
+        if lengths is not None:
+            keep &= np.arange(frames)[None, :] < np.asarray(lengths)[:, None]
+        return keep
+
+    def ids_to_text(self, pred_ids, keep):
+        if pred_ids.shape[0] == 0:
+            # np.split of an empty array still yields one part, i.e. a phantom transcript
+            return []
+        rows, cols = np.nonzero(keep)
+        chars = self.labels[pred_ids[rows, cols]]
+        # Split the flat character array back into one run per utterance
+        bounds = np.searchsorted(rows, np.arange(1, pred_ids.shape[0]))
+        return [" ".join("".join(part).split()) for part in np.split(chars, bounds)]
+
+    def decode_batch(self, logits, lengths=None):
+        # logits: (batch, frames, vocab) padded; lengths: valid frames per utterance
+        pred_ids = np.argmax(logits, axis=-1)
+        return self.ids_to_text(pred_ids, self.collapse(pred_ids, lengths))
+
+    def decode(self, logits):
+        return self.decode_batch(logits[None])[0]
+
+
+class NGramLanguageModel:
+    """Word-level n-gram scorer loaded from an ARPA file (KenLM binary/ARPA if kenlm is installed)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._kenlm = None
+        try:
+            import kenlm
+            self._kenlm = kenlm.Model(path)
+            self.order = self._kenlm.order
+            return
+        except ImportError:
+            if not path.endswith(".arpa"):
+                raise ImportError("kenlm is required for binary LMs (pip install kenlm) - or pass an .arpa file")
+        self.order, self.probs, self.backoffs = self._read_arpa(path)
+
+    @staticmethod
+    def _read_arpa(path):
+        probs, backoffs = {}, {}
+        order = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("\\") and line.endswith("-grams:"):
+                    order = int(line[1:line.index("-")])
+                    continue
+                if not line or order == 0 or line.startswith("\\"):
+                    continue
+                parts = line.split("\t")
+                if len(parts) < 2:
+                    parts = line.split()
+                    parts = [parts[0], " ".join(parts[1:order + 1])] + parts[order + 1:]
+                ngram = tuple(parts[1].split())
+                # ARPA stores log10; keep natural log to match acoustic scores
+                probs[ngram] = float(parts[0]) * math.log(10)
+                if len(parts) > 2:
+                    backoffs[ngram] = float(parts[2]) * math.log(10)
+        return order, probs, backoffs
+
+    def score(self, context, word):
+        """Natural-log P(word | context) with standard back-off."""
+        context = tuple(context)[-(self.order - 1):] if self.order > 1 else ()
+        if self._kenlm is not None:
+            state_words = list(context) + [word]
+            # kenlm full_scores yields log10 per word; only the last one is the new word
+            scores = list(self._kenlm.full_scores(" ".join(state_words), bos=not context, eos=False))
+            return scores[-1][0] * math.log(10)
+
+        backoff = 0.0
+        while True:
+            ngram = context + (word,)
+            if ngram in self.probs:
+                return backoff + self.probs[ngram]
+            if not context:
+                return backoff + self.probs.get(("<unk>",), -100.0)
+            backoff += self.backoffs.get(context, 0.0)
+            context = context[1:]
+
+
+class BeamSearchCTCDecoder:
+    """CTC prefix beam search with optional n-gram shallow fusion.
+
+    alpha weights the LM score, beta is the per-word insertion bonus. token_min_logp skips
+    unlikely tokens per frame and beam_prune_logp drops beams that fall too far behind the best.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, lm_path=None, beam_width=16, alpha=0.5, beta=1.0,
+                 token_min_logp=-8.0, beam_prune_logp=-10.0):
+        labels, vocab = load_labels(model_dir)
+        self.labels = labels
+        self.blank_id = vocab["<pad>"]
+        self.space_id = vocab["|"]
+        self.silent = {i for i, label in enumerate(labels) if label == ""} - {self.blank_id}
+        self.lm = NGramLanguageModel(lm_path) if lm_path else None
+        self.beam_width = beam_width
+        self.alpha = alpha
+        self.beta = beta
+        self.token_min_logp = token_min_logp
+        self.beam_prune_logp = beam_prune_logp
+        self._lm_cache = {}
+
+    def _words(self, prefix):
+        return "".join(self.labels[i] for i in prefix).split()
+
+    def _lm_bonus(self, prefix):
+        # Score the word that `prefix` just completed, given the words before it
+        if self.lm is None:
+            return 0.0
+        if prefix not in self._lm_cache:
+            words = self._words(prefix)
+            if not words:
+                self._lm_cache[prefix] = 0.0
+            else:
+                self._lm_cache[prefix] = self.alpha * self.lm.score(words[:-1], words[-1]) + self.beta
+        return self._lm_cache[prefix]
+
+    def decode(self, logits):
+        log_probs = log_softmax(np.asarray(logits, dtype=np.float32))
+        # prefix (tuple of collapsed ids) -> [log P(ends in blank), log P(ends in non-blank), lm score]
+        beams = {(): [0.0, NEG_INF, 0.0]}
+
+        for frame in log_probs:
+            candidates = np.nonzero(frame >= self.token_min_logp)[0]
+            if len(candidates) == 0:
+                candidates = [int(np.argmax(frame))]
+            next_beams = defaultdict(lambda: [NEG_INF, NEG_INF, 0.0])
+
+            for prefix, (p_b, p_nb, lm) in beams.items():
+                p_total = np.logaddexp(p_b, p_nb)
+                for token in candidates:
+                    p = float(frame[token])
+                    if token == self.blank_id or token in self.silent:
+                        entry = next_beams[prefix]
+                        entry[0] = np.logaddexp(entry[0], p_total + p)
+                        entry[2] = lm
+                        continue
+
+                    new_prefix = prefix + (int(token),)
+                    entry = next_beams[new_prefix]
+                    bonus = self._lm_bonus(prefix) if token == self.space_id and prefix and prefix[-1] != self.space_id else 0.0
+                    entry[2] = lm + bonus
+                    if prefix and prefix[-1] == token:
+                        # "a a" only becomes "aa" through a blank; without one it collapses
+                        entry[1] = np.logaddexp(entry[1], p_b + p)
+                        same = next_beams[prefix]
+                        same[1] = np.logaddexp(same[1], p_nb + p)
+                        same[2] = lm
+                    else:
+                        entry[1] = np.logaddexp(entry[1], p_total + p)
+
+            scored = sorted(next_beams.items(), key=lambda kv: np.logaddexp(kv[1][0], kv[1][1]) + kv[1][2], reverse=True)
+            best = np.logaddexp(scored[0][1][0], scored[0][1][1]) + scored[0][1][2]
+            beams = dict(kv for kv in scored[:self.beam_width]
+                         if np.logaddexp(kv[1][0], kv[1][1]) + kv[1][2] >= best + self.beam_prune_logp)
+
+        def final_score(item):
+            prefix, (p_b, p_nb, lm) = item
+            # The last word never saw a delimiter, so score it here
+            tail = self._lm_bonus(prefix) if prefix and prefix[-1] != self.space_id else 0.0
+            return np.logaddexp(p_b, p_nb) + lm + tail
+
+        best_prefix = max(beams.items(), key=final_score)[0]
+        return " ".join(self._words(best_prefix))
+
+    def decode_batch(self, logits, lengths=None):
+        if lengths is None:
+            lengths = [logits.shape[1]] * logits.shape[0]
+        return [self.decode(logits[i, :lengths[i]]) for i in range(logits.shape[0])]
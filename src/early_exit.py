@@ -0,0 +1,148 @@
+import os
+import json
+import argparse
+
+import numpy as np
+
+from inference_engine import ONNX_DIR, SAMPLE_AUDIO, SAMPLE_RATE, load_audio, normalize
+from metrics import METRICS
+
+EARLY_EXIT_DIR = os.path.join(ONNX_DIR, "early_exit")
+SPEC_FILE = "early_exit.json"
+# Exits after these encoder layers; the last layer (24) is always the final one
+DEFAULT_EXIT_LAYERS = (12, 16, 20)
+CRITERIA = ("confidence", "agreement")
+
+
+def load_spec(model_dir=EARLY_EXIT_DIR):
+    path = os.path.join(model_dir, SPEC_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No early-exit segments at {model_dir}. Run 02e_export_early_exit.py first.")
+    with open(path) as f:
+        return json.load(f)
+
+
+def exit_confidence(logits, silent, quantile=0.1):
+    """Low quantile of the per-frame max softmax probability over frames that emit a character.
+
+    Blank frames are nearly always confident and would drown out the few uncertain characters.
+    """
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    max_prob = 1.0 / np.exp(shifted).sum(axis=-1)
+    emitting = ~silent[logits.argmax(axis=-1)]
+    values = max_prob[emitting] if emitting.any() else max_prob
+    return float(np.quantile(values, quantile))
+
+
+class _OrtSegment:
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run(self, values):
+        hidden, logits = self.session.run(["exit_hidden_states", "logits"], {self.input_name: values})
+        return hidden, logits
+
+
+class _OpenVINOSegment:
+    def __init__(self, path, num_threads=None):
+        import openvino as ov
+
+        config = {"INFERENCE_NUM_THREADS": num_threads} if num_threads else {}
+        # OpenVINO reads the ONNX segments directly
+        self.compiled = ov.Core().compile_model(path, "CPU", config)
+        self.request = self.compiled.create_infer_request()
+
+    def run(self, values):
+        result = self.request.infer({0: values})
+        # The request reuses its output buffers, so hand back copies
+        return result[self.compiled.output(0)].copy(), result[self.compiled.output(1)].copy()
+
+
+SEGMENT_BACKENDS = {"onnxruntime": _OrtSegment, "openvino": _OpenVINOSegment}
+
+
+class EarlyExitEngine:
+    """Runs the encoder segment by segment and stops at the first exit whose CTC output is settled.
+
+    criterion="confidence": the exit's low-quantile character confidence reaches `threshold`.
+    criterion="agreement": the exit's greedy transcript equals the previous exit's.
+    criterion=None always runs to full depth (the baseline, same graphs).
+    Single utterances only: a batch would have to run until its slowest member settles.
+    """
+
+    def __init__(self, model_dir=EARLY_EXIT_DIR, backend="onnxruntime", criterion="confidence", threshold=0.9,
+                 quantile=0.1, num_threads=None, decoder=None, warmup=True):
+        from ctc_decoder import GreedyCTCDecoder
+
+        if criterion is not None and criterion not in CRITERIA:
+            raise ValueError(f"Unknown criterion '{criterion}'. Choose from: {', '.join(CRITERIA)}")
+        self.spec = load_spec(model_dir)
+        self.exit_layers = self.spec["exit_layers"]
+        self.segments = [SEGMENT_BACKENDS[backend](os.path.join(model_dir, s["file"]), num_threads)
+                         for s in self.spec["segments"]]
+        self.criterion = criterion
+        self.threshold = threshold
+        self.quantile = quantile
+        self.decoder = decoder or GreedyCTCDecoder()
+        self.last_exit = None
+
+        if warmup:
+            self.logits(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    def _settled(self, logits, previous_text):
+        if self.criterion == "confidence":
+            return exit_confidence(logits, self.decoder.silent, self.quantile) >= self.threshold, None
+        text = self.decoder.decode(logits)
+        return previous_text is not None and text == previous_text, text
+
+    def logits(self, audio, normalized=False):
+        values = np.ascontiguousarray(audio, dtype=np.float32) if normalized else normalize(audio)
+        values, previous_text = values[None, :], None
+        for index, (segment, layer) in enumerate(zip(self.segments, self.exit_layers)):
+            with METRICS.stage("model", segment=index):
+                values, logits = segment.run(values)
+            if self.criterion is None or index == len(self.segments) - 1:
+                continue
+            settled, previous_text = self._settled(logits[0], previous_text)
+            if settled:
+                break
+        self.last_exit = layer
+        METRICS.observe("asr_exit_layer", layer)
+        return logits[0]
+
+    def decode(self, logits):
+        with METRICS.stage("ctc_decode"):
+            return self.decoder.decode(logits)
+
+    def transcribe(self, audio, return_logits=False, normalized=False):
+        if isinstance(audio, str):
+            audio, normalized = load_audio(audio), False
+        logits = self.logits(audio, normalized)
+        text = self.decode(logits)
+        return (text, logits) if return_logits else text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe with early exit from intermediate encoder layers.")
+    parser.add_argument("audio", nargs="?", default=SAMPLE_AUDIO)
+    parser.add_argument("--model-dir", default=EARLY_EXIT_DIR)
+    parser.add_argument("--backend", default="onnxruntime", choices=list(SEGMENT_BACKENDS))
+    parser.add_argument("--criterion", default="confidence", choices=CRITERIA)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    engine = EarlyExitEngine(args.model_dir, args.backend, args.criterion, args.threshold, num_threads=args.threads)
+    text = engine.transcribe(args.audio)
+    print(f"✅ Transcript (exit after layer {engine.last_exit} of {engine.spec['num_layers']}): {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import platform
+import tempfile
+from contextlib import contextmanager
+
+from inference_engine import PROJECT_ROOT
+
+CACHE_DIR = os.path.join(PROJECT_ROOT, "models", "cache")
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+# CPU features that change which kernels ORT / OpenVINO pick
+ISA_FLAGS = ("sse4_2", "avx", "avx2", "fma", "avx512f", "avx512bw", "avx512_vnni", "avx_vnni",
+             "avx512_bf16", "avx512_fp16", "amx_tile", "amx_bf16", "amx_int8")
+
+
+def model_files(model_path):
+    # The graph plus its weights: .onnx.data (external data) or the OpenVINO .bin next to .xml
+    files = [model_path]
+    for companion in (model_path + ".data", os.path.splitext(model_path)[0] + ".bin"):
+        if os.path.exists(companion):
+            files.append(companion)
+    return files
+
+
+@contextmanager
+def locked(path):
+    """Exclusive flock on `path` + ".lock" for a read-modify-write of `path` shared by workers."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    # Temp file + rename: readers never see a half-written file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def file_hash(path, index_path=None):
+    """sha256 over a model and its weight files, memoized by (path, size, mtime)."""
+    index_path = index_path or os.path.join(CACHE_DIR, "hash_index.json")
+    stats = [(os.path.abspath(p), os.path.getsize(p), os.stat(p).st_mtime_ns) for p in model_files(path)]
+    memo_key = json.dumps(stats)
+
+    index = load_json(index_path)
+    if memo_key in index:
+        return index[memo_key]
+
+    digest = hashlib.sha256()
+    for p, _, _ in stats:
+        with open(p, "rb") as f:
+            while chunk := f.read(16 * 1024 * 1024):
+                digest.update(chunk)
+
+    # Re-read under the lock so entries other workers added meanwhile are kept
+    with locked(index_path):
+        index = load_json(index_path)
+        index[memo_key] = digest.hexdigest()
+        save_json(index_path, index)
+    return index[memo_key]
+
+
+def cpu_isa():
+    flags = set()
+    if os.path.exists("/proc/cpuinfo"):
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    flags = set(line.split(":", 1)[1].split())
+                    break
+    return {"machine": platform.machine(), "processor": platform.processor(),
+            "flags": sorted(f for f in ISA_FLAGS if f in flags)}
+
+
+def backend_version(backend):
+    if backend == "onnxruntime":
+        import onnxruntime
+        return onnxruntime.__version__
+    if backend == "openvino":
+        import openvino
+        return openvino.__version__
+    if backend == "pytorch":
+        import torch
+        return torch.__version__
+    return "unknown"
+
+
+def cache_key(model_path, backend, precision="fp32", shape_profile=None, options=None):
+    """Everything that makes a compiled artifact reusable, hashed into one id."""
+    description = {
+        "model": file_hash(model_path),
+        "backend": backend,
+        "backend_version": backend_version(backend),
+        "precision": precision,
+        "shape_profile": shape_profile,
+        "options": options or {},
+        "isa": cpu_isa(),
+    }
+    key = hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()[:32]
+    return key, description
+
+
+class EngineCache:
+    """Persistent on-disk store of compiled blobs with LRU eviction under a size cap.
+
+    Each entry is a directory named by its key; index.json tracks size and last use.
+    Entries are built in a temp dir and renamed into place, so concurrent workers never
+    see half-written blobs, and every index update happens under an flock on index.json.lock.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, "index.json")
+        os.makedirs(root, exist_ok=True)
+
+    def _load_index(self):
+        return load_json(self.index_path)
+
+    def _save_index(self, index):
+        save_json(self.index_path, index)
+
+    def get(self, key):
+        """Entry directory for `key`, or None on a miss. Hits refresh the LRU timestamp."""
+        path = os.path.join(self.root, key)
+        if not os.path.isdir(path):
+            return None
+        with locked(self.index_path):
+            index = self._load_index()
+            if key in index:
+                index[key]["last_used"] = time.time()
+                self._save_index(index)
+        return path
+
+    def staging_dir(self):
+        return tempfile.mkdtemp(prefix=".staging_", dir=self.root)
+
+    def commit(self, key, staging, description=None):
+        """Moves a filled staging dir into the cache as `key`, then enforces the size cap."""
+        path = os.path.join(self.root, key)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(description or {}, f, indent=2, default=str)
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # Another process won the race; theirs is identical
+            shutil.rmtree(staging, ignore_errors=True)
+
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+        with locked(self.index_path):
+            index = self._load_index()
+            index[key] = {"size": size, "last_used": time.time(), "created": time.time()}
+            self._evict(index, keep=key)
+        return path
+
+    def evict(self, keep=None):
+        with locked(self.index_path):
+            self._evict(self._load_index(), keep)
+
+    def _evict(self, index, keep=None):
+        # Caller holds the index lock
+        total = sum(e["size"] for e in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            total -= index.pop(key)["size"]
+            print(f"🧹 Evicted cache entry {key}")
+        self._save_index(index)
+
+    def clear(self):
+        # Only this cache's entries: root is shared with the hash index, result cache, baselines, ...
+        with locked(self.index_path):
+            for key in self._load_index():
+                shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
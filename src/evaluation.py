@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import difflib
+import hashlib
+import multiprocessing as mp
+
+import numpy as np
+
+from inference_engine import ARTIFACTS, PROJECT_ROOT, InferenceEngine, load_audio
+
+BASELINE_CACHE_DIR = os.path.join(PROJECT_ROOT, "models", "cache", "baseline")
+
+
+def load_manifest(path):
+    """Reads a local eval manifest into [(audio_path, reference_text)].
+
+    Accepts TSV (`audio<TAB>text` per line) or JSONL with `audio_filepath`/`audio` and `text` keys.
+    Relative audio paths resolve against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                audio = item.get("audio_filepath") or item["audio"]
+                text = item.get("text", "")
+            else:
+                audio, _, text = line.partition("\t")
+            entries.append((os.path.join(base, audio), text.strip()))
+    return entries
+
+
+def word_error_rate(references, hypotheses):
+    from jiwer import wer
+    return wer(list(references), list(hypotheses))
+
+
+def char_error_rate(references, hypotheses):
+    from jiwer import cer
+    return cer(list(references), list(hypotheses))
+
+
+def _scored(error_rate, references, hypotheses):
+    # Only pairs with a non-empty reference (jiwer raises on empty ones); None if there are none
+    pairs = [(r, h) for r, h in zip(references, hypotheses) if r.strip()]
+    return error_rate(*zip(*pairs)) if pairs else None
+
+
+def scored_word_error_rate(references, hypotheses):
+    return _scored(word_error_rate, references, hypotheses)
+
+
+def scored_char_error_rate(references, hypotheses):
+    return _scored(char_error_rate, references, hypotheses)
+
+
+def transcribe_entries(engine, entries, store=None):
+    """Runs every manifest entry through an InferenceEngine -> (hypotheses, latencies_ms).
+
+    With an audio_store.AudioStore, audio comes from its memory-mapped shards instead of being decoded.
+    """
+    hypotheses, latencies = [], []
+    for path, _ in entries:
+        if store is not None and path in store:
+            audio, normalized = store.get(path), store.normalized
+        else:
+            audio, normalized = load_audio(path), False
+        start = time.perf_counter()
+        hypotheses.append(engine.transcribe(audio, normalized=normalized))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return hypotheses, latencies
+
+
+def evaluate_model(model_path, entries, references, artifact="onnx", store=None, **engine_kwargs):
+    """WER + latency of one model file over a manifest, against the given references."""
+    engine = InferenceEngine(artifact, model_path=model_path, **engine_kwargs)
+    hypotheses, latencies = transcribe_entries(engine, entries, store)
+    return {
+        "wer": scored_word_error_rate(references, hypotheses),
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_mean_ms": float(np.mean(latencies)),
+    }
+
+
+def audio_hash(path):
+    # Content hash, so a re-encoded or renamed file is never matched to stale baseline output
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_version(model_path):
+    """Hash of a model file (+ weights) or of a checkpoint directory's config and weight files."""
+    from engine_cache import file_hash
+
+    if not os.path.isdir(model_path):
+        return file_hash(model_path)
+    names = sorted(n for n in os.listdir(model_path)
+                   if n == "config.json" or n.endswith((".safetensors", ".bin")) or n == "pruning.json")
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update(f"{name}:{file_hash(os.path.join(model_path, name))}".encode())
+    return digest.hexdigest()
+
+
+class BaselineCache:
+    """Baseline logits + transcript per utterance on disk, keyed by model version and audio hash.
+
+    <root>/<model version>/<audio hash>.npz; written through a temp file and renamed, so parallel
+    workers can fill the same cache.
+    """
+
+    def __init__(self, version, root=BASELINE_CACHE_DIR):
+        self.dir = os.path.join(root, version[:32])
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.dir, key + ".npz")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        if key not in self:
+            return None
+        with np.load(self._path(key)) as data:
+            return data["logits"], str(data["text"])
+
+    def put(self, key, logits, text):
+        tmp = os.path.join(self.dir, f".{key}.{os.getpid()}.npz")
+        np.savez(tmp, logits=logits.astype(np.float32), text=np.array(text))
+        os.replace(tmp, self._path(key))
+
+
+def logit_divergence(reference, candidate):
+    """How far a candidate's logits drifted from the baseline's, over the frames both have."""
+    from ctc_decoder import log_softmax
+
+    frames = min(len(reference), len(candidate))
+    ref, cand = log_softmax(reference[:frames]), log_softmax(candidate[:frames])
+    return {
+        "max_abs_diff": float(np.abs(reference[:frames] - candidate[:frames]).max()),
+        "kl": float((np.exp(ref) * (ref - cand)).sum(-1).mean()),
+        "argmax_agreement": float((ref.argmax(-1) == cand.argmax(-1)).mean()),
+        "frame_mismatch": int(len(reference) - len(candidate)),
+    }
+
+
+def word_diff(reference, hypothesis):
+    # "[-expected +got]" edits between the two word sequences, "" when they match
+    ref, hyp = reference.split(), hypothesis.split()
+    edits = []
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(a=ref, b=hyp, autojunk=False).get_opcodes():
+        if op == "equal":
+            continue
+        removed = " ".join(ref[i1:i2])
+        added = " ".join(hyp[j1:j2])
+        edits.append(f"[{'-' + removed if removed else ''}{' ' if removed and added else ''}{'+' + added if added else ''}]")
+    return " ".join(edits)
+
+
+_WORKER = {}
+
+
+def _init_worker(artifact, model_path, num_threads, cache_dir, version, store_dir, write_cache):
+    if num_threads:
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+            os.environ[var] = str(num_threads)
+    store = None
+    if store_dir:
+        from audio_store import AudioStore
+        store = AudioStore(store_dir)
+    _WORKER.update(engine=InferenceEngine(artifact, model_path=model_path, num_threads=num_threads,
+                                          runtime_profile=None),
+                   cache=BaselineCache(version, cache_dir), store=store, write_cache=write_cache)
+
+
+def _run_chunk(chunk):
+    engine, cache, store = _WORKER["engine"], _WORKER["cache"], _WORKER["store"]
+    results = []
+    for index, path in chunk:
+        key = audio_hash(path)
+        if _WORKER["write_cache"] and key in cache:
+            results.append({"index": index, "audio_hash": key, "cached": True})
+            continue
+        if store is not None and path in store:
+            audio, normalized = store.get(path), store.normalized
+        else:
+            audio, normalized = load_audio(path), False
+        start = time.perf_counter()
+        text, logits = engine.transcribe(audio, return_logits=True, normalized=normalized)
+        record = {"index": index, "audio_hash": key, "hypothesis": text,
+                  "latency_ms": (time.perf_counter() - start) * 1000}
+        if _WORKER["write_cache"]:
+            cache.put(key, logits, text)
+        else:
+            baseline = cache.get(key)
+            if baseline is not None:
+                record["divergence"] = logit_divergence(baseline[0], logits)
+                record["baseline_hypothesis"] = baseline[1]
+        results.append(record)
+    return results
+
+
+def run_parallel(artifact, model_path, entries, workers, cache, write_cache=False, store_dir=None, chunk_size=8):
+    """Runs `entries` through `workers` spawn processes, one engine each -> records in manifest order."""
+    workers = max(min(workers, len(entries)), 1)
+    num_threads = max((os.cpu_count() or 1) // workers, 1)
+    indexed = list(enumerate(path for path, _ in entries))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker,
+                  initargs=(artifact, model_path, num_threads, os.path.dirname(cache.dir),
+                            os.path.basename(cache.dir), store_dir, write_cache)) as pool:
+        records = [r for chunk in pool.imap_unordered(_run_chunk, chunks) for r in chunk]
+    return sorted(records, key=lambda r: r["index"])
+
+
+def evaluate_parallel(artifact, entries, model_path=None, workers=4, baseline_artifact="pytorch",
+                      baseline_path=None, cache_dir=BASELINE_CACHE_DIR, store_dir=None):
+    """WER / CER of one artifact over a manifest against a cached baseline, with per-utterance detail.
+
+    Baseline logits and transcripts are computed once per (baseline model version, audio hash) and
+    reused on every later run; only uncached utterances go through the baseline model.
+    """
+    baseline_path = baseline_path or ARTIFACTS[baseline_artifact][1]
+    cache = BaselineCache(model_version(baseline_path), cache_dir)
+    missing = [e for e in entries if audio_hash(e[0]) not in cache]
+    if missing:
+        print(f"Baseline: {len(missing)}/{len(entries)} utterances not cached, running {baseline_artifact}...")
+        run_parallel(baseline_artifact, baseline_path, missing, workers, cache, write_cache=True, store_dir=store_dir)
+
+    start = time.perf_counter()
+    records = run_parallel(artifact, model_path, entries, workers, cache, store_dir=store_dir)
+    wall_s = time.perf_counter() - start
+
+    # Without transcripts, the baseline's output is the reference (WER then measures drift only)
+    utterances = []
+    for (path, text), record in zip(entries, records):
+        reference = text or record.get("baseline_hypothesis", "")
+        utterances.append(dict(record, audio=path, reference=reference,
+                               wer=scored_word_error_rate([reference], [record["hypothesis"]]),
+                               cer=scored_char_error_rate([reference], [record["hypothesis"]]),
+                               diff=word_diff(reference, record["hypothesis"])))
+    references = [u["reference"] for u in utterances]
+    divergences = [u["divergence"] for u in utterances if "divergence" in u]
+    return {
+        "artifact": artifact,
+        "model_path": model_path or ARTIFACTS[artifact][1],
+        "baseline": {"artifact": baseline_artifact, "path": baseline_path, "version": os.path.basename(cache.dir)},
+        "utterances": len(utterances),
+        "scored_utterances": sum(bool(r.strip()) for r in references),
+        "wer": scored_word_error_rate(references, [u["hypothesis"] for u in utterances]),
+        "cer": scored_char_error_rate(references, [u["hypothesis"] for u in utterances]),
+        "baseline_wer": scored_word_error_rate(references, [u.get("baseline_hypothesis", "") for u in utterances]),
+        "changed_vs_baseline": sum(u["hypothesis"] != u.get("baseline_hypothesis") for u in utterances),
+        "mean_kl": float(np.mean([d["kl"] for d in divergences])) if divergences else None,
+        "max_abs_diff": float(max(d["max_abs_diff"] for d in divergences)) if divergences else None,
+        "argmax_agreement": float(np.mean([d["argmax_agreement"] for d in divergences])) if divergences else None,
+        "latency_p50_ms": float(np.percentile([u["latency_ms"] for u in utterances], 50)),
+        "wall_s": wall_s,
+        "per_utterance": utterances,
+    }
@@ -0,0 +1,421 @@
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+import onnx
+from onnx import helper, numpy_helper
+
+# Torch-export node names carry the module path, e.g. /wav2vec2/encoder/layers.5/attention/q_proj/MatMul
+LAYER_PATTERN = re.compile(r"(layers[._]\d+|feature_extractor|feature_projection|pos_conv_embed|lm_head)")
+NORM_OPS = {"LayerNormalization", "SkipLayerNormalization", "SimplifiedLayerNormalization"}
+# Kept in FP32 by every reduced-precision path (the mixed-precision notebook's "Antidote" list:
+# LayerNorm variance overflows FP16)
+ALWAYS_FP32_OPS = {"LayerNormalization", "SkipLayerNormalization", "Pow", "ReduceMean"}
+
+# Ops whose output depends on more than their inputs, or that blow constants up in size
+NON_FOLDABLE_OPS = {"RandomNormal", "RandomNormalLike", "RandomUniform", "RandomUniformLike", "Multinomial",
+                    "Bernoulli", "Dropout"}
+# Ops between a MatMul and the LayerNorm it feeds in a transformer block (bias, residual, reshapes)
+PASSTHROUGH_OPS = {"Add", "Sub", "Reshape", "Transpose", "Squeeze", "Unsqueeze", "Identity", "Cast", "Dropout"}
+# Elementwise ops with one tensor input, safe to move across a Transpose
+UNARY_OPS = {"Gelu", "FastGelu", "Relu", "Sigmoid", "Tanh", "Erf", "Sqrt", "Neg", "Abs", "Identity", "Cast"}
+
+
+def group_nodes(model, op_types=None, by="layer"):
+    """Groups node names so precision/quantization decisions can be made per block.
+
+    by="layer"   - encoder layer from the node name (falls back to the node's own name)
+    by="segment" - topological runs between LayerNorm nodes; works on optimizer output,
+                   where fused nodes (Attention_0, ...) lost their module path
+    by="node"    - one group per node
+    """
+    groups = OrderedDict()
+    segment = 0
+    for node in model.graph.node:
+        if by == "segment" and node.op_type in NORM_OPS:
+            segment += 1
+        if op_types is not None and node.op_type not in op_types:
+            continue
+        if by == "segment":
+            key = f"segment_{segment:03d}"
+        elif by == "layer":
+            match = LAYER_PATTERN.search(node.name)
+            key = match.group(1) if match else node.name
+        else:
+            key = node.name
+        groups.setdefault(key, []).append(node.name)
+    return groups
+
+
+def remove_model(path):
+    # An .onnx file plus its external weights
+    for p in (path, path + ".data"):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def consumers(model):
+    uses = {}
+    for node in model.graph.node:
+        for name in node.input:
+            uses.setdefault(name, []).append(node)
+    return uses
+
+
+def producers(model):
+    return {out: node for node in model.graph.node for out in node.output}
+
+
+def nodes_feeding(model, op_types, target_op_types, through=PASSTHROUGH_OPS, max_hops=3):
+    """Names of op_types nodes whose output reaches a target_op_types node, directly or across at
+    most max_hops `through` nodes (bias Add, residual Add, reshapes), in graph order."""
+    uses = consumers(model)
+    found = []
+    for node in model.graph.node:
+        if node.op_type not in op_types:
+            continue
+        frontier, hops, reached = list(node.output), 0, False
+        while frontier and not reached:
+            following = [c for name in frontier for c in uses.get(name, [])]
+            reached = any(c.op_type in target_op_types for c in following)
+            hops += 1
+            if hops > max_hops:
+                break
+            frontier = [out for c in following if c.op_type in through for out in c.output]
+        if reached:
+            found.append(node.name)
+    return found
+
+
+def _initializers(model):
+    return {init.name: init for init in model.graph.initializer}
+
+
+def _replace_input(model, old, new):
+    for node in model.graph.node:
+        for i, name in enumerate(node.input):
+            if name == old:
+                node.input[i] = new
+
+
+def remove_dead_nodes(model):
+    """Drops nodes and initializers nothing reachable from the graph outputs uses."""
+    live = {o.name for o in model.graph.output}
+    kept = []
+    for node in reversed(model.graph.node):
+        if any(out in live for out in node.output):
+            kept.append(node)
+            live.update(i for i in node.input if i)
+    removed = len(model.graph.node) - len(kept)
+    del model.graph.node[:]
+    model.graph.node.extend(reversed(kept))
+
+    unused = [init for init in model.graph.initializer if init.name not in live]
+    for init in unused:
+        model.graph.initializer.remove(init)
+    return removed
+
+
+def constants_to_initializers(model):
+    """Constant nodes -> initializers (the 869 Constant nodes in analysis_summary.md)."""
+    converted = []
+    for node in model.graph.node:
+        if node.op_type != "Constant" or node.domain not in ("", "ai.onnx"):
+            continue
+        attr = node.attribute[0]
+        if attr.name == "value":
+            tensor = onnx.TensorProto()
+            tensor.CopyFrom(attr.t)
+        elif attr.name in ("value_float", "value_floats"):
+            tensor = numpy_helper.from_array(np.array(helper.get_attribute_value(attr), dtype=np.float32))
+        elif attr.name in ("value_int", "value_ints"):
+            tensor = numpy_helper.from_array(np.array(helper.get_attribute_value(attr), dtype=np.int64))
+        else:
+            continue
+        tensor.name = node.output[0]
+        model.graph.initializer.append(tensor)
+        converted.append(node)
+    for node in converted:
+        model.graph.node.remove(node)
+    return len(converted)
+
+
+def fold_constant_nodes(model, max_elements=1 << 24):
+    """Evaluates every node whose inputs are all initializers and stores the result as one.
+
+    Covers what onnxsim folds when it isn't installed, including the weight-norm arithmetic
+    (g * v / ||v||) the exporter may leave in front of the positional conv embedding.
+    """
+    from onnx.reference import ReferenceEvaluator
+
+    inits = _initializers(model)
+    opset = [o for o in model.opset_import if o.domain in ("", "ai.onnx")]
+    folded = 0
+    for node in list(model.graph.node):
+        if node.domain not in ("", "ai.onnx") or node.op_type in NON_FOLDABLE_OPS or node.op_type == "Constant":
+            continue
+        inputs = [i for i in node.input if i]
+        if not inputs or not all(i in inits for i in inputs):
+            continue
+        single = helper.make_model(
+            helper.make_graph([node], "fold", [], [helper.make_tensor_value_info(o, onnx.TensorProto.UNDEFINED, None)
+                                                   for o in node.output if o],
+                              initializer=[inits[i] for i in inputs]),
+            opset_imports=opset, ir_version=model.ir_version)
+        try:
+            results = ReferenceEvaluator(single).run(None, {})
+        except Exception:
+            continue
+        if any(np.asarray(r).size > max_elements for r in results):
+            continue
+        for name, value in zip([o for o in node.output if o], results):
+            tensor = numpy_helper.from_array(np.asarray(value), name)
+            model.graph.initializer.append(tensor)
+            inits[name] = tensor
+        model.graph.node.remove(node)
+        folded += 1
+    return folded
+
+
+def _constant_cone(name, prods, inits):
+    """Nodes computing `name` from initializers / Constant nodes only, in graph order (None if a graph input is reached)."""
+    cone, stack, seen = {}, [name], set()
+    while stack:
+        tensor = stack.pop()
+        if tensor in seen or tensor in inits:
+            continue
+        seen.add(tensor)
+        node = prods.get(tensor)
+        if node is None or node.op_type in NON_FOLDABLE_OPS:
+            return None
+        cone[id(node)] = node
+        stack.extend(i for i in node.input if i)
+    return cone
+
+
+def fold_conv_weights(model, op_types=("Conv",)):
+    """Evaluates Conv weights / biases computed at runtime from constants into initializers.
+
+    The positional conv embedding is exported with weight norm (g * v / ||v||, over the kernel and
+    input-channel dims) in front of it, recomputed on every call. fold_constant_nodes folds it node
+    by node and gives up on the first node it can't evaluate; here the whole subgraph is run once.
+    """
+    from onnx.reference import ReferenceEvaluator
+
+    inits = _initializers(model)
+    prods = producers(model)
+    opset = [o for o in model.opset_import if o.domain in ("", "ai.onnx")]
+    order = {id(n): i for i, n in enumerate(model.graph.node)}
+    folded = []
+    for node in model.graph.node:
+        if node.op_type not in op_types:
+            continue
+        for position in (1, 2):
+            if position >= len(node.input) or not node.input[position] or node.input[position] in inits:
+                continue
+            cone = _constant_cone(node.input[position], prods, inits)
+            if not cone or any(n.domain not in ("", "ai.onnx") for n in cone.values()):
+                continue
+            nodes = sorted(cone.values(), key=lambda n: order[id(n)])
+            needed = {i for n in nodes for i in n.input if i in inits}
+            graph = helper.make_graph(nodes, "fold_weight", [],
+                                      [helper.make_tensor_value_info(node.input[position], onnx.TensorProto.UNDEFINED, None)],
+                                      initializer=[inits[i] for i in needed])
+            try:
+                (value,) = ReferenceEvaluator(helper.make_model(graph, opset_imports=opset,
+                                                                ir_version=model.ir_version)).run(None, {})
+            except Exception:
+                continue
+            name = f"{node.name or node.output[0]}_folded_{'weight' if position == 1 else 'bias'}"
+            tensor = numpy_helper.from_array(np.asarray(value), name)
+            model.graph.initializer.append(tensor)
+            inits[name] = tensor
+            node.input[position] = name
+            folded.append(node.name)
+    # The weight-norm subgraphs are dead now
+    remove_dead_nodes(model)
+    return folded
+
+
+def feature_encoder_blocks(model, max_steps=6):
+    """[(conv, norm, gelu)] for each Conv -> norm -> Gelu block of the conv feature encoder.
+
+    feat_extract_norm="layer" exports Conv -> Transpose -> LayerNorm -> Transpose -> Gelu per layer;
+    "group" exports Conv -> Reshape -> InstanceNormalization -> Reshape -> Mul -> Add -> Gelu in the
+    first layer only. Used to check how much of the encoder came out of the fusion pass fused.
+    """
+    norm_ops = NORM_OPS | {"InstanceNormalization", "GroupNormalization"}
+    glue = {"Transpose", "Reshape", "Mul", "Add"}
+    uses = consumers(model)
+    blocks = []
+    for conv in model.graph.node:
+        if conv.op_type != "Conv":
+            continue
+        current, norm = conv, None
+        for _ in range(max_steps):
+            nexts = uses.get(current.output[0], [])
+            if len(nexts) != 1:
+                break
+            current = nexts[0]
+            if current.op_type in norm_ops and norm is None:
+                norm = current
+            elif current.op_type in ("Gelu", "BiasGelu", "FastGelu"):
+                if norm is not None:
+                    blocks.append((conv.name, norm.op_type, current.op_type))
+                break
+            elif current.op_type not in glue:
+                break
+    return blocks
+
+
+def _symbolic_dims(model):
+    # Symbolic dims (batch_size, unk__3, ...) per tensor, via ORT's symbolic shape inference
+    from onnxruntime.tools.symbolic_shape_infer import SymbolicShapeInference
+
+    inferred = SymbolicShapeInference.infer_shapes(model, auto_merge=True)
+    dims = {}
+    for vi in list(inferred.graph.value_info) + list(inferred.graph.input) + list(inferred.graph.output):
+        shape = vi.type.tensor_type.shape
+        dims[vi.name] = [d.dim_param or d.dim_value or None for d in shape.dim]
+    return dims
+
+
+def _shape_part(name, prods, inits):
+    """One Concat input of a shape computation -> ("const", values) or ("dim", source, index)."""
+    if name in inits:
+        return ("const", numpy_helper.to_array(inits[name]).reshape(-1).tolist())
+    node = prods.get(name)
+    if node is None or node.op_type != "Unsqueeze":
+        return None
+    gather = prods.get(node.input[0])
+    if gather is None or gather.op_type != "Gather" or gather.input[1] not in inits:
+        return None
+    shape = prods.get(gather.input[0])
+    if shape is None or shape.op_type != "Shape" or shape.attribute:
+        return None
+    index = int(numpy_helper.to_array(inits[gather.input[1]]).reshape(-1)[0])
+    return ("dim", shape.input[0], index)
+
+
+def static_reshape_targets(model):
+    """Replaces Shape->Gather->Unsqueeze->Concat chains feeding Reshape with a constant target.
+
+    Parts that copy a dim the Reshape input already has at the same position become 0 (copy),
+    one remaining dynamic part becomes -1, the rest are literal. The dead shape chains are then
+    pruned, which removes most of the leftover Unsqueeze/Concat/Gather/Shape nodes.
+    """
+    inits = _initializers(model)
+    prods = producers(model)
+    try:
+        dims = _symbolic_dims(model)
+    except Exception:
+        dims = {}
+
+    rewritten = 0
+    for node in model.graph.node:
+        if node.op_type != "Reshape" or node.input[1] in inits:
+            continue
+        concat = prods.get(node.input[1])
+        if concat is None or concat.op_type != "Concat":
+            continue
+        parts = [_shape_part(name, prods, inits) for name in concat.input]
+        if any(p is None for p in parts):
+            continue
+
+        data_dims = dims.get(node.input[0])
+        target = []
+        for part in parts:
+            if part[0] == "const":
+                target.extend(int(v) for v in part[1])
+                continue
+            _, source, index = part
+            position = len(target)
+            source_dims = dims.get(source)
+            same_tensor = source == node.input[0] and index == position
+            same_symbol = (data_dims is not None and source_dims is not None and position < len(data_dims)
+                           and index < len(source_dims) and source_dims[index] is not None
+                           and data_dims[position] == source_dims[index])
+            if same_tensor or same_symbol:
+                target.append(0)
+            else:
+                target.append(-1)
+        if target.count(-1) > 1:
+            continue
+        if any(t == 0 for t in target) and any(a.name == "allowzero" and a.i for a in node.attribute):
+            continue
+
+        name = node.input[1] + "_static"
+        model.graph.initializer.append(numpy_helper.from_array(np.array(target, dtype=np.int64), name))
+        inits[name] = model.graph.initializer[-1]
+        node.input[1] = name
+        rewritten += 1
+
+    remove_dead_nodes(model)
+    return rewritten
+
+
+def _is_inverse(perm_a, perm_b):
+    return len(perm_a) == len(perm_b) and all(perm_a[p] == i for i, p in enumerate(perm_b))
+
+
+def cancel_transpose_pairs(model):
+    """Removes Transpose(p) -> unary elementwise ops -> Transpose(p^-1) pairs.
+
+    In the conv feature encoder the last block ends Transpose -> LayerNorm -> Transpose -> Gelu and
+    is followed by Transpose for the feature projection; once Gelu is fused the last two cancel.
+    """
+    removed = 0
+    changed = True
+    while changed:
+        changed = False
+        uses = consumers(model)
+        graph_outputs = {o.name for o in model.graph.output}
+        for first in model.graph.node:
+            if first.op_type != "Transpose":
+                continue
+            chain, current = [], first
+            while True:
+                nexts = uses.get(current.output[0], [])
+                if len(nexts) != 1 or current.output[0] in graph_outputs:
+                    break
+                current = nexts[0]
+                if current.op_type in UNARY_OPS and len([i for i in current.input if i]) == 1:
+                    chain.append(current)
+                    continue
+                break
+            second = current
+            if second is first or second.op_type != "Transpose":
+                continue
+            perm_a = helper.get_attribute_value(first.attribute[0]) if first.attribute else None
+            perm_b = helper.get_attribute_value(second.attribute[0]) if second.attribute else None
+            if perm_a is None or perm_b is None or not _is_inverse(list(perm_a), list(perm_b)):
+                continue
+            if second.output[0] in graph_outputs:
+                continue
+
+            # first's input now feeds the chain directly; the chain's end replaces second's output.
+            # The chain's recorded shapes were in the transposed layout, so drop them
+            stale = {n.output[0] for n in chain}
+            for vi in [vi for vi in model.graph.value_info if vi.name in stale]:
+                model.graph.value_info.remove(vi)
+            source = first.input[0]
+            if chain:
+                chain[0].input[0] = source
+                end = chain[-1].output[0]
+            else:
+                end = source
+            _replace_input(model, second.output[0], end)
+            model.graph.node.remove(first)
+            model.graph.node.remove(second)
+            removed += 2
+            changed = True
+            break
+    return removed
+
+
+def op_counts(model):
+    counts = {}
+    for node in model.graph.node:
+        counts[node.op_type] = counts.get(node.op_type, 0) + 1
+    return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
@@ -0,0 +1,413 @@
+import os
+import json
+import time
+import queue
+import argparse
+import numpy as np
+
+from metrics import METRICS
+
+# Path setup (same layout every numbered script resolves)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(PROJECT_ROOT, "models", "original_hindi")
+ONNX_DIR = os.path.join(PROJECT_ROOT, "models", "onnx")
+OPENVINO_DIR = os.path.join(PROJECT_ROOT, "models", "openvino")
+SAMPLE_AUDIO = os.path.join(PROJECT_ROOT, "src", "data", "sample_audio", "sample_hindi.wav")
+
+SAMPLE_RATE = 16000
+# Feature encoder geometry from config.json (conv_kernel / conv_stride): 320 samples per frame
+CONV_KERNEL = (10, 3, 3, 3, 3, 2, 2)
+CONV_STRIDE = (5, 2, 2, 2, 2, 2, 2)
+
+# Every artifact the pipeline produces -> (backend, default path)
+ARTIFACTS = {
+    "pytorch": ("pytorch", MODEL_DIR),
+    "pytorch_fast": ("pytorch", MODEL_DIR),
+    "onnx": ("onnxruntime", os.path.join(ONNX_DIR, "model.onnx")),
+    "onnx_optimized": ("onnxruntime", os.path.join(ONNX_DIR, "optimized_model.onnx")),
+    "onnx_quantized": ("onnxruntime", os.path.join(ONNX_DIR, "quantized_model.onnx")),
+    "onnx_static_int8": ("onnxruntime", os.path.join(ONNX_DIR, "static_quantized_model.onnx")),
+    "onnx_mixed": ("onnxruntime", os.path.join(ONNX_DIR, "mixed_precision_model.onnx")),
+    "openvino": ("openvino", os.path.join(OPENVINO_DIR, "model.xml")),
+    "openvino_int8": ("openvino", os.path.join(OPENVINO_DIR, "model_int8.xml")),
+}
+
+# Backend options that define an artifact beyond its files (explicit backend_kwargs win)
+ARTIFACT_OPTIONS = {
+    "pytorch_fast": {"compile": True, "bf16": "auto", "fold_weight_norm": True, "attn_implementation": "sdpa"},
+}
+
+
+def load_audio(path, sr=SAMPLE_RATE):
+    import librosa
+    # mono=True downmixes, then resample to 16 kHz (what librosa.load(sr=16000) does, as in convert_audio.py),
+    # timed as two stages
+    with METRICS.stage("audio_decode"):
+        audio, native_sr = librosa.load(path, sr=None, mono=True)
+    if native_sr != sr:
+        with METRICS.stage("resample"):
+            audio = librosa.resample(audio, orig_sr=native_sr, target_sr=sr)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def normalize(audio):
+    # Wav2Vec2FeatureExtractor(do_normalize=True): zero mean, unit variance per utterance.
+    # Always hand the backends contiguous float32 (the "109% WER" bug from the README).
+    audio = np.asarray(audio, dtype=np.float32)
+    audio = (audio - audio.mean()) / np.sqrt(audio.var() + 1e-7)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def num_frames(num_samples):
+    # Number of logit frames the conv feature encoder emits for num_samples (int or array)
+    for kernel, stride in zip(CONV_KERNEL, CONV_STRIDE):
+        num_samples = (num_samples - kernel) // stride + 1
+    return num_samples
+
+
+def model_feeds(input_names, input_values, attention_mask=None):
+    """Feeds for an exported graph. Exports with an attention_mask input (02a / 02b) always get one;
+    for a single unpadded utterance it is all ones."""
+    feeds = {"input_values": input_values}
+    if "attention_mask" in input_names:
+        if attention_mask is None:
+            attention_mask = np.ones(input_values.shape, dtype=np.int64)
+        feeds["attention_mask"] = attention_mask.astype(np.int64, copy=False)
+    return feeds
+
+
+def onnx_input_names(model_path):
+    import onnx
+    graph = onnx.load(model_path, load_external_data=False).graph
+    initializers = {init.name for init in graph.initializer}
+    return [i.name for i in graph.input if i.name not in initializers]
+
+
+class TorchBackend:
+    name = "pytorch"
+    accepts_attention_mask = True
+
+    def __init__(self, model_path, num_threads=None, cache=None, model=None, compile=False, bf16=False,
+                 fold_weight_norm=False, attn_implementation=None, buckets_s=None, batch_sizes=(1, 8)):
+        import torch
+        import torch_fast
+        from pruning import load_wav2vec2
+
+        torch_fast.inference_settings(num_threads)
+        self.torch = torch
+        # An in-memory model (e.g. a pruning candidate) is served as-is; pruned checkpoints load via pruning.json
+        self.model = model if model is not None else load_wav2vec2(model_path, attn_implementation=attn_implementation)
+        self.model.eval()
+        if fold_weight_norm:
+            # The positional conv's weight norm is recomputed on every call in eager mode
+            torch_fast.fold_weight_norm(self.model)
+        # bf16="auto": only where the CPU has native BF16 (AMX / AVX512-BF16)
+        self.bf16 = torch_fast.bf16_supported() if bf16 == "auto" else bool(bf16)
+        self.compiled = None
+        if compile:
+            # One static graph per (batch, length) bucket, all compiled here; inputs past the last bucket run eager
+            from shape_profiles import DEFAULT_BUCKETS_S
+            self.compiled = torch_fast.CompiledBuckets(self.model, buckets_s or DEFAULT_BUCKETS_S, batch_sizes,
+                                                       bf16=self.bf16)
+
+    def run(self, input_values, attention_mask=None):
+        import torch_fast
+
+        mask = None
+        if attention_mask is not None:
+            mask = self.torch.from_numpy(attention_mask.astype(np.int64))
+        input_values = self.torch.from_numpy(input_values)
+        if self.compiled is not None:
+            return self.compiled(input_values, mask).numpy()
+        return torch_fast.forward(self.model, input_values, mask, self.bf16).numpy()
+
+
+class OnnxRuntimeBackend:
+    name = "onnxruntime"
+
+    def __init__(self, model_path, num_threads=None, providers=("CPUExecutionProvider",), cache=None,
+                 shape_profile=None, inter_op_threads=None, session_config=None, mmap_weights=False):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        if inter_op_threads and inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+            options.inter_op_num_threads = inter_op_threads
+        # e.g. {"session.intra_op.allow_spinning": "0"} when several workers share a box
+        for key, value in (session_config or {}).items():
+            options.add_session_config_entry(key, str(value))
+        if shape_profile:
+            # Static (batch, samples): lets the optimizer fold every shape computation
+            batch_size, num_samples = shape_profile
+            options.add_free_dimension_override_by_name("batch_size", batch_size)
+            options.add_free_dimension_override_by_name("sequence_length", num_samples)
+
+        # engine_cache.EngineCache: reuse the graph ORT already optimized for this host
+        load_path, staging, self.cache_hit = model_path, None, False
+        if cache is not None:
+            from engine_cache import cache_key
+            key, description = cache_key(model_path, "onnxruntime", shape_profile=shape_profile,
+                                         options={"providers": list(providers)})
+            entry = cache.get(key)
+            if entry:
+                load_path, self.cache_hit = os.path.join(entry, "model.opt.onnx"), True
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            else:
+                staging = cache.staging_dir()
+                options.optimized_model_filepath = os.path.join(staging, "model.opt.onnx")
+                options.add_session_config_entry(
+                    "session.optimized_model_external_initializers_file_name", "model.opt.onnx.data")
+                options.add_session_config_entry(
+                    "session.optimized_model_external_initializers_min_size_in_bytes", "1024")
+
+        if mmap_weights:
+            # Weights stay in a read-only mapping of the .onnx.data file that every worker shares through
+            # the page cache. add_initializer uses the buffer as-is; prepacking would copy it per process.
+            from shared_weights import map_external_initializers
+            self.weights = map_external_initializers(load_path)
+            self._ort_weights = [ort.OrtValue.ortvalue_from_numpy(w) for w in self.weights.values()]
+            for name, value in zip(self.weights, self._ort_weights):
+                options.add_initializer(name, value)
+            options.add_session_config_entry("session.disable_prepacking", "1")
+
+        self.session = ort.InferenceSession(load_path, options, providers=list(providers))
+        if staging:
+            cache.commit(key, staging, description)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.output_name = self.session.get_outputs()[0].name
+        # Exports from before the mask input: padded batches would silently change the logits
+        self.accepts_attention_mask = "attention_mask" in self.input_names
+
+    def run(self, input_values, attention_mask=None):
+        feeds = model_feeds(self.input_names, input_values, attention_mask)
+        return self.session.run([self.output_name], feeds)[0]
+
+
+class OpenVINOBackend:
+    name = "openvino"
+
+    def __init__(self, model_path, num_threads=None, device="CPU", config=None, cache=None, shape_profile=None,
+                 mmap_weights=False):
+        import openvino as ov
+
+        self.core = ov.Core()
+        if mmap_weights:
+            # read_model maps the .bin instead of reading it; an imported blob would be a private copy,
+            # so the cache is skipped. The CPU plugin still repacks some weights per process.
+            self.core.set_property({"ENABLE_MMAP": True})
+            cache = None
+        properties = dict(config or {})
+        compile_options = dict(properties, device=device)
+        if num_threads:
+            properties["INFERENCE_NUM_THREADS"] = num_threads
+
+        # engine_cache.EngineCache: import the exported blob instead of recompiling
+        key, entry, self.cache_hit = None, None, False
+        if cache is not None:
+            from engine_cache import cache_key
+            key, description = cache_key(model_path, "openvino",
+                                         precision=properties.get("INFERENCE_PRECISION_HINT", "default"),
+                                         shape_profile=shape_profile, options=compile_options)
+            entry = cache.get(key)
+
+        if entry:
+            with open(os.path.join(entry, "compiled.blob"), "rb") as f:
+                self.compiled_model = self.core.import_model(f.read(), device, properties)
+            self.cache_hit = True
+        else:
+            model = self.core.read_model(model=model_path)
+            if shape_profile:
+                # Static (batch, samples) for input_values and attention_mask: no kernel re-selection
+                model.reshape({i.get_any_name(): list(shape_profile) for i in model.inputs})
+            self.compiled_model = self.core.compile_model(model, device, properties)
+            if cache is not None:
+                staging = cache.staging_dir()
+                with open(os.path.join(staging, "compiled.blob"), "wb") as f:
+                    f.write(self.compiled_model.export_model())
+                cache.commit(key, staging, description)
+        # One infer request per stream, so concurrent run() calls (THROUGHPUT hint / NUM_STREAMS > 1) overlap
+        self.requests = queue.Queue()
+        for _ in range(self.compiled_model.get_property("OPTIMAL_NUMBER_OF_INFER_REQUESTS")):
+            self.requests.put(self.compiled_model.create_infer_request())
+        self.output = self.compiled_model.output(0)
+        self.input_names = {name for i in self.compiled_model.inputs for name in i.get_names()}
+        self.accepts_attention_mask = "attention_mask" in self.input_names
+
+    def run(self, input_values, attention_mask=None):
+        request = self.requests.get()
+        try:
+            if self.accepts_attention_mask:
+                result = request.infer(model_feeds(self.input_names, input_values, attention_mask))
+            else:
+                result = request.infer({0: input_values})
+            # The request reuses its output buffer, so hand back a copy
+            return np.array(result[self.output])
+        finally:
+            self.requests.put(request)
+
+
+BACKENDS = {
+    "pytorch": TorchBackend,
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVINOBackend,
+}
+
+
+class InferenceEngine:
+    """Loads one artifact once and serves transcribe(audio) -> text / logits."""
+
+    def __init__(self, artifact="onnx_optimized", model_path=None, num_threads=None, warmup=True, decoder=None,
+                 cache=None, shape_buckets=None, profile_batch_size=1, runtime_profile="latency", result_cache=None,
+                 **backend_kwargs):
+        if artifact not in ARTIFACTS:
+            raise ValueError(f"Unknown artifact '{artifact}'. Choose from: {', '.join(ARTIFACTS)}")
+        backend_name, default_path = ARTIFACTS[artifact]
+        self.artifact = artifact
+        self.model_path = model_path or default_path
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"{artifact} artifact not found at {self.model_path}. Run the export scripts first.")
+
+        from ctc_decoder import GreedyCTCDecoder
+
+        if runtime_profile:
+            # Tuned threads / streams from 04e_autotune_threads.py; explicit arguments win
+            from runtime_profiles import load_runtime_profile
+            tuned = load_runtime_profile(artifact, runtime_profile)
+            if tuned:
+                num_threads = num_threads or tuned["num_threads"]
+                for key, value in tuned["backend_kwargs"].items():
+                    backend_kwargs.setdefault(key, value)
+
+        for key, value in ARTIFACT_OPTIONS.get(artifact, {}).items():
+            backend_kwargs.setdefault(key, value)
+
+        if cache is not None:
+            # cache=True uses the default models/cache store
+            from engine_cache import EngineCache
+            backend_kwargs["cache"] = EngineCache() if cache is True else cache
+
+        if shape_buckets:
+            # One static-shape model per length bucket (shape_profiles.py)
+            from shape_profiles import ShapeProfileManager
+            self.backend = ShapeProfileManager(backend_name, self.model_path, shape_buckets, profile_batch_size,
+                                               num_threads=num_threads, **backend_kwargs)
+        else:
+            self.backend = BACKENDS[backend_name](self.model_path, num_threads=num_threads, **backend_kwargs)
+        self.decoder = decoder or GreedyCTCDecoder()
+        self.result_cache = None
+
+        if warmup:
+            # First call pays for kernel selection / memory allocation
+            self.logits(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+        if result_cache is not None:
+            # Repeated audio (IVR prompts, retried uploads) skips the model (result_cache.py).
+            # result_cache=True: in-memory LRU backed by models/cache/results
+            from result_cache import RESULT_CACHE_DIR, ResultCache, model_namespace
+            self.result_cache = ResultCache(disk_dir=RESULT_CACHE_DIR) if result_cache is True else result_cache
+            self._cache_namespace = model_namespace(artifact, self.model_path)
+            self._decoder_key = (None, None)
+
+    @property
+    def accepts_attention_mask(self):
+        # False: batch_logits() must only get equal-length (unpadded) batches
+        return getattr(self.backend, "accepts_attention_mask", False)
+
+    def _input_values(self, audio, normalized):
+        # normalized=True: audio already went through normalize() (e.g. audio_store.AudioStore)
+        if normalized:
+            return np.ascontiguousarray(audio, dtype=np.float32)
+        with METRICS.stage("normalize"):
+            return normalize(audio)
+
+    def _run(self, input_values):
+        with METRICS.stage("model", samples=len(input_values)):
+            return self.backend.run(input_values[None, :])[0]
+
+    def _cache_key(self, input_values):
+        from result_cache import decoder_key, samples_key
+
+        if self._decoder_key[0] is not self.decoder:
+            self._decoder_key = (self.decoder, decoder_key(self.decoder))
+        with METRICS.stage("cache_key"):
+            return samples_key(input_values, self._cache_namespace), self._decoder_key[1]
+
+    def logits(self, audio, normalized=False):
+        input_values = self._input_values(audio, normalized)
+        if self.result_cache is None:
+            return self._run(input_values)
+        key, _ = self._cache_key(input_values)
+        _, logits = self.result_cache.get(key)
+        if logits is None:
+            logits = self._run(input_values)
+            self.result_cache.put(key, logits)
+        return logits
+
+    def batch_logits(self, input_values, attention_mask=None):
+        # input_values: (batch, samples), already normalized and padded
+        if attention_mask is not None and not self.accepts_attention_mask and not attention_mask.all():
+            raise ValueError(f"{self.artifact} model has no attention_mask input: padded rows would not match "
+                             "their unbatched logits. Re-export with 02a / 02b or batch equal-length utterances only.")
+        with METRICS.stage("model", batch_size=len(input_values), samples=input_values.shape[1]):
+            return self.backend.run(np.ascontiguousarray(input_values, dtype=np.float32), attention_mask)
+
+    def decode(self, logits):
+        # Any ctc_decoder decoder: greedy by default, beam search / LM if passed in
+        with METRICS.stage("ctc_decode"):
+            return self.decoder.decode(logits)
+
+    def decode_batch(self, logits, lengths=None):
+        with METRICS.stage("ctc_decode", batch_size=len(logits)):
+            return self.decoder.decode_batch(logits, lengths)
+
+    def transcribe(self, audio, return_logits=False, normalized=False):
+        if isinstance(audio, str):
+            audio, normalized = load_audio(audio), False
+        start = time.perf_counter()
+        input_values = self._input_values(audio, normalized)
+        if self.result_cache is None:
+            logits = self._run(input_values)
+            text = self.decode(logits)
+        else:
+            key, decoder = self._cache_key(input_values)
+            text, logits = self.result_cache.get(key, decoder)
+            if text is None or (return_logits and logits is None):
+                # A transcript for another decoder still saves the model call
+                logits = self._run(input_values) if logits is None else logits
+                text = self.decode(logits)
+                self.result_cache.put(key, logits, decoder, text)
+        if len(audio):
+            METRICS.observe("asr_real_time_factor", (time.perf_counter() - start) * SAMPLE_RATE / len(audio))
+        return (text, logits) if return_logits else text
+
+
+_ENGINES = {}
+
+
+def get_engine(artifact="onnx_optimized", **kwargs):
+    # Keep one warm engine per (artifact, options) for the lifetime of the process. Options may be
+    # dicts (session_config=, config=); objects without a __repr__ (caches, decoders) key by identity
+    key = (artifact, json.dumps(kwargs, sort_keys=True, default=repr))
+    if key not in _ENGINES:
+        _ENGINES[key] = InferenceEngine(artifact, **kwargs)
+    return _ENGINES[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe audio with any exported artifact.")
+    parser.add_argument("audio", nargs="?", default=SAMPLE_AUDIO)
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"Loading {args.artifact} ({ARTIFACTS[args.artifact][1]})...")
+    engine = InferenceEngine(args.artifact, num_threads=args.threads)
+    text = engine.transcribe(args.audio)
+    print(f"✅ Transcript: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+
+# Fixed buckets (Prometheus "le" bounds): observing is a bisect and three adds under a lock
+LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+HISTOGRAMS = {
+    "asr_stage_seconds": ("Wall time per pipeline stage", LATENCY_BUCKETS_S),
+    "asr_queue_wait_seconds": ("Time a request waited for its batch", LATENCY_BUCKETS_S),
+    "asr_batch_size": ("Requests per model call", (1, 2, 4, 8, 16, 32, 64)),
+    "asr_padding_ratio": ("Share of padded samples in a batch", (0.0, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0)),
+    "asr_real_time_factor": ("Processing time / audio duration", (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0)),
+    "asr_exit_layer": ("Encoder layers run before an early exit", (4, 8, 12, 16, 20, 24)),
+}
+TRACE_CAPACITY = 200_000
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (what histogram_quantile would bracket)
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "args", "start")
+
+    def __init__(self, metrics, name, args):
+        self.metrics, self.name, self.args = metrics, name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        metrics = self.metrics
+        histogram = metrics._stages.get(self.name) or metrics._stage_histogram(self.name)
+        histogram.observe((end - self.start) / 1e9)
+        if metrics._trace is not None:
+            metrics._trace.append((self.name, self.start, end, threading.get_ident(), self.args))
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def _label_string(labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels)
+
+
+def render_prometheus(series):
+    """Prometheus text for snapshot() series, one HELP/TYPE block per histogram family."""
+    lines = []
+    for name, (description, _) in HISTOGRAMS.items():
+        family = sorted((s for s in series if s["name"] == name), key=lambda s: [list(map(str, l)) for l in s["labels"]])
+        if not family:
+            continue
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for s in family:
+            labels = s["labels"]
+            prefix = _label_string(labels) + ("," if labels else "")
+            cumulative = 0
+            for bound, c in zip(list(s["bounds"]) + [float("inf")], s["counts"]):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = f"{{{_label_string(labels)}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {s['sum']}")
+            lines.append(f"{name}_count{suffix} {s['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_atomic(path, text):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def aggregate_text(directory, live=None, exclude=None):
+    """One Prometheus text for every worker's snapshot_*.json in `directory`.
+
+    Series keep their worker label, so summing across workers is left to PromQL
+    (sum without (worker) ...). `live` (this process's Metrics) replaces its own, older file `exclude`.
+    """
+    series = []
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if not entry.startswith("snapshot_") or not entry.endswith(".json") or path == exclude:
+            continue
+        try:
+            with open(path) as f:
+                series += json.load(f)
+        except (OSError, ValueError):
+            continue
+    if live is not None:
+        series += live.snapshot()
+    return render_prometheus(series)
+
+
+def run_every(interval_s, fn):
+    """Calls fn() every interval_s seconds on a daemon thread until the returned Event is set."""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_s):
+            try:
+                fn()
+            except Exception as e:
+                print(f"⚠️ Periodic metrics write failed: {e}")
+
+    threading.Thread(target=loop, name="metrics-writer", daemon=True).start()
+    return stop
+
+
+class Metrics:
+    """Process-wide histograms for the inference pipeline, plus an optional Chrome trace of stages.
+
+    Always on: a stage costs two perf_counter_ns() calls and one histogram update. The trace is
+    only recorded between start_trace() and export_trace(), into a bounded ring buffer, and
+    opens in chrome://tracing / Perfetto like the torch.profiler traces in reports/profiler_plots.
+    Exported series carry set_labels() labels on top of their own (worker="3" under prefork).
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._histograms = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._trace = None
+        self.const_labels = ()
+
+    def set_labels(self, **labels):
+        self.const_labels = tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(HISTOGRAMS[name][1]))
+        return histogram
+
+    def observe(self, name, value, **labels):
+        if self.enabled:
+            self.histogram(name, **labels).observe(value)
+
+    def _stage_histogram(self, name):
+        histogram = self._stages[name] = self.histogram("asr_stage_seconds", stage=name)
+        return histogram
+
+    def stage(self, name, **args):
+        """with METRICS.stage("model"): ... -> asr_stage_seconds{stage="model"} (+ a trace event)."""
+        return _Stage(self, name, args) if self.enabled else _NO_STAGE
+
+    def start_trace(self, capacity=TRACE_CAPACITY):
+        self._trace = deque(maxlen=capacity)
+
+    def export_trace(self, path, stop=True):
+        """Writes the recorded stages as Chrome trace events ({"traceEvents": [...]}, times in us)."""
+        events = list(self._trace or ())
+        if stop:
+            self._trace = None
+        pid = os.getpid()
+        trace = [{"name": name, "cat": "asr", "ph": "X", "ts": start / 1000, "dur": (end - start) / 1000,
+                  "pid": pid, "tid": tid, "args": args} for name, start, end, tid, args in events]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return len(trace)
+
+    def snapshot(self):
+        """JSON-able copy of every histogram, labels included (what aggregate_text() merges)."""
+        series = []
+        for (name, labels), h in list(self._histograms.items()):
+            with h._lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            series.append({"name": name, "labels": sorted(labels + self.const_labels), "bounds": list(h.bounds),
+                           "counts": counts, "sum": total, "count": count})
+        return series
+
+    def prometheus_text(self):
+        return render_prometheus(self.snapshot())
+
+    def dump(self, path):
+        # File for node_exporter's textfile collector (written atomically)
+        write_atomic(path, self.prometheus_text())
+
+    def write_snapshot(self, path):
+        write_atomic(path, json.dumps(self.snapshot()))
+
+    def summary(self):
+        """{name: {labels: count / mean / p50 / p95 / p99}} for the JSON benchmark reports."""
+        result = {}
+        for (name, labels), h in sorted(self._histograms.items()):
+            if not h.count:
+                continue
+            key = ",".join(f"{k}={v}" for k, v in labels) or "all"
+            result.setdefault(name, {})[key] = {
+                "count": h.count,
+                "mean": h.sum / h.count,
+                "p50_le": h.quantile(0.5),
+                "p95_le": h.quantile(0.95),
+                "p99_le": h.quantile(0.99),
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._stages = {}
+
+
+# One registry per process (prefork workers label theirs and merge via aggregate_text); ASR_METRICS=0 turns it off
+METRICS = Metrics(enabled=os.environ.get("ASR_METRICS", "1") != "0")
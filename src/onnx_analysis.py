@@ -0,0 +1,159 @@
+import os
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import onnx
+from onnx import numpy_helper
+from onnx.helper import tensor_dtype_to_np_dtype
+
+from activation_stats import FP16_MAX
+
+CHUNK_ELEMENTS = 1 << 22
+STATS_VERSION = 1
+
+
+def load_graph(model_path):
+    # Structure only: external weights stay on disk
+    return onnx.load(model_path, load_external_data=False)
+
+
+def shape_string(value_info):
+    tensor_type = value_info.type.tensor_type
+    if not value_info.type.HasField("tensor_type"):
+        return "Not Tensor"
+    try:
+        dtype = str(tensor_dtype_to_np_dtype(tensor_type.elem_type))
+    except (KeyError, ValueError):
+        dtype = "Unknown"
+    dims = [str(d.dim_value) if d.HasField("dim_value") else (d.dim_param or "?") for d in tensor_type.shape.dim]
+    return f"{dtype} {dims}"
+
+
+def graph_summary(model):
+    """Producer, I/O, op counts and parameter counts from the graph alone (no weight data read)."""
+    params_by_dtype = Counter()
+    bytes_by_dtype = Counter()
+    for init in model.graph.initializer:
+        dtype = np.dtype(tensor_dtype_to_np_dtype(init.data_type))
+        count = int(np.prod(init.dims)) if init.dims else 1
+        params_by_dtype[dtype.name] += count
+        bytes_by_dtype[dtype.name] += count * dtype.itemsize
+    return {
+        "producer": model.producer_name,
+        "opset": model.opset_import[0].version if model.opset_import else None,
+        "graph_name": model.graph.name,
+        "inputs": {i.name: shape_string(i) for i in model.graph.input},
+        "outputs": {o.name: shape_string(o) for o in model.graph.output},
+        "nodes": len(model.graph.node),
+        "op_counts": dict(Counter(n.op_type for n in model.graph.node).most_common()),
+        "initializers": len(model.graph.initializer),
+        "parameters_by_dtype": dict(params_by_dtype),
+        "weight_bytes_by_dtype": dict(bytes_by_dtype),
+    }
+
+
+def _chunk_stats(array, start, stop):
+    chunk = np.asarray(array.reshape(-1)[start:stop], dtype=np.float64)
+    return {
+        "min": float(chunk.min()),
+        "max": float(chunk.max()),
+        "sum": float(chunk.sum()),
+        "sumsq": float(np.dot(chunk, chunk)),
+        "zeros": int(np.count_nonzero(chunk == 0)),
+        "fp16_overflow": int(np.count_nonzero(np.abs(chunk) >= FP16_MAX)),
+        "count": int(chunk.size),
+    }
+
+
+def _combine(parts):
+    count = sum(p["count"] for p in parts)
+    mean = sum(p["sum"] for p in parts) / count
+    return {
+        "min": min(p["min"] for p in parts),
+        "max": max(p["max"] for p in parts),
+        "abs_max": max(abs(min(p["min"] for p in parts)), abs(max(p["max"] for p in parts))),
+        "mean": mean,
+        "std": float(np.sqrt(max(sum(p["sumsq"] for p in parts) / count - mean * mean, 0.0))),
+        "zero_fraction": sum(p["zeros"] for p in parts) / count,
+        "fp16_overflow": sum(p["fp16_overflow"] for p in parts),
+        "size": count,
+    }
+
+
+def _tensors(model_path, model, min_constant_size=100):
+    """(name, array) for every initializer and large Constant; external ones as read-only memmaps."""
+    from shared_weights import map_external_initializers
+
+    mapped = map_external_initializers(model_path)
+    for init in model.graph.initializer:
+        yield init.name, mapped[init.name] if init.name in mapped else numpy_helper.to_array(init)
+    for node in model.graph.node:
+        if node.op_type != "Constant":
+            continue
+        for attr in node.attribute:
+            if attr.name == "value" and attr.type == onnx.AttributeProto.TENSOR:
+                array = numpy_helper.to_array(attr.t)
+                if array.size > min_constant_size:
+                    yield node.name or node.output[0], array
+
+
+def initializer_stats(model_path, model=None, workers=None, chunk_elements=CHUNK_ELEMENTS):
+    """Per-tensor min / max / mean / std / zeros / FP16 overflow, streamed from the mmapped weights.
+
+    Every tensor is cut into chunks that a thread pool reduces in parallel (NumPy releases the GIL),
+    so memory stays at a few chunks no matter how large the model is.
+    """
+    model = model or load_graph(model_path)
+    jobs = []
+    for name, array in _tensors(model_path, model):
+        if array.size == 0 or not np.issubdtype(array.dtype, np.number):
+            continue
+        for start in range(0, array.size, chunk_elements):
+            jobs.append((name, array, start, min(start + chunk_elements, array.size)))
+
+    parts = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for (name, array, _, _), result in zip(jobs, pool.map(lambda job: _chunk_stats(*job[1:]), jobs)):
+            parts.setdefault(name, []).append(result)
+    dtypes = {name: str(array.dtype) for name, array, _, _ in jobs}
+    return {name: dict(_combine(p), dtype=dtypes[name]) for name, p in parts.items()}
+
+
+def stats_path(model_path):
+    return model_path + ".stats.json"
+
+
+def analyze_model(model_path, with_stats=True, workers=None, use_cache=True):
+    """Graph summary (+ per-tensor weight stats), cached next to the model keyed by its file hash.
+
+    Repeat reports on an unchanged model only hash-check (memoized by size / mtime) and read the JSON.
+    """
+    from engine_cache import file_hash
+
+    key = file_hash(model_path)
+    cache_path = stats_path(model_path)
+    cached = {}
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached.get("hash") != key or cached.get("version") != STATS_VERSION:
+            cached = {}
+        elif not with_stats or "initializers" in cached:
+            return cached
+
+    model = load_graph(model_path)
+    result = {"hash": key, "version": STATS_VERSION, "path": model_path,
+              "summary": cached.get("summary") or graph_summary(model)}
+    if with_stats:
+        result["initializers"] = initializer_stats(model_path, model, workers)
+    if use_cache:
+        with open(cache_path, "w") as f:
+            json.dump(result, f)
+    return result
+
+
+def model_size_mb(model_path):
+    from engine_cache import model_files
+    return sum(os.path.getsize(p) for p in model_files(model_path)) / 1024 ** 2
@@ -0,0 +1,179 @@
+import os
+import json
+
+# Coarse buckets so aten::, ONNX and OpenVINO op names line up in one diff
+OP_CATEGORIES = {
+    "matmul": ("aten::addmm", "aten::mm", "aten::bmm", "aten::matmul", "MatMul", "Gemm", "FusedMatMul",
+               "MatMulInteger", "DynamicQuantizeMatMul", "MatMulIntegerToFloat", "QLinearMatMul", "FullyConnected",
+               "MatMulNBits", "mkldnn::_linear_pointwise", "aten::_addmm_activation"),
+    "conv": ("aten::mkldnn_convolution", "aten::_convolution", "aten::convolution", "Conv", "ConvInteger",
+             "QLinearConv", "NchwcConv", "FusedConv", "Convolution", "GroupConvolution"),
+    "attention": ("aten::_scaled_dot_product_flash_attention_for_cpu", "aten::_softmax", "Attention",
+                  "MultiHeadAttention", "Softmax", "ScaledDotProductAttention"),
+    # Recomputed per call in eager mode unless folded (torch_fast.fold_weight_norm)
+    "weight_norm": ("aten::_weight_norm_interface",),
+    "layernorm": ("aten::native_layer_norm", "LayerNormalization", "SkipLayerNormalization",
+                  "SimplifiedLayerNormalization", "MVN"),
+    "gelu": ("aten::gelu", "Gelu", "BiasGelu", "FastGelu"),
+    "quantize": ("DynamicQuantizeLinear", "QuantizeLinear", "DequantizeLinear", "Convert", "FakeQuantize"),
+    "layout": ("aten::copy_", "aten::view", "aten::transpose", "aten::reshape", "aten::contiguous", "Reshape",
+               "Transpose", "Reorder", "Concat", "Slice", "Gather", "Unsqueeze", "Squeeze", "Shape", "Expand"),
+    "elementwise": ("aten::add", "aten::mul", "aten::div", "Add", "Mul", "Div", "Sub", "Sqrt", "Pow", "Erf",
+                    "Eltwise", "Multiply", "Subtract"),
+}
+CATEGORY_OF = {op: category for category, ops in OP_CATEGORIES.items() for op in ops}
+
+
+def op_category(op_type):
+    return CATEGORY_OF.get(op_type, "other")
+
+
+def _aggregate(events):
+    # [(op_type, duration_us)] -> {op_type: {"self_us", "calls"}}
+    stats = {}
+    for op_type, duration in events:
+        entry = stats.setdefault(op_type, {"self_us": 0.0, "calls": 0})
+        entry["self_us"] += duration
+        entry["calls"] += 1
+    return stats
+
+
+def profile_onnxruntime(model_path, input_values, runs=10, warmup=2, num_threads=None, trace_path=None):
+    """Per-op self time from ORT's built-in profiler. Its JSON output already is a Chrome trace."""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.enable_profiling = True
+    if trace_path:
+        options.profile_file_prefix = os.path.splitext(trace_path)[0]
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+    from inference_engine import model_feeds
+    feed = model_feeds({i.name for i in session.get_inputs()}, input_values)
+
+    for _ in range(warmup + runs):
+        session.run(None, feed)
+    profile_file = session.end_profiling()
+    if trace_path:
+        os.replace(profile_file, trace_path)
+        profile_file = trace_path
+
+    with open(profile_file) as f:
+        trace = json.load(f)
+    # Skip node events that belong to the warmup runs
+    run_starts = sorted(e["ts"] for e in trace if e.get("cat") == "Session" and e.get("name") == "model_run")
+    first_ts = run_starts[warmup] if len(run_starts) > warmup else 0
+    events = [(e["args"]["op_name"], e["dur"]) for e in trace
+              if e.get("cat") == "Node" and e.get("name", "").endswith("_kernel_time") and e["ts"] >= first_ts]
+    return _aggregate(events), runs
+
+
+def profile_openvino(model_path, input_values, runs=10, warmup=2, num_threads=None, config=None, trace_path=None):
+    """Per-layer counters (PERF_COUNT) from the OpenVINO CPU plugin, aggregated by layer type."""
+    import openvino as ov
+
+    core = ov.Core()
+    properties = dict(config or {}, PERF_COUNT=True)
+    if num_threads:
+        properties["INFERENCE_NUM_THREADS"] = num_threads
+    compiled = core.compile_model(core.read_model(model_path), "CPU", properties)
+    request = compiled.create_infer_request()
+    from inference_engine import model_feeds
+    feed = model_feeds({name for i in compiled.inputs for name in i.get_names()}, input_values)
+
+    for _ in range(warmup):
+        request.infer(feed)
+    events, trace, ts = [], [], 0.0
+    for _ in range(runs):
+        request.infer(feed)
+        for info in request.get_profiling_info():
+            if info.status != info.Status.EXECUTED:
+                continue
+            duration = info.real_time.total_seconds() * 1e6
+            events.append((info.node_type, duration))
+            # Counters carry no timestamps: lay executed layers out back to back per run
+            trace.append({"name": info.node_name, "cat": info.node_type, "ph": "X", "ts": ts, "dur": duration,
+                          "pid": 0, "tid": 0, "args": {"exec_type": info.exec_type}})
+            ts += duration
+
+    if trace_path:
+        with open(trace_path, "w") as f:
+            json.dump({"traceEvents": trace}, f)
+    return _aggregate(events), runs
+
+
+def profile_pytorch(model_dir, input_values, runs=10, warmup=2, num_threads=None, trace_path=None, **options):
+    """aten:: self CPU time from torch.profiler, same source as 01_profile_model.py.
+
+    options are TorchBackend arguments (compile, bf16, fold_weight_norm, ...), e.g. ARTIFACT_OPTIONS["pytorch_fast"].
+    """
+    from torch.profiler import profile, ProfilerActivity
+    from inference_engine import TorchBackend
+
+    backend = TorchBackend(model_dir, num_threads=num_threads, **options)
+    # torch.compile already ran for every bucket in the constructor; warmup settles allocations
+    for _ in range(warmup):
+        backend.run(input_values)
+    with profile(activities=[ProfilerActivity.CPU]) as prof:
+        for _ in range(runs):
+            backend.run(input_values)
+    if trace_path:
+        prof.export_chrome_trace(trace_path)
+    stats = {e.key: {"self_us": e.self_cpu_time_total, "calls": e.count}
+             for e in prof.key_averages() if e.self_cpu_time_total > 0}
+    return stats, runs
+
+
+def format_time(us):
+    # Same units as torch.profiler's table
+    if us >= 1e6:
+        return f"{us / 1e6:.3f}s"
+    if us >= 1e3:
+        return f"{us / 1e3:.3f}ms"
+    return f"{us:.3f}us"
+
+
+def format_table(stats, runs, title, row_limit=25):
+    """Sorted per-op table in the layout of reports/profiler_plots/profiler_report.txt."""
+    total = sum(s["self_us"] for s in stats.values()) or 1.0
+    rule = "-" * 40 + "  " + "  ".join(["-" * 12] * 5)
+    lines = [title, rule,
+             f"{'Name':>40}  {'Self CPU %':>12}  {'Self CPU':>12}  {'Per run':>12}  {'CPU time avg':>12}  {'# of Calls':>12}",
+             rule]
+    for op, s in sorted(stats.items(), key=lambda kv: kv[1]["self_us"], reverse=True)[:row_limit]:
+        lines.append(f"{op[-40:]:>40}  {s['self_us'] / total * 100:>11.2f}%  {format_time(s['self_us']):>12}  "
+                     f"{format_time(s['self_us'] / runs):>12}  {format_time(s['self_us'] / s['calls']):>12}  "
+                     f"{s['calls']:>12}")
+    lines.append(rule)
+    lines.append(f"Self CPU time total: {format_time(total)} over {runs} runs ({format_time(total / runs)} per run)")
+    return "\n".join(lines) + "\n"
+
+
+def by_category(stats, runs):
+    # {category: ms per run}
+    totals = {}
+    for op, s in stats.items():
+        category = op_category(op)
+        totals[category] = totals.get(category, 0.0) + s["self_us"] / runs / 1000
+    return totals
+
+
+def diff_table(profiles):
+    """Where time moved: per-category ms/run and share for each profiled artifact, side by side."""
+    names = list(profiles)
+    categories = {name: by_category(*profiles[name]) for name in names}
+    totals = {name: sum(categories[name].values()) or 1.0 for name in names}
+    order = sorted({c for cats in categories.values() for c in cats},
+                   key=lambda c: -max(categories[n].get(c, 0.0) for n in names))
+
+    header = f"{'Category':<14}" + "".join(f"{name[:24]:>26}" for name in names)
+    lines = [header, "-" * len(header)]
+    for category in order:
+        cells = "".join(f"{categories[n].get(category, 0.0):>15.2f} ms ({categories[n].get(category, 0.0) / totals[n] * 100:4.1f}%)"
+                        for n in names)
+        lines.append(f"{category:<14}{cells}")
+    lines.append("-" * len(header))
+    lines.append(f"{'total':<14}" + "".join(f"{totals[n]:>15.2f} ms {'':>7}" for n in names))
+    return "\n".join(lines) + "\n", categories
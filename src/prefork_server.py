@@ -0,0 +1,201 @@
+import os
+import time
+import signal
+import argparse
+import tempfile
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer
+
+from batching_server import BatchingServer, make_handler
+from inference_engine import ARTIFACTS, InferenceEngine
+from metrics import METRICS, aggregate_text, run_every, write_atomic
+
+
+def fork_workers(count, target, *args):
+    """Forks `count` children that each run target(index, *args) and exit -> {pid: index}."""
+    pids = {}
+    for index in range(count):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                target(index, *args)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        pids[pid] = index
+    return pids
+
+
+class PreforkServer:
+    """One parent maps the weights, binds the port and forks N workers that serve on the shared socket.
+
+    The parent only maps files (shared_weights.preload) and never creates an inference session:
+    ORT / OpenVINO thread pools do not survive fork(), so every worker builds its own engine on top
+    of the inherited read-only mappings. Weights are then held once in the page cache for the whole
+    node while each worker keeps only its activations and runtime state. Dead workers are replaced
+    after an exponential backoff; a worker index that crashes more than max_restarts times within
+    restart_window_s (e.g. a missing artifact failing every startup) is given up on.
+
+    Each worker labels its metrics worker="<index>" and snapshots them into metrics_dir every
+    metrics_interval_s; GET /metrics on any worker serves all workers' series merged.
+    """
+
+    def __init__(self, artifact="onnx_optimized", model_path=None, workers=4, host="127.0.0.1", port=8000,
+                 runtime_profile="throughput", max_batch_size=1, metrics_dir=None, metrics_interval_s=5.0,
+                 max_restarts=5, restart_window_s=60.0, restart_backoff_s=0.5, **engine_kwargs):
+        self.artifact = artifact
+        self.model_path = model_path or ARTIFACTS[artifact][1]
+        self.workers = workers
+        self.address = (host, port)
+        self.runtime_profile = runtime_profile
+        self.max_batch_size = max_batch_size
+        self.metrics_dir = metrics_dir or tempfile.mkdtemp(prefix="asr_metrics_")
+        self.metrics_interval_s = metrics_interval_s
+        self.max_restarts = max_restarts
+        self.restart_window_s = restart_window_s
+        self.restart_backoff_s = restart_backoff_s
+        self.engine_kwargs = engine_kwargs
+        self.pids = {}
+        self._crashes = {}
+        # Set by stop() so a pending restart backoff ends at once
+        self._stopped = threading.Event()
+        self.httpd = None
+        self._maps = []
+        self._running = False
+
+    def _serve(self, index):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # Nothing recorded in the parent belongs to this worker
+        METRICS.reset()
+        METRICS.set_labels(worker=index)
+        if self.runtime_profile:
+            from runtime_profiles import load_runtime_profile, pin_worker
+            profile = load_runtime_profile(self.artifact, self.runtime_profile)
+            if profile:
+                pin_worker(profile, index)
+        backend = ARTIFACTS[self.artifact][0]
+        kwargs = dict(self.engine_kwargs, mmap_weights=True) if backend != "pytorch" else self.engine_kwargs
+        engine = InferenceEngine(self.artifact, model_path=self.model_path, runtime_profile=self.runtime_profile,
+                                 **kwargs)
+        server = engine
+        if self.max_batch_size > 1:
+            # Batching threads are started after fork, so they belong to this worker
+            server = BatchingServer(engine, self.max_batch_size).start()
+        own = os.path.join(self.metrics_dir, f"snapshot_worker_{index}.json")
+        run_every(self.metrics_interval_s, lambda: METRICS.write_snapshot(own))
+        self.httpd.RequestHandlerClass = make_handler(
+            server, lambda: aggregate_text(self.metrics_dir, live=METRICS, exclude=own))
+        print(f"  worker {index} (pid {os.getpid()}) ready")
+        self.httpd.serve_forever()
+
+    def metrics_text(self):
+        return aggregate_text(self.metrics_dir)
+
+    def start(self):
+        from shared_weights import preload
+
+        if ARTIFACTS[self.artifact][0] != "pytorch":
+            self._maps = preload(self.model_path)
+        # Bound once here; every worker accept()s on the same listening socket
+        self.httpd = ThreadingHTTPServer(self.address, make_handler(None))
+        self._running = True
+        self._stopped.clear()
+        self.pids = fork_workers(self.workers, self._serve)
+        return self
+
+    def supervise(self):
+        def stop(*_):
+            # os.wait() resumes after a handler returns (PEP 475), so stop the workers here; it then
+            # raises ChildProcessError and the loop ends
+            self.stop()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        while self._running:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.pids.pop(pid, None)
+            if self._running and index is not None:
+                self._restart(index, pid, status)
+        self.stop()
+
+    def _restart(self, index, pid, status):
+        now = time.monotonic()
+        crashes = self._crashes.setdefault(index, deque())
+        while crashes and now - crashes[0] > self.restart_window_s:
+            crashes.popleft()
+        crashes.append(now)
+        if len(crashes) > self.max_restarts:
+            print(f"❌ Worker {index} (pid {pid}) exited {len(crashes)} times within {self.restart_window_s:.0f}s, "
+                  f"not restarting it ({len(self.pids)} workers left)")
+            return
+        delay = min(self.restart_backoff_s * 2 ** (len(crashes) - 1), 30.0)
+        print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, restarting in {delay:.1f}s")
+        if self._stopped.wait(delay) or not self._running:
+            return
+        self.pids.update({p: index for p in fork_workers(1, lambda _, i=index: self._serve(i))})
+
+    def stop(self):
+        self._running = False
+        self._stopped.set()
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.pids = {}
+        if self.httpd is not None:
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork ASR server: one shared copy of the weights, N workers.")
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--model-path", default=None)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threads", type=int, default=None, help="Per worker (defaults to the throughput profile)")
+    parser.add_argument("--max-batch-size", type=int, default=1)
+    parser.add_argument("--result-cache", action="store_true",
+                        help="Per-worker result cache over one shared disk store (models/cache/results)")
+    parser.add_argument("--metrics-dir", default=None, help="Where workers snapshot their metrics (default: a temp dir)")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write all workers' metrics here every --metrics-interval-s (textfile collector)")
+    parser.add_argument("--metrics-interval-s", type=float, default=5.0)
+    parser.add_argument("--max-restarts", type=int, default=5,
+                        help="Give up on a worker that crashes more often than this within --restart-window-s")
+    parser.add_argument("--restart-window-s", type=float, default=60.0)
+    args = parser.parse_args()
+
+    server = PreforkServer(args.artifact, args.model_path, args.workers, args.host, args.port,
+                           max_batch_size=args.max_batch_size, metrics_dir=args.metrics_dir,
+                           metrics_interval_s=args.metrics_interval_s, max_restarts=args.max_restarts,
+                           restart_window_s=args.restart_window_s, num_threads=args.threads,
+                           result_cache=args.result_cache or None).start()
+    print(f"✅ Serving {args.artifact} on http://{args.host}:{args.port}/transcribe with {args.workers} workers")
+    writer = None
+    if args.metrics_file:
+        # The parent never serves; it only merges the workers' snapshots into the textfile
+        writer = run_every(args.metrics_interval_s, lambda: write_atomic(args.metrics_file, server.metrics_text()))
+    try:
+        server.supervise()
+    finally:
+        if writer is not None:
+            writer.set()
+            write_atomic(args.metrics_file, server.metrics_text())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import os
+import json
+import shutil
+
+import numpy as np
+import torch
+from transformers import Wav2Vec2Config, Wav2Vec2ForCTC
+from transformers.pytorch_utils import prune_linear_layer
+
+from inference_engine import MODEL_DIR
+
+SPEC_FILE = "pruning.json"
+WEIGHTS_FILE = "pruned_model.safetensors"
+# Tokenizer / feature-extractor files the decoders and processors read next to the weights
+SIDECAR_FILES = ("vocab.json", "alphabet.json", "tokenizer_config.json", "special_tokens_map.json",
+                 "preprocessor_config.json")
+
+
+def load_wav2vec2(model_dir=MODEL_DIR, attn_implementation=None):
+    """Wav2Vec2ForCTC from a Hugging Face checkpoint or a directory written by save_pruned().
+
+    attn_implementation="sdpa" swaps the eager bmm/softmax attention for scaled_dot_product_attention.
+    """
+    if os.path.exists(os.path.join(model_dir, SPEC_FILE)):
+        return load_pruned(model_dir, attn_implementation)
+    kwargs = {"attn_implementation": attn_implementation} if attn_implementation else {}
+    # low_cpu_mem_usage=False avoids the 'meta-device' trap (see 01_profile_model.py)
+    model = Wav2Vec2ForCTC.from_pretrained(model_dir, low_cpu_mem_usage=False, **kwargs).to("cpu")
+    model.eval()
+    return model
+
+
+class CTCExportModule(torch.nn.Module):
+    """(input_values, attention_mask) -> logits: exported graphs take the mask that padded batches need."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_values, attention_mask):
+        return self.model(input_values, attention_mask=attention_mask).logits
+
+
+def export_example(batch_size=2, num_samples=16000):
+    # The second row is half padding, so the traced graph really uses the mask
+    input_values = torch.randn(batch_size, num_samples)
+    attention_mask = torch.ones(batch_size, num_samples, dtype=torch.long)
+    attention_mask[1:, num_samples // 2:] = 0
+    return input_values, attention_mask
+
+
+def encoder_layers(model):
+    return model.wav2vec2.encoder.layers
+
+
+def structure(model):
+    """Heads and FFN width of every encoder layer, as stored in pruning.json."""
+    return {
+        "num_layers": len(encoder_layers(model)),
+        "heads": [layer.attention.out_proj.in_features // layer.attention.head_dim for layer in encoder_layers(model)],
+        "ffn": [layer.feed_forward.intermediate_dense.out_features for layer in encoder_layers(model)],
+    }
+
+
+def count_parameters(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+class ImportanceMasks:
+    """Soft masks (all ones) on every head, FFN neuron and encoder layer, attached with hooks.
+
+    The forward output is unchanged; after backward, |d loss / d mask| summed over the calibration
+    set is the first-order (Taylor) estimate of what removing that unit costs.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        layers = encoder_layers(model)
+        shape = structure(model)
+        self.heads = torch.ones(len(layers), max(shape["heads"]), requires_grad=True)
+        self.ffn = torch.ones(len(layers), max(shape["ffn"]), requires_grad=True)
+        self.layers = torch.ones(len(layers), requires_grad=True)
+        self.scores = {"heads": torch.zeros_like(self.heads), "ffn": torch.zeros_like(self.ffn),
+                       "layers": torch.zeros_like(self.layers)}
+        self.handles = []
+        for i, layer in enumerate(layers):
+            attn, ff = layer.attention, layer.feed_forward
+            num_heads = shape["heads"][i]
+            self.handles.append(attn.out_proj.register_forward_pre_hook(self._head_hook(i, num_heads, attn.head_dim)))
+            self.handles.append(ff.output_dense.register_forward_pre_hook(self._ffn_hook(i, shape["ffn"][i])))
+            self.handles.append(layer.register_forward_hook(self._layer_hook(i), with_kwargs=True))
+
+    def _head_hook(self, i, num_heads, head_dim):
+        def hook(module, args):
+            # out_proj input is the concatenated per-head context: (batch, time, heads * head_dim)
+            return (args[0] * self.heads[i, :num_heads].repeat_interleave(head_dim),) + args[1:]
+        return hook
+
+    def _ffn_hook(self, i, width):
+        def hook(module, args):
+            return (args[0] * self.ffn[i, :width],) + args[1:]
+        return hook
+
+    def _layer_hook(self, i):
+        def hook(module, args, kwargs, output):
+            # Gate the residual branch: g=1 is the layer as-is, g=0 is the layer removed
+            hidden = args[0] if args else kwargs["hidden_states"]
+            gated = hidden + self.layers[i] * (output[0] - hidden)
+            return (gated,) + tuple(output[1:])
+        return hook
+
+    def accumulate(self):
+        for name in ("heads", "ffn", "layers"):
+            mask = getattr(self, name)
+            self.scores[name] += mask.grad.abs()
+            mask.grad = None
+
+    def remove(self):
+        for handle in self.handles:
+            handle.remove()
+        self.handles = []
+
+
+def compute_importance(model, reader, max_batches=None):
+    """Scores every head / FFN neuron / layer on calibration audio from a calibration.WavCalibrationReader.
+
+    No transcripts needed: the loss is frame-level cross-entropy against the model's own greedy
+    labels, so a unit scores high when removing it would change what the model emits.
+    """
+    for p in model.parameters():
+        p.requires_grad_(False)
+    model.eval()
+    masks = ImportanceMasks(model)
+    batches, frames = 0, 0
+    try:
+        while (feed := reader.get_next()) is not None:
+            logits = model(torch.from_numpy(feed["input_values"])).logits
+            targets = logits.argmax(-1).detach()
+            loss = torch.nn.functional.cross_entropy(logits.flatten(0, 1), targets.flatten(), reduction="sum")
+            loss.backward()
+            masks.accumulate()
+            batches += 1
+            frames += targets.numel()
+            if max_batches and batches >= max_batches:
+                break
+    finally:
+        masks.remove()
+        reader.rewind()
+    if not batches:
+        raise ValueError("No calibration audio to score importance on")
+
+    shape = structure(model)
+    scores = {name: (value / frames).numpy() for name, value in masks.scores.items()}
+    return {
+        "heads": [scores["heads"][i, :n].tolist() for i, n in enumerate(shape["heads"])],
+        "ffn": [scores["ffn"][i, :n].tolist() for i, n in enumerate(shape["ffn"])],
+        "layers": scores["layers"].tolist(),
+        "batches": batches,
+        "frames": frames,
+    }
+
+
+def _normalized(per_layer):
+    # Michel et al.: L2-normalize scores within each layer so layers are comparable in a global ranking
+    return [np.asarray(s) / (np.linalg.norm(s) + 1e-12) for s in per_layer]
+
+
+def _global_prune(per_layer, fraction, min_keep):
+    """Indices to keep per layer after dropping the globally lowest `fraction` of units."""
+    normalized = _normalized(per_layer)
+    total = sum(len(s) for s in normalized)
+    budget = int(round(fraction * total))
+    order = sorted(((score, layer, unit) for layer, s in enumerate(normalized) for unit, score in enumerate(s)))
+    kept = [set(range(len(s))) for s in normalized]
+    for score, layer, unit in order:
+        if budget <= 0:
+            break
+        if len(kept[layer]) > min_keep:
+            kept[layer].discard(unit)
+            budget -= 1
+    return [sorted(k) for k in kept]
+
+
+def make_plan(importance, head_fraction=0.0, ffn_fraction=0.0, drop_layers=0, min_heads=1, min_ffn=64):
+    """Which layers / heads / FFN neurons to keep.
+
+    Layers go first (lowest gate score); head and FFN fractions then apply to the layers that remain.
+    Indices refer to the scored (unpruned) model.
+    """
+    num_layers = len(importance["layers"])
+    if drop_layers >= num_layers:
+        raise ValueError(f"Cannot drop {drop_layers} of {num_layers} layers")
+    dropped = sorted(np.argsort(importance["layers"])[:drop_layers].tolist())
+    layers = [i for i in range(num_layers) if i not in dropped]
+    heads = _global_prune([importance["heads"][i] for i in layers], head_fraction, min_heads)
+    ffn = _global_prune([importance["ffn"][i] for i in layers], ffn_fraction, min_ffn)
+    return {"layers": layers, "heads": heads, "ffn": ffn,
+            "head_fraction": head_fraction, "ffn_fraction": ffn_fraction, "drop_layers": drop_layers}
+
+
+def _prune_heads(attention, keep):
+    head_dim = attention.head_dim
+    index = torch.cat([torch.arange(h * head_dim, (h + 1) * head_dim) for h in keep])
+    attention.q_proj = prune_linear_layer(attention.q_proj, index, dim=0)
+    attention.k_proj = prune_linear_layer(attention.k_proj, index, dim=0)
+    attention.v_proj = prune_linear_layer(attention.v_proj, index, dim=0)
+    attention.out_proj = prune_linear_layer(attention.out_proj, index, dim=1)
+    # The forward reshapes with -1 heads; older transformers read these two attributes instead
+    attention.num_heads = len(keep)
+    attention.embed_dim = len(keep) * head_dim
+
+
+def _prune_ffn(feed_forward, keep):
+    index = torch.tensor(keep, dtype=torch.long)
+    feed_forward.intermediate_dense = prune_linear_layer(feed_forward.intermediate_dense, index, dim=0)
+    feed_forward.output_dense = prune_linear_layer(feed_forward.output_dense, index, dim=1)
+
+
+def apply_plan(model, plan):
+    """Physically removes the units make_plan() dropped. Modifies `model` in place."""
+    encoder = model.wav2vec2.encoder
+    encoder.layers = torch.nn.ModuleList([encoder.layers[i] for i in plan["layers"]])
+    model.config.num_hidden_layers = len(encoder.layers)
+    for layer, heads, ffn in zip(encoder.layers, plan["heads"], plan["ffn"]):
+        num_heads = layer.attention.out_proj.in_features // layer.attention.head_dim
+        if len(heads) < num_heads:
+            _prune_heads(layer.attention, heads)
+        if len(ffn) < layer.feed_forward.intermediate_dense.out_features:
+            _prune_ffn(layer.feed_forward, ffn)
+    return model
+
+
+def save_pruned(model, plan, output_dir, source_dir=MODEL_DIR):
+    """Config + weights + pruning.json, loadable with load_wav2vec2() (from_pretrained can't: shapes differ)."""
+    from safetensors.torch import save_model
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.config.save_pretrained(output_dir)
+    save_model(model, os.path.join(output_dir, WEIGHTS_FILE))
+    with open(os.path.join(output_dir, SPEC_FILE), "w") as f:
+        json.dump(dict(structure(model), source=source_dir, plan=plan), f, indent=2)
+    for name in SIDECAR_FILES:
+        if os.path.exists(os.path.join(source_dir, name)):
+            shutil.copy(os.path.join(source_dir, name), output_dir)
+
+
+def load_pruned(model_dir, attn_implementation=None):
+    from safetensors.torch import load_model
+
+    with open(os.path.join(model_dir, SPEC_FILE)) as f:
+        spec = json.load(f)
+    config = Wav2Vec2Config.from_pretrained(model_dir)
+    if attn_implementation:
+        config._attn_implementation = attn_implementation
+    model = Wav2Vec2ForCTC(config)
+    # Rebuild the pruned shapes (which units were kept no longer matters), then load the weights
+    for layer, heads, ffn in zip(encoder_layers(model), spec["heads"], spec["ffn"]):
+        if heads < layer.attention.out_proj.in_features // layer.attention.head_dim:
+            _prune_heads(layer.attention, list(range(heads)))
+        if ffn < layer.feed_forward.intermediate_dense.out_features:
+            _prune_ffn(layer.feed_forward, list(range(ffn)))
+    load_model(model, os.path.join(model_dir, WEIGHTS_FILE))
+    model.eval()
+    return model
@@ -0,0 +1,227 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from inference_engine import PROJECT_ROOT
+
+RESULT_CACHE_DIR = os.path.join(PROJECT_ROOT, "models", "cache", "results")
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+DEFAULT_MAX_DISK_BYTES = 4 * 1024 ** 3
+# Share of max_disk_bytes a process may write before it re-scans the store and evicts
+DISK_SWEEP_FRACTION = 0.05
+
+
+def samples_key(input_values, namespace):
+    """Content address of one utterance: the normalized 16 kHz float32 samples the model sees, per model."""
+    samples = np.ascontiguousarray(input_values, dtype=np.float32)
+    digest = hashlib.sha256(namespace.encode())
+    digest.update(memoryview(samples).cast("B"))
+    return digest.hexdigest()
+
+
+def model_namespace(artifact, model_path):
+    # Same audio through another artifact or re-exported weights must never hit
+    from evaluation import model_version
+    return f"{artifact}:{model_version(model_path)}"
+
+
+def decoder_key(decoder):
+    """Hash of a decoder's class and settings (beam width, LM path and weights, vocabulary...)."""
+    config = {"class": type(decoder).__name__, "labels": [str(label) for label in decoder.labels]}
+    for name, value in vars(decoder).items():
+        if not name.startswith("_") and isinstance(value, (bool, int, float, str, type(None))):
+            config[name] = value
+    lm = getattr(decoder, "lm", None)
+    if lm is not None:
+        config["lm"] = os.path.abspath(lm.path)
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class _Entry:
+    __slots__ = ("logits", "texts", "size")
+
+    def __init__(self, logits, texts):
+        self.logits = logits
+        self.texts = texts
+        self.size = (logits.nbytes if logits is not None else 0) + sum(len(t) for t in texts.values()) + 256
+
+
+class ResultCache:
+    """Bounded in-memory LRU of logits and transcripts per content key, optionally backed by disk.
+
+    One entry per utterance (model + samples): the logits, plus one transcript per decoder
+    config, so switching decoders re-decodes cached logits instead of re-running the model.
+    Memory is capped by entry count and bytes; the disk store (<dir>/<key[:2]>/<key>.npz,
+    written through a temp file and renamed) survives restarts and is shared by workers. It is
+    capped at max_disk_bytes like EngineCache: files are touched on every disk hit and the least
+    recently used go first, in a sweep run at startup and after every few percent of the cap written.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None,
+                 store_logits=True, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.store_logits = store_logits
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._written = 0
+        self.hits = self.disk_hits = self.misses = self.evictions = self.disk_evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self.prune_disk()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".npz")
+
+    def _load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                logits = data["logits"] if "logits" in data.files else None
+                texts = json.loads(str(data["texts"]))
+            # Recently used for the disk LRU
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another worker's sweep in between
+            return None
+        if logits is not None:
+            logits.setflags(write=False)
+        return _Entry(logits, texts)
+
+    def _save(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {"texts": np.array(json.dumps(entry.texts, ensure_ascii=False))}
+        if entry.logits is not None:
+            arrays["logits"] = entry.logits
+        tmp = os.path.join(os.path.dirname(path), f".{key}.{os.getpid()}.{threading.get_ident()}.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+        with self._lock:
+            self._written += os.path.getsize(path)
+            sweep = self._written > self.max_disk_bytes * DISK_SWEEP_FRACTION
+            if sweep:
+                self._written = 0
+        if sweep:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Deletes the least recently used files until the disk store is under max_disk_bytes."""
+        from engine_cache import locked
+
+        with locked(os.path.join(self.disk_dir, "sweep")):
+            files = []
+            for shard in os.scandir(self.disk_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".npz") and not entry.name.startswith("."):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_disk_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.disk_evictions += 1
+        return total
+
+    def _insert(self, key, entry):
+        # Caller holds the lock
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def get(self, key, decoder=None):
+        """(text, logits) for `key`; text is looked up for the decoder key, either may be None.
+
+        Counts a hit when what was asked for is there: the transcript when a decoder key is
+        given, the logits otherwise.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        from_disk = False
+        if entry is None and self.disk_dir:
+            entry = self._load(key)
+            if entry is not None:
+                from_disk = True
+                with self._lock:
+                    self._insert(key, entry)
+
+        text = entry.texts.get(decoder) if entry is not None and decoder else None
+        logits = entry.logits if entry is not None else None
+        hit = text is not None if decoder else logits is not None
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.disk_hits += from_disk
+            else:
+                self.misses += 1
+        return text, logits
+
+    def put(self, key, logits=None, decoder=None, text=None):
+        if logits is not None:
+            if self.store_logits:
+                logits = np.array(logits, dtype=np.float32)
+                # Shared with every later hit: nobody may modify it in place
+                logits.setflags(write=False)
+            else:
+                logits = None
+        with self._lock:
+            entry = self._entries.get(key)
+            texts = dict(entry.texts) if entry is not None else {}
+            if decoder and text is not None:
+                texts[decoder] = text
+            if logits is None and entry is not None:
+                logits = entry.logits
+            entry = _Entry(logits, texts)
+            self._insert(key, entry)
+        if self.disk_dir:
+            self._save(key, entry)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "lookups": lookups,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,56 @@
+import os
+import json
+
+from inference_engine import PROJECT_ROOT
+
+PROFILE_PATH = os.path.join(PROJECT_ROOT, "models", "runtime_profiles.json")
+MODES = ("latency", "throughput")
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_runtime_profile(artifact, mode="latency", path=PROFILE_PATH):
+    """Tuned settings for (artifact, mode) on this host, or None.
+
+    Profiles record the core count they were tuned on; one copied from a different box is ignored.
+    """
+    profile = _read(path).get(artifact, {}).get(mode)
+    if not profile:
+        return None
+    if profile.get("cpu_count") != os.cpu_count():
+        print(f"⚠️ Ignoring {mode} profile for {artifact}: tuned on {profile.get('cpu_count')} cores, "
+              f"this host has {os.cpu_count()}")
+        return None
+    return profile
+
+
+def save_runtime_profile(artifact, mode, profile, path=PROFILE_PATH):
+    profiles = _read(path)
+    profiles.setdefault(artifact, {})[mode] = dict(profile, cpu_count=os.cpu_count())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(profiles, f, indent=2)
+
+
+def worker_cpus(profile, worker_index=0):
+    # Latency profiles hold one core list, throughput profiles one per worker
+    cpus = profile.get("cpus")
+    if not cpus:
+        return None
+    if isinstance(cpus[0], list):
+        return cpus[worker_index % len(cpus)]
+    return cpus
+
+
+def pin_worker(profile, worker_index=0):
+    """Applies the profile's core pinning to this process. Affinity is process-wide, so the
+    process owner (a server or worker entry point) calls this, not InferenceEngine."""
+    cpus = worker_cpus(profile, worker_index)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    return cpus
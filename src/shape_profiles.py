@@ -0,0 +1,196 @@
+import os
+import time
+import bisect
+
+import numpy as np
+
+from inference_engine import BACKENDS, SAMPLE_AUDIO, SAMPLE_RATE, load_audio, normalize, num_frames
+
+# Used when no corpus has been analysed (04d_shape_profiles.py writes models/shape_profiles.json)
+DEFAULT_BUCKETS_S = (2.0, 5.0, 10.0, 20.0, 30.0)
+
+
+def choose_buckets(durations_s, num_buckets=4, step_s=0.5, max_s=None):
+    """Bucket lengths (seconds) that minimise total padding for this duration histogram.
+
+    Durations are rounded up to a step_s grid, then an exact 1-D partition (DP over the grid)
+    picks num_buckets upper edges. Utterances longer than max_s are left out: they should be
+    chunked (streaming.py), not given a bucket of their own.
+    """
+    durations = np.asarray(durations_s, dtype=np.float64)
+    if max_s is not None:
+        durations = durations[durations <= max_s]
+    if not durations.size:
+        raise ValueError("No durations to build shape profiles from")
+
+    grid, counts = np.unique(np.ceil(durations / step_s).astype(np.int64), return_counts=True)
+    num_buckets = min(num_buckets, len(grid))
+
+    # cost(i, j): padding when grid[i..j] all pad up to grid[j]
+    weighted = np.concatenate([[0], np.cumsum(counts * grid)])
+    total = np.concatenate([[0], np.cumsum(counts)])
+
+    def cost(i, j):
+        return grid[j] * (total[j + 1] - total[i]) - (weighted[j + 1] - weighted[i])
+
+    m = len(grid)
+    best = np.full((num_buckets + 1, m), np.inf)
+    split = np.zeros((num_buckets + 1, m), dtype=np.int64)
+    for j in range(m):
+        best[1, j] = cost(0, j)
+    for k in range(2, num_buckets + 1):
+        for j in range(k - 1, m):
+            for i in range(k - 1, j + 1):
+                c = best[k - 1, i - 1] + cost(i, j)
+                if c < best[k, j]:
+                    best[k, j], split[k, j] = c, i
+
+    edges, j = [], m - 1
+    for k in range(num_buckets, 0, -1):
+        edges.append(grid[j] * step_s)
+        j = split[k, j] - 1
+    return sorted(float(e) for e in edges)
+
+
+def expected_padding_waste(durations_s, buckets_s):
+    # Fraction of computed samples that are padding if every utterance goes to its smallest bucket
+    durations = np.asarray(durations_s, dtype=np.float64)
+    edges = np.asarray(sorted(buckets_s))
+    idx = np.searchsorted(edges, durations)
+    fits = idx < len(edges)
+    padded = edges[idx[fits]].sum()
+    return float(1 - durations[fits].sum() / padded) if padded else 0.0, int((~fits).sum())
+
+
+class ShapeProfileManager:
+    """One statically shaped compiled model per length bucket, behind the usual backend run().
+
+    Each input goes to the smallest bucket that holds it, is zero-padded to that bucket's
+    (max_batch_size, samples) shape with an attention mask over its real samples, and its
+    logits are trimmed back to its own frame count. Inputs longer than the largest bucket
+    raise instead of running on a shape the model was never built for (the TensorRT
+    "Ghost Speedup" failure mode).
+
+    Exports without an attention_mask input see the padding as audio. Each bucket is then
+    checked once against an unpadded run of validation_audio cut to the bucket's shortest
+    length (its worst case), and buckets whose greedy frames diverge are dropped.
+    """
+
+    def __init__(self, backend_name, model_path, buckets_s=DEFAULT_BUCKETS_S, max_batch_size=1, num_threads=None,
+                 validation_audio=None, min_agreement=1.0, **backend_kwargs):
+        if backend_name not in ("onnxruntime", "openvino"):
+            raise ValueError(f"Shape profiles need a compiled backend (onnxruntime / openvino), not {backend_name}")
+        self.name = backend_name
+        self.lengths = sorted({int(round(s * SAMPLE_RATE)) for s in buckets_s})
+        self.max_batch_size = max_batch_size
+        self.backends = []
+        for length in self.lengths:
+            print(f"  Building {backend_name} profile ({max_batch_size}, {length})...")
+            self.backends.append(BACKENDS[backend_name](model_path, num_threads=num_threads,
+                                                        shape_profile=(max_batch_size, length), **backend_kwargs))
+        self.accepts_attention_mask = all(b.accepts_attention_mask for b in self.backends)
+        self.rejected = []
+        if not self.accepts_attention_mask:
+            reference = BACKENDS[backend_name](model_path, num_threads=num_threads, **backend_kwargs)
+            self._validate(reference, validation_audio, min_agreement)
+            del reference
+        self.reset_stats()
+
+    def _validate(self, reference, audio, min_agreement):
+        if audio is None:
+            if os.path.exists(SAMPLE_AUDIO):
+                audio = load_audio(SAMPLE_AUDIO)
+            else:
+                audio = np.random.default_rng(0).standard_normal(self.lengths[-1]).astype(np.float32)
+        audio = np.resize(audio, self.lengths[-1])
+
+        kept_lengths, kept_backends = [], []
+        for length, backend in zip(self.lengths, self.backends):
+            # Shortest input this bucket will see (just past the last kept bucket) = most padding
+            shortest = kept_lengths[-1] + 1 if kept_lengths else max(length // 2, 400)
+            x = normalize(audio[:shortest])
+            expected = reference.run(x[None])[0]
+            padded = np.zeros((self.max_batch_size, length), dtype=np.float32)
+            padded[:, :shortest] = x
+            frames = min(num_frames(shortest), len(expected))
+            got = backend.run(padded)[0, :frames]
+            agreement = float((got.argmax(-1) == expected[:frames].argmax(-1)).mean())
+            if agreement >= min_agreement:
+                kept_lengths.append(length)
+                kept_backends.append(backend)
+            else:
+                print(f"  ⚠️ Dropping {length / SAMPLE_RATE:.2f}s profile: padding changes {1 - agreement:.1%} of "
+                      f"greedy frames (model has no attention_mask input)")
+                self.rejected.append({"bucket_s": length / SAMPLE_RATE, "frame_agreement": agreement})
+        if not kept_lengths:
+            raise ValueError("Every shape profile changes the logits of padded input; re-export the model with an "
+                             "attention_mask input (02a / 02b) or use dynamic shapes")
+        self.lengths, self.backends = kept_lengths, kept_backends
+
+    def reset_stats(self):
+        self.stats = [{"calls": 0, "utterances": 0, "real_samples": 0, "padded_samples": 0, "latencies_ms": []}
+                      for _ in self.lengths]
+        self.refused = 0
+
+    def route(self, num_samples):
+        index = bisect.bisect_left(self.lengths, num_samples)
+        if index == len(self.lengths):
+            self.refused += 1
+            raise ValueError(f"Input of {num_samples / SAMPLE_RATE:.2f}s is outside every shape profile "
+                             f"(largest {self.lengths[-1] / SAMPLE_RATE:.2f}s); chunk it with streaming.py")
+        return index
+
+    def run(self, input_values, attention_mask=None):
+        batch_size, length = input_values.shape
+        index = self.route(length)
+        bucket_len = self.lengths[index]
+        stats = self.stats[index]
+        if attention_mask is None:
+            attention_mask = np.ones((batch_size, length), dtype=np.int64)
+        real = attention_mask.sum(axis=1)
+        frames = num_frames(length)
+
+        outputs = []
+        for start in range(0, batch_size, self.max_batch_size):
+            chunk = input_values[start:start + self.max_batch_size]
+            padded = np.zeros((self.max_batch_size, bucket_len), dtype=np.float32)
+            padded[:len(chunk), :length] = chunk
+            # Filler rows keep a full mask (their output is dropped); real rows mask their padding
+            mask = np.ones((self.max_batch_size, bucket_len), dtype=np.int64)
+            mask[:len(chunk)] = 0
+            mask[:len(chunk), :length] = attention_mask[start:start + self.max_batch_size]
+
+            begin = time.perf_counter()
+            if self.accepts_attention_mask:
+                logits = self.backends[index].run(padded, mask)
+            else:
+                logits = self.backends[index].run(padded)
+            stats["latencies_ms"].append((time.perf_counter() - begin) * 1000)
+            stats["calls"] += 1
+            stats["utterances"] += len(chunk)
+            stats["real_samples"] += int(real[start:start + self.max_batch_size].sum())
+            stats["padded_samples"] += padded.size
+            outputs.append(logits[:len(chunk), :frames])
+        return np.concatenate(outputs)
+
+    def report(self):
+        buckets = []
+        for length, s in zip(self.lengths, self.stats):
+            row = {"bucket_s": length / SAMPLE_RATE, "calls": s["calls"], "utterances": s["utterances"]}
+            if s["calls"]:
+                row.update({
+                    "padding_waste": 1 - s["real_samples"] / s["padded_samples"],
+                    "latency_p50_ms": float(np.percentile(s["latencies_ms"], 50)),
+                    "latency_mean_ms": float(np.mean(s["latencies_ms"])),
+                })
+            buckets.append(row)
+        real = sum(s["real_samples"] for s in self.stats)
+        padded = sum(s["padded_samples"] for s in self.stats)
+        return {
+            "batch_size": self.max_batch_size,
+            "buckets": buckets,
+            "padding_waste": 1 - real / padded if padded else 0.0,
+            "refused": self.refused,
+            "attention_mask": self.accepts_attention_mask,
+            "rejected_buckets": self.rejected,
+        }
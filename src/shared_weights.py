@@ -0,0 +1,73 @@
+import os
+import mmap
+
+import numpy as np
+
+# model path -> {initializer name: read-only np.memmap}. Filled before fork by a pre-fork parent,
+# so its workers find the mappings already there and all use the same page-cache pages.
+_MAPPINGS = {}
+
+
+def map_external_initializers(model_path):
+    """name -> read-only np.memmap for every externally stored initializer of an ONNX model.
+
+    Nothing is read here; pages come in from the page cache on first use and are shared by every
+    process that maps the same file, instead of each one holding a private copy of model.onnx.data.
+    """
+    import onnx
+    from onnx.helper import tensor_dtype_to_np_dtype
+
+    model_path = os.path.abspath(model_path)
+    if model_path in _MAPPINGS:
+        return _MAPPINGS[model_path]
+
+    graph = onnx.load(model_path, load_external_data=False)
+    base = os.path.dirname(model_path)
+    weights = {}
+    for init in graph.graph.initializer:
+        if init.data_location != onnx.TensorProto.EXTERNAL:
+            continue
+        info = {entry.key: entry.value for entry in init.external_data}
+        weights[init.name] = np.memmap(os.path.join(base, info["location"]), mode="r",
+                                       dtype=tensor_dtype_to_np_dtype(init.data_type),
+                                       offset=int(info.get("offset", 0)), shape=tuple(init.dims))
+    _MAPPINGS[model_path] = weights
+    return weights
+
+
+def weight_files(model_path):
+    # The files whose pages workers share: ONNX external data or the OpenVINO .bin
+    from engine_cache import model_files
+    return model_files(model_path)[1:]
+
+
+def preload(model_path):
+    """Maps a model's weight files and asks the kernel to read them ahead, so forked workers start warm.
+
+    Returns the open mappings; keep them alive in the parent for as long as the workers run.
+    """
+    maps = []
+    for path in weight_files(model_path):
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            mapped.madvise(mmap.MADV_WILLNEED)
+        maps.append(mapped)
+    if model_path.endswith(".onnx"):
+        map_external_initializers(model_path)
+    return maps
+
+
+def memory_usage(pid="self"):
+    """Rss / Pss / private / shared MB of a process (Linux). Pss splits shared pages between their users,
+    so summing it over workers gives what the node really spends."""
+    fields = {"Rss": "rss_mb", "Pss": "pss_mb", "Private_Clean": "private_clean_mb",
+              "Private_Dirty": "private_dirty_mb", "Shared_Clean": "shared_clean_mb", "Shared_Dirty": "shared_dirty_mb"}
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            key = parts[0].rstrip(":")
+            if key in fields:
+                usage[fields[key]] = int(parts[1]) / 1024
+    return usage
@@ -0,0 +1,161 @@
+import argparse
+import numpy as np
+
+from ctc_decoder import GreedyCTCDecoder
+from inference_engine import ARTIFACTS, SAMPLE_AUDIO, SAMPLE_RATE, get_engine
+
+# One logit frame per 320 input samples (product of conv_stride in config.json)
+FRAME_SAMPLES = 320
+
+
+class BlockResampler:
+    """Polyphase resampling of a stream block by block, sample-identical to resample_poly on the whole signal.
+
+    resample_poly on each block alone zero-pads both block edges (a transient every block) and
+    rounds every block's output length (drift). Here each span is resampled together with `context`
+    input samples from its neighbours and only the span's own output is kept; spans are multiples
+    of `down` input samples, so they tile the output exactly. Output lags input by `context` samples.
+    """
+
+    def __init__(self, sr_in, sr_out=SAMPLE_RATE):
+        from math import gcd
+
+        g = gcd(sr_out, sr_in)
+        self.up, self.down = sr_out // g, sr_in // g
+        # resample_poly's filter reaches 10 * max(up, down) upsampled samples to each side
+        reach = -(-10 * max(self.up, self.down) // self.up) + 1
+        self.context = -(-reach // self.down) * self.down
+        # Zeros before the first sample, as resample_poly pads
+        self.buffer = np.zeros(self.context, dtype=np.float32)
+
+    def _resample(self, segment, span_out):
+        from scipy.signal import resample_poly
+
+        first = self.context * self.up // self.down
+        return resample_poly(segment, self.up, self.down)[first:first + span_out].astype(np.float32)
+
+    def process(self, block):
+        self.buffer = np.concatenate([self.buffer, np.asarray(block, dtype=np.float32)])
+        # Everything but the last `context` pending samples (the right context) is ready
+        ready = (len(self.buffer) - 2 * self.context) // self.down * self.down
+        if ready <= 0:
+            return np.zeros(0, dtype=np.float32)
+        out = self._resample(self.buffer[:ready + 2 * self.context], ready * self.up // self.down)
+        self.buffer = self.buffer[ready:]
+        return out
+
+    def flush(self):
+        pending = len(self.buffer) - self.context
+        if pending <= 0:
+            return np.zeros(0, dtype=np.float32)
+        segment = np.concatenate([self.buffer, np.zeros(self.context, dtype=np.float32)])
+        self.buffer = self.buffer[:self.context]
+        return self._resample(segment, -(-pending * self.up // self.down))
+
+
+def iter_audio_blocks(source, block_samples=SAMPLE_RATE):
+    """Yields mono float32 16 kHz blocks from a file path or any iterable of sample arrays."""
+    if not isinstance(source, str):
+        for block in source:
+            yield np.asarray(block, dtype=np.float32)
+        return
+
+    import soundfile as sf
+
+    sr = sf.info(source).samplerate
+    resampler = BlockResampler(sr) if sr != SAMPLE_RATE else None
+    # Read the file block by block instead of librosa.load-ing all of it
+    for block in sf.blocks(source, blocksize=block_samples, dtype="float32", always_2d=True):
+        block = block.mean(axis=1)
+        if resampler is not None:
+            block = resampler.process(block)
+            if not len(block):
+                continue
+        yield block
+    if resampler is not None:
+        tail = resampler.flush()
+        if len(tail):
+            yield tail
+
+
+def _to_frames(samples):
+    return int(samples) // FRAME_SAMPLES
+
+
+class StreamingTranscriber:
+    """Runs fixed-size overlapping windows through any engine and stitches CTC output per frame.
+
+    Each window is `overlap_s` of left context + a core of `chunk_s - 2 * overlap_s` + `overlap_s`
+    of right context. Only the core frames are kept, so every output frame was computed with
+    context on both sides, and memory is bounded by one window no matter how long the input is.
+    The overlap must be at least one frame: the 400-sample receptive field leaves a W-sample
+    window one frame short of W / 320, so with no right context the last core frame is missing.
+    """
+
+    def __init__(self, engine, chunk_s=10.0, overlap_s=1.0):
+        self.engine = engine
+        # Align everything to frame boundaries so cores tile the frame axis exactly
+        self.overlap = _to_frames(overlap_s * SAMPLE_RATE) * FRAME_SAMPLES
+        self.window = _to_frames(chunk_s * SAMPLE_RATE) * FRAME_SAMPLES
+        self.step = self.window - 2 * self.overlap
+        if self.overlap < FRAME_SAMPLES:
+            raise ValueError(f"overlap_s ({overlap_s}) must cover at least one frame ({FRAME_SAMPLES / SAMPLE_RATE}s)")
+        if self.step <= 0:
+            raise ValueError(f"chunk_s ({chunk_s}) must be larger than 2 * overlap_s ({overlap_s})")
+        self.decoder = GreedyCTCDecoder()
+
+    def iter_logits(self, source):
+        """Yields the stitched logits of each window's core, in order."""
+        buffer = np.zeros(0, dtype=np.float32)
+        consumed = 0  # samples already dropped from the front of the buffer
+
+        for block in iter_audio_blocks(source):
+            buffer = np.concatenate([buffer, block])
+            while len(buffer) >= self.window:
+                logits = self.engine.logits(buffer[:self.window])
+                # First window has no left context: keep its leading frames too
+                start = 0 if consumed == 0 else _to_frames(self.overlap)
+                yield logits[start:_to_frames(self.overlap + self.step)]
+                buffer = buffer[self.step:]
+                consumed += self.step
+
+        # Tail: whatever is left after the last full window
+        if len(buffer) > (0 if consumed == 0 else self.overlap):
+            if len(buffer) < FRAME_SAMPLES * 2:
+                buffer = np.pad(buffer, (0, FRAME_SAMPLES * 2 - len(buffer)))
+            logits = self.engine.logits(buffer)
+            start = 0 if consumed == 0 else _to_frames(self.overlap)
+            yield logits[start:]
+
+    def stream(self, source):
+        """Yields transcript pieces as soon as each window is decoded."""
+        last_id = None
+        for logits in self.iter_logits(source):
+            pred_ids = np.argmax(logits, axis=-1)[None]
+            if not pred_ids.size:
+                continue
+            # Greedy CTC collapse that carries the previous id across window boundaries
+            keep = self.decoder.collapse(pred_ids, last_ids=last_id)
+            last_id = pred_ids[:, -1]
+            yield "".join(self.decoder.labels[pred_ids[keep]])
+
+    def transcribe(self, source):
+        return " ".join("".join(self.stream(source)).split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked long-form transcription with overlapping windows.")
+    parser.add_argument("audio", nargs="?", default=SAMPLE_AUDIO)
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--chunk-s", type=float, default=10.0)
+    parser.add_argument("--overlap-s", type=float, default=1.0)
+    args = parser.parse_args()
+
+    transcriber = StreamingTranscriber(get_engine(args.artifact), args.chunk_s, args.overlap_s)
+    for piece in transcriber.stream(args.audio):
+        print(piece, end="", flush=True)
+    print("\n✅ Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import bisect
+
+import torch
+
+from inference_engine import PROJECT_ROOT, SAMPLE_RATE, num_frames
+from shape_profiles import DEFAULT_BUCKETS_S
+
+# Inductor's FX graph cache: later processes reuse the compiled kernels instead of recompiling
+INDUCTOR_CACHE_DIR = os.path.join(PROJECT_ROOT, "models", "cache", "inductor")
+
+
+def fold_weight_norm(model):
+    """Bakes weight norm (g * v / ||v||, the positional conv embedding) into a plain weight.
+
+    Removes the per-call _weight_norm_interface from the profile; the result is the same weight.
+    """
+    from torch.nn.utils import parametrize
+
+    folded = 0
+    for module in model.modules():
+        if parametrize.is_parametrized(module, "weight"):
+            parametrize.remove_parametrizations(module, "weight", leave_parametrized=True)
+            folded += 1
+        elif hasattr(module, "weight_g") and hasattr(module, "weight_v"):
+            torch.nn.utils.remove_weight_norm(module)
+            folded += 1
+    return folded
+
+
+def bf16_supported():
+    # Native BF16 matmul: AMX or AVX512-BF16. Elsewhere BF16 autocast is emulated and slower than FP32
+    from engine_cache import cpu_isa
+    flags = set(cpu_isa()["flags"])
+    return torch.backends.mkldnn.is_available() and bool(flags & {"amx_bf16", "avx512_bf16"})
+
+
+def inference_settings(num_threads=None):
+    """Process-wide settings for serving: no denormal slow paths, oneDNN on (autograd is off per call)."""
+    torch.set_flush_denormal(True)
+    torch.backends.mkldnn.enabled = True
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+
+class CompiledBuckets:
+    """torch.compile'd model with one static-shape graph per (batch size, input length) bucket.
+
+    Inputs are zero-padded up to their length bucket with an attention mask, batches up to the
+    next of batch_sizes with filler rows (larger batches run in chunks of the largest), and
+    logits trimmed back. The number of compiled graphs is bounded by the buckets instead of
+    growing with every new shape, and all of them are compiled up front (warmup) so no request
+    pays for a compile. Longer inputs fall back to the eager model.
+    """
+
+    def __init__(self, model, buckets_s=DEFAULT_BUCKETS_S, batch_sizes=(1, 8), mode="default", bf16=False,
+                 warmup=True):
+        os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", INDUCTOR_CACHE_DIR)
+        self.model = model
+        self.bf16 = bf16
+        self.lengths = sorted({int(round(s * SAMPLE_RATE)) for s in buckets_s})
+        self.batch_sizes = sorted(set(batch_sizes))
+        # Every bucket is its own set of guards on the same forward; keep them all resident
+        num_graphs = len(self.lengths) * len(self.batch_sizes)
+        torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, 2 * num_graphs)
+        self.compiled = torch.compile(model, mode=mode, dynamic=False)
+        self.hits = {(b, length): 0 for b in self.batch_sizes for length in self.lengths}
+        self.eager_calls = 0
+        if warmup:
+            for batch_size in self.batch_sizes:
+                for length in self.lengths:
+                    self(torch.zeros(batch_size, length), None)
+            self.hits = dict.fromkeys(self.hits, 0)
+
+    def __call__(self, input_values, attention_mask=None):
+        batch_size, length = input_values.shape
+        index = bisect.bisect_left(self.lengths, length)
+        if index == len(self.lengths):
+            self.eager_calls += 1
+            return forward(self.model, input_values, attention_mask, self.bf16)
+        if attention_mask is None:
+            attention_mask = torch.ones(batch_size, length, dtype=torch.long)
+
+        largest = self.batch_sizes[-1]
+        if batch_size > largest:
+            return torch.cat([self(input_values[i:i + largest], attention_mask[i:i + largest])
+                              for i in range(0, batch_size, largest)])
+
+        bucket = self.lengths[index]
+        rows = self.batch_sizes[bisect.bisect_left(self.batch_sizes, batch_size)]
+        self.hits[(rows, bucket)] += 1
+        padded = torch.zeros(rows, bucket)
+        padded[:batch_size, :length] = input_values
+        # Filler rows keep a full mask (their logits are dropped); real rows mask their padding
+        mask = torch.ones(rows, bucket, dtype=torch.long)
+        mask[:batch_size] = 0
+        mask[:batch_size, :length] = attention_mask
+        logits = forward(self.compiled, padded, mask, self.bf16)
+        return logits[:batch_size, :int(num_frames(length))]
+
+
+def forward(model, input_values, attention_mask=None, bf16=False):
+    # BF16 autocast keeps LayerNorm / softmax in FP32; logits come back as FP32 for the decoder
+    with torch.inference_mode(), torch.autocast("cpu", dtype=torch.bfloat16, enabled=bf16):
+        kwargs = {"attention_mask": attention_mask} if attention_mask is not None else {}
+        return model(input_values, **kwargs).logits.float()
+
+
+def compare_logits(reference, candidate, lengths):
+    """Max |diff| and greedy-frame agreement of (batch, frames, vocab) logits over each row's real frames."""
+    max_diff, agree, frames = 0.0, 0, 0
+    for row, n in enumerate(num_frames(lengths)):
+        n = min(int(n), reference.shape[1], candidate.shape[1])
+        a, b = reference[row, :n], candidate[row, :n]
+        max_diff = max(max_diff, float((a - b).abs().max()))
+        agree += int((a.argmax(-1) == b.argmax(-1)).sum())
+        frames += n
+    return {"max_abs_diff": max_diff, "argmax_agreement": agree / frames}
+
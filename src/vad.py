@@ -0,0 +1,203 @@
+import argparse
+
+import numpy as np
+
+from ctc_decoder import GreedyCTCDecoder
+from inference_engine import ARTIFACTS, SAMPLE_AUDIO, SAMPLE_RATE, get_engine, load_audio, normalize, num_frames
+
+# VAD frames are one model frame (20 ms), so segment bounds map straight onto logit frames
+FRAME_SAMPLES = 320
+
+
+class EnergyVAD:
+    """Energy + spectral-flatness voice activity detector, no model needed.
+
+    A frame is speech when its log energy is `margin_db` above the clip's noise floor (a low
+    percentile of frame energies) and above `min_db`, and its spectrum is not flat like noise.
+    Speech runs are padded by `pad_ms`, gaps shorter than `min_gap_ms` are merged, runs shorter
+    than `min_speech_ms` dropped, and anything longer than `max_segment_s` split so segments
+    stay within the shapes the engines are tuned for.
+    """
+
+    def __init__(self, margin_db=12.0, min_db=-55.0, max_flatness=0.5, noise_percentile=10,
+                 pad_ms=200, min_gap_ms=300, min_speech_ms=250, max_segment_s=30.0):
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.max_flatness = max_flatness
+        self.noise_percentile = noise_percentile
+        self.pad = int(pad_ms / 20)
+        self.min_gap = int(min_gap_ms / 20)
+        self.min_speech = int(min_speech_ms / 20)
+        self.max_segment = int(max_segment_s * SAMPLE_RATE / FRAME_SAMPLES)
+
+    def frame_features(self, audio):
+        frames = len(audio) // FRAME_SAMPLES
+        x = np.asarray(audio[:frames * FRAME_SAMPLES], dtype=np.float32).reshape(frames, FRAME_SAMPLES)
+        energy_db = 10 * np.log10(np.mean(x ** 2, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(x * np.hanning(FRAME_SAMPLES), axis=1)) ** 2 + 1e-10
+        # Geometric / arithmetic mean of the power spectrum: ~1 for white noise, small for voiced speech
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        return energy_db, flatness
+
+    def speech_frames(self, audio):
+        energy_db, flatness = self.frame_features(audio)
+        if not len(energy_db):
+            return np.zeros(0, dtype=bool)
+        floor = np.percentile(energy_db, self.noise_percentile)
+        return (energy_db > max(floor + self.margin_db, self.min_db)) & (flatness < self.max_flatness)
+
+    def segments(self, audio):
+        """[(start_sample, end_sample)] of speech, frame-aligned, in order."""
+        speech = self.speech_frames(audio)
+        runs = []
+        for start, end in _runs(speech):
+            start, end = max(start - self.pad, 0), min(end + self.pad, len(speech))
+            if runs and start - runs[-1][1] < self.min_gap:
+                runs[-1] = (runs[-1][0], end)
+            else:
+                runs.append((start, end))
+        runs = [(s, e) for s, e in runs if e - s >= self.min_speech]
+
+        out = []
+        for start, end in runs:
+            # Equal pieces, so a long run never leaves a sliver too short for the conv encoder
+            pieces = -(-(end - start) // self.max_segment)
+            bounds = np.linspace(start, end, pieces + 1).astype(int)
+            out.extend((int(s) * FRAME_SAMPLES, int(e) * FRAME_SAMPLES) for s, e in zip(bounds[:-1], bounds[1:]))
+        if out and out[-1][1] == len(speech) * FRAME_SAMPLES:
+            # Keep the sub-frame tail of the clip with the last segment
+            out[-1] = (out[-1][0], len(audio))
+        return out
+
+
+def _runs(mask):
+    # (start, end) of each run of True values
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return list(zip(np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]))
+
+
+class VADTranscriber:
+    """Runs only the speech segments of a clip through any engine and maps the output back.
+
+    Segments are normalized individually (each is an utterance to the model), sorted by length and
+    run in padded batches with an attention mask, as in batching_server.py (one at a time when the
+    model has no attention_mask input). Their logits are pasted at their original frame offsets into
+    a full-length matrix whose silent frames are blank, with a word delimiter at each silence gap,
+    so any ctc_decoder decoder sees the whole timeline.
+    """
+
+    def __init__(self, engine, vad=None, batch_size=4):
+        self.engine = engine
+        self.vad = vad or EnergyVAD()
+        # Padding without a mask changes the shorter segments' logits
+        self.batch_size = batch_size if getattr(engine, "accepts_attention_mask", False) else 1
+        self.last_stats = {}
+        labels = list(engine.decoder.labels)
+        # "|" (displayed as " ") ends a word; silence between segments becomes blank + one delimiter
+        self.blank_id = engine.decoder.blank_id
+        self.delimiter_id = labels.index(" ") if " " in labels else self.blank_id
+        self.timestamps = GreedyCTCDecoder()
+
+    def segment_logits(self, audio, segments):
+        pieces = [normalize(audio[start:end]) for start, end in segments]
+        order = sorted(range(len(pieces)), key=lambda i: len(pieces[i]))
+        results = [None] * len(pieces)
+        for b in range(0, len(order), self.batch_size):
+            batch = order[b:b + self.batch_size]
+            lengths = np.array([len(pieces[i]) for i in batch])
+            if len(batch) == 1:
+                logits = self.engine.batch_logits(pieces[batch[0]][None, :])
+            else:
+                input_values = np.zeros((len(batch), lengths.max()), dtype=np.float32)
+                attention_mask = np.zeros((len(batch), lengths.max()), dtype=np.int64)
+                for row, i in enumerate(batch):
+                    input_values[row, :lengths[row]] = pieces[i]
+                    attention_mask[row, :lengths[row]] = 1
+                logits = self.engine.batch_logits(input_values, attention_mask)
+            for row, (i, frames) in enumerate(zip(batch, num_frames(lengths))):
+                results[i] = logits[row, :frames]
+        return results
+
+    def logits(self, audio):
+        """Full-length (frames, vocab) logits: model output on speech, blank everywhere else."""
+        audio = np.asarray(audio, dtype=np.float32)
+        segments = self.vad.segments(audio) if len(audio) >= FRAME_SAMPLES * 2 else []
+        total_frames = int(num_frames(len(audio))) if len(audio) >= FRAME_SAMPLES * 2 else 0
+        speech_samples = sum(end - start for start, end in segments)
+        self.last_stats = {"segments": segments, "audio_s": len(audio) / SAMPLE_RATE,
+                           "speech_s": speech_samples / SAMPLE_RATE,
+                           "skipped_fraction": 1 - speech_samples / max(len(audio), 1)}
+        if not segments:
+            return None
+
+        seg_logits = self.segment_logits(audio, segments)
+        silence = np.full(seg_logits[0].shape[-1], -1e4, dtype=np.float32)
+        silence[self.blank_id] = 0.0
+        full = np.tile(silence, (max(total_frames, 1), 1))
+        for k, ((start, stop), logits) in enumerate(zip(segments, seg_logits)):
+            offset = start // FRAME_SAMPLES
+            logits = logits[:max(len(full) - offset, 0)]
+            full[offset:offset + len(logits)] = logits
+            end = offset + len(logits)
+            # Separate the last word of this segment from the first word of the next, but only across
+            # silence: pieces of a max_segment split are contiguous and may cut through a word
+            gap = k + 1 < len(segments) and segments[k + 1][0] > stop
+            if gap and end < len(full):
+                full[end] = -1e4
+                full[end, self.delimiter_id] = 0.0
+        return full
+
+    def transcribe(self, audio):
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        logits = self.logits(audio)
+        return "" if logits is None else self.engine.decode(logits)
+
+    def transcribe_segments(self, audio):
+        """[{start_s, end_s, text, words: [(word, start_s, end_s)]}] in original clip time."""
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        logits = self.logits(audio)
+        if logits is None:
+            return []
+        # Timings come from the greedy path whichever decoder the engine uses for text
+        pred_ids = np.argmax(logits, axis=-1)[None]
+        keep = self.timestamps.collapse(pred_ids)[0]
+        chars = self.timestamps.labels[pred_ids[0]]
+
+        out = []
+        for start, end in self.last_stats["segments"]:
+            first, last = start // FRAME_SAMPLES, end // FRAME_SAMPLES
+            words, current = [], None
+            for frame in np.nonzero(keep[first:last])[0] + first:
+                t = frame * FRAME_SAMPLES / SAMPLE_RATE
+                if chars[frame] == " ":
+                    current = None
+                elif current is None:
+                    current = [chars[frame], t, t + FRAME_SAMPLES / SAMPLE_RATE]
+                    words.append(current)
+                else:
+                    current[0] += chars[frame]
+                    current[2] = t + FRAME_SAMPLES / SAMPLE_RATE
+            out.append({"start_s": start / SAMPLE_RATE, "end_s": end / SAMPLE_RATE,
+                        "text": " ".join(w[0] for w in words), "words": [tuple(w) for w in words]})
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe only the speech in a clip, with segment timestamps.")
+    parser.add_argument("audio", nargs="?", default=SAMPLE_AUDIO)
+    parser.add_argument("--artifact", default="onnx_optimized", choices=list(ARTIFACTS))
+    parser.add_argument("--margin-db", type=float, default=12.0)
+    parser.add_argument("--min-gap-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    transcriber = VADTranscriber(get_engine(args.artifact), EnergyVAD(margin_db=args.margin_db, min_gap_ms=args.min_gap_ms))
+    for segment in transcriber.transcribe_segments(args.audio):
+        print(f"[{segment['start_s']:7.2f} - {segment['end_s']:7.2f}] {segment['text']}")
+    stats = transcriber.last_stats
+    print(f"✅ {stats['speech_s']:.1f}s of speech in {stats['audio_s']:.1f}s ({stats['skipped_fraction'] * 100:.0f}% skipped)")
+
+
+if __name__ == "__main__":
+    main()